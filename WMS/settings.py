@@ -51,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    'core.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -90,6 +92,25 @@ DATABASES = {
     'default': dj_database_url.parse(database_url)
 }
 
+# Cache
+# Use a shared backend (e.g. Redis or Memcached) in production so that
+# invalidations reach every worker process.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+# Seconds a cached user dashboard payload is kept before being rebuilt
+DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('DASHBOARD_CACHE_TIMEOUT', 300))
+
+# Seconds the admin dashboard snapshots count as fresh, and how much longer
+# a stale one is served while a single background refresh rebuilds it
+ADMIN_DASHBOARD_CACHE_TIMEOUT = int(os.environ.get('ADMIN_DASHBOARD_CACHE_TIMEOUT', 60))
+ADMIN_DASHBOARD_STALE_TIMEOUT = int(os.environ.get('ADMIN_DASHBOARD_STALE_TIMEOUT', 600))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -134,7 +155,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+    ),
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.environ.get('API_PAGE_SIZE', 50)),
 }
 
 SIMPLE_JWT = {
@@ -145,6 +168,61 @@ SIMPLE_JWT = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Report media is staged on local disk and pushed to storage by a
+# background upload queue (core.media)
+MEDIA_STAGING_ROOT = os.environ.get('MEDIA_STAGING_ROOT', os.path.join(BASE_DIR, 'media_staging'))
+MEDIA_UPLOAD_BACKEND = os.environ.get('MEDIA_UPLOAD_BACKEND', 'core.media.CloudinaryUploadBackend')
+MEDIA_UPLOAD_WORKERS = int(os.environ.get('MEDIA_UPLOAD_WORKERS', 4))
+# An upload still claimed this long after it started is taken to have lost
+# its worker; process_media_uploads (or a new worker) uploads it again
+MEDIA_UPLOAD_STALE_SECONDS = int(os.environ.get('MEDIA_UPLOAD_STALE_SECONDS', 900))
+
+# Uploaded photos are re-encoded into thumbnail/medium/full variants
+IMAGE_VARIANT_FORMAT = os.environ.get('IMAGE_VARIANT_FORMAT', 'WEBP').upper()
+IMAGE_VARIANT_QUALITY = int(os.environ.get('IMAGE_VARIANT_QUALITY', 80))
+
+# Broadcast notifications are inserted in chunks of this many rows
+NOTIFICATION_FANOUT_CHUNK_SIZE = int(os.environ.get('NOTIFICATION_FANOUT_CHUNK_SIZE', 1000))
+# A running broadcast that has sent nothing for this long is taken to have
+# lost its worker, and process_broadcasts resumes it
+NOTIFICATION_BROADCAST_STALE_SECONDS = int(os.environ.get('NOTIFICATION_BROADCAST_STALE_SECONDS', 600))
+
+# Real-time push (core.events): SSE at /api/events/stream/ and long-poll at
+# /api/events/poll/. Serve WMS.asgi:application (e.g. uvicorn) to use them.
+EVENT_BROKER = os.environ.get('EVENT_BROKER', 'core.events.LocalBroker')
+EVENT_HISTORY_SIZE = int(os.environ.get('EVENT_HISTORY_SIZE', 100))
+# Replay history is kept per channel for this long after its last event,
+# for at most this many channels
+EVENT_HISTORY_SECONDS = float(os.environ.get('EVENT_HISTORY_SECONDS', 300))
+EVENT_HISTORY_CHANNELS = int(os.environ.get('EVENT_HISTORY_CHANNELS', 10000))
+EVENT_MAX_PENDING = int(os.environ.get('EVENT_MAX_PENDING', 500))
+EVENT_HEARTBEAT_SECONDS = float(os.environ.get('EVENT_HEARTBEAT_SECONDS', 15))
+EVENT_RETRY_MS = int(os.environ.get('EVENT_RETRY_MS', 3000))
+EVENT_LONG_POLL_TIMEOUT = float(os.environ.get('EVENT_LONG_POLL_TIMEOUT', 25))
+
+# Content/forum view counts are buffered in memory and written this often
+VIEW_COUNTER_FLUSH_INTERVAL = float(os.environ.get('VIEW_COUNTER_FLUSH_INTERVAL', 10))
+
+# Delta sync (?since=): watermarks step back this far to cover in-flight
+# transactions; deletions are remembered for the retention period
+SYNC_WATERMARK_LAG_SECONDS = int(os.environ.get('SYNC_WATERMARK_LAG_SECONDS', 5))
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.environ.get('SYNC_TOMBSTONE_RETENTION_DAYS', 30))
+
+# Background export jobs write their files here (local disk, not Cloudinary)
+EXPORT_ROOT = os.environ.get('EXPORT_ROOT', os.path.join(BASE_DIR, 'exports'))
+EXPORT_JOB_WORKERS = int(os.environ.get('EXPORT_JOB_WORKERS', 2))
+# A job still running this long after it was claimed is taken to have lost
+# its worker; process_export_jobs runs it again
+EXPORT_JOB_STALE_SECONDS = int(os.environ.get('EXPORT_JOB_STALE_SECONDS', 3600))
+
+# Request metrics (core.metrics, served at /api/metrics/). Each process
+# writes its histograms to its own file in METRICS_DIR this often, and the
+# endpoint sums them across workers; set it (to a directory local to the
+# host) when running several workers, and run clear_metrics before starting
+# the server. Empty keeps metrics in-process only.
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 10))
+
 
 # Cloudinary configuration
 if not DEBUG:
@@ -155,6 +233,20 @@ if not DEBUG:
         secure=True
     )
 
+# Pickups a collector can be auto-assigned for a single day
+COLLECTOR_DAILY_CAPACITY = int(os.environ.get('COLLECTOR_DAILY_CAPACITY', 20))
+
+# Collector GPS pings are buffered and written to the database in batches.
+# The latest position is kept in the cache, so other workers see it before
+# the flush only with a shared CACHE_BACKEND
+COLLECTOR_LOCATION_FLUSH_INTERVAL = float(os.environ.get('COLLECTOR_LOCATION_FLUSH_INTERVAL', 5))
+# Keep a thinned position history (CollectorLocation) for route replay
+COLLECTOR_LOCATION_HISTORY = os.environ.get('COLLECTOR_LOCATION_HISTORY', 'False').lower() == 'true'
+COLLECTOR_LOCATION_HISTORY_MIN_METERS = float(os.environ.get('COLLECTOR_LOCATION_HISTORY_MIN_METERS', 25))
+
+# Route planning visits pickups window by window in pickup_time order
+ROUTE_TIME_WINDOW_MINUTES = int(os.environ.get('ROUTE_TIME_WINDOW_MINUTES', 60))
+
 # Maximum file upload size (5MB)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880
@@ -16,7 +16,14 @@ from .models import (
     UserQuizAttempt,
     ForumTopic,
     ForumComment,
-    FAQ
+    FAQ,
+    ExportJob,
+    CollectorLocation,
+    NotificationBroadcast,
+    SyncTombstone,
+    SearchDocument,
+    WasteReportDailyStat,
+    PickupRequestDailyStat
 )
 
 @admin.register(CustomUser)
@@ -113,4 +120,39 @@ class ForumCommentAdmin(admin.ModelAdmin):
 class FAQAdmin(admin.ModelAdmin):
     list_display = ('question', 'category', 'created_at')
     list_filter = ('category', 'created_at')
-    search_fields = ('question', 'answer', 'category')
\ No newline at end of file
+    search_fields = ('question', 'answer', 'category')
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('export_type', 'file_format', 'user', 'status', 'row_count', 'created_at')
+    list_filter = ('export_type', 'status', 'created_at')
+
+@admin.register(CollectorLocation)
+class CollectorLocationAdmin(admin.ModelAdmin):
+    list_display = ('collector', 'latitude', 'longitude', 'recorded_at')
+    list_filter = ('recorded_at',)
+
+@admin.register(NotificationBroadcast)
+class NotificationBroadcastAdmin(admin.ModelAdmin):
+    list_display = ('title', 'segment', 'status', 'sent_count', 'total_recipients', 'created_at')
+    list_filter = ('segment', 'status', 'created_at')
+
+@admin.register(SyncTombstone)
+class SyncTombstoneAdmin(admin.ModelAdmin):
+    list_display = ('model', 'object_id', 'user_id', 'deleted_at')
+    list_filter = ('model', 'deleted_at')
+
+@admin.register(SearchDocument)
+class SearchDocumentAdmin(admin.ModelAdmin):
+    list_display = ('title', 'source', 'object_id', 'updated_at')
+    list_filter = ('source',)
+
+@admin.register(WasteReportDailyStat)
+class WasteReportDailyStatAdmin(admin.ModelAdmin):
+    list_display = ('day', 'waste_type', 'status', 'count', 'quantity')
+    list_filter = ('waste_type', 'status', 'day')
+
+@admin.register(PickupRequestDailyStat)
+class PickupRequestDailyStatAdmin(admin.ModelAdmin):
+    list_display = ('day', 'waste_type', 'status', 'count', 'quantity_estimate')
+    list_filter = ('waste_type', 'status', 'day')
@@ -0,0 +1,80 @@
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Case, F, When
+
+logger = logging.getLogger(__name__)
+
+FLUSH_BATCH_SIZE = 500
+
+
+class ViewCounterBuffer:
+    # Write-behind view counts. Increments pile up in this process's memory
+    # and are written every interval as one UPDATE per model (a CASE over
+    # the touched ids), so a popular row is locked once per flush instead of
+    # once per view. Counts still pending in a process that dies are lost.
+
+    def __init__(self, field='views'):
+        self.field = field
+        self.lock = threading.Lock()
+        self.pending = Counter()
+        self.timer = None
+
+    def increment(self, model, pk, amount=1):
+        with self.lock:
+            self.pending[(model._meta.label, pk)] += amount
+            self._schedule()
+
+    def _schedule(self):
+        if self.timer is None:
+            self.timer = threading.Timer(settings.VIEW_COUNTER_FLUSH_INTERVAL, self._flush_in_background)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _flush_in_background(self):
+        close_old_connections()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('View counter flush failed')
+        finally:
+            close_old_connections()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, Counter()
+            self.timer = None
+
+        by_model = {}
+        for (label, pk), amount in pending.items():
+            by_model.setdefault(label, []).append((pk, amount))
+
+        try:
+            with transaction.atomic():
+                for label, increments in by_model.items():
+                    self._write(apps.get_model(label), increments)
+        except Exception:
+            # Put the counts back so the next flush retries them
+            with self.lock:
+                self.pending.update(pending)
+                self._schedule()
+            raise
+        return sum(pending.values())
+
+    def _write(self, model, increments):
+        # Lock rows in id order so concurrent flushers can't deadlock
+        increments.sort()
+        for start in range(0, len(increments), FLUSH_BATCH_SIZE):
+            batch = increments[start:start + FLUSH_BATCH_SIZE]
+            model.objects.filter(pk__in=[pk for pk, _ in batch]).update(**{
+                self.field: F(self.field) + Case(*[When(pk=pk, then=amount) for pk, amount in batch], default=0)
+            })
+
+
+view_counts = ViewCounterBuffer()
+atexit.register(view_counts._flush_in_background)
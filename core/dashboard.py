@@ -0,0 +1,323 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.db.models import Count, Q, F
+from django.utils import timezone
+
+from .models import (
+    WasteReport, PickupRequest, Notification, UserProfile, EducationalContent, Pickup, CustomUser,
+    WasteReportDailyStat, PickupRequestDailyStat
+)
+from .rollups import distribution
+from .serializers import (
+    WasteReportSerializer, PickupRequestSerializer, NotificationSerializer,
+    EducationalContentSerializer, AdminDashboardSerializer, UserAdminSerializer
+)
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_VERSION_KEY = 'dashboard:version:global'
+USER_VERSION_KEY = 'dashboard:version:user:{}'
+PAYLOAD_KEY = 'dashboard:payload:{}:{}'
+HITS_KEY = 'dashboard:hits'
+MISSES_KEY = 'dashboard:misses'
+SNAPSHOT_KEY = 'dashboard:snapshot:{}'
+REFRESH_LOCK_KEY = 'dashboard:snapshot:{}:refreshing'
+
+_refresh_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dashboard')
+
+
+def _rate(part, total):
+    return f"{(part / total * 100) if total > 0 else 0:.1f}%"
+
+
+def report_statistics(user, now):
+    # One grouped query over (status, waste_type) with conditional counts,
+    # folded into every report figure the dashboard needs.
+    rows = WasteReport.objects.filter(user=user).values('status', 'waste_type').annotate(
+        count=Count('id'),
+        last_30_days=Count('id', filter=Q(created_at__gte=now - timedelta(days=30))),
+        attention_needed=Count('id', filter=Q(
+            status='pending',
+            created_at__lte=now - timedelta(days=7)
+        )),
+    ).order_by()
+
+    by_status = {}
+    by_type = {}
+    stats = {'total': 0, 'last_30_days': 0, 'attention_needed': 0}
+    for row in rows:
+        by_status[row['status']] = by_status.get(row['status'], 0) + row['count']
+        by_type[row['waste_type']] = by_type.get(row['waste_type'], 0) + row['count']
+        stats['total'] += row['count']
+        stats['last_30_days'] += row['last_30_days']
+        stats['attention_needed'] += row['attention_needed']
+
+    stats['by_status'] = by_status
+    stats['by_type'] = by_type
+    return stats
+
+
+def pickup_statistics(user):
+    return PickupRequest.objects.filter(user=user).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='completed')),
+        pending=Count('id', filter=Q(status__in=['pending', 'scheduled'])),
+    )
+
+
+def notification_statistics(user):
+    rows = Notification.objects.filter(user=user).values('notification_type').annotate(
+        count=Count('id'),
+        unread=Count('id', filter=Q(is_read=False)),
+    ).order_by()
+
+    by_type = {}
+    unread = 0
+    for row in rows:
+        by_type[row['notification_type']] = row['count']
+        unread += row['unread']
+    return {'by_type': by_type, 'unread': unread}
+
+
+def build_user_dashboard(user):
+    now = timezone.now()
+    today = now.date()
+
+    reports = report_statistics(user, now)
+    pickups = pickup_statistics(user)
+    notifications = notification_statistics(user)
+
+    user_reports = WasteReport.objects.filter(user=user).prefetch_related('media')
+    recent_reports = user_reports.filter(
+        created_at__gte=now - timedelta(days=30)
+    ).order_by('-created_at')[:5]
+    recently_updated = user_reports.filter(
+        updated_at__gte=now - timedelta(days=7)
+    ).exclude(
+        created_at=F('updated_at')  # Exclude newly created reports
+    ).order_by('-updated_at')[:5]
+
+    upcoming_pickups = PickupRequest.objects.filter(
+        user=user,
+        pickup_date__gte=today,
+        status__in=['pending', 'scheduled', 'in_progress']
+    ).order_by('pickup_date', 'pickup_time')
+    past_pickups = PickupRequest.objects.filter(
+        user=user,
+        pickup_date__lt=today
+    ).order_by('-pickup_date', '-pickup_time')
+
+    recent_notifications = Notification.objects.filter(user=user).order_by('-created_at')[:10]
+
+    educational_resources = EducationalContent.objects.filter(
+        is_published=True
+    ).select_related('author').order_by('-created_at')
+
+    profile = UserProfile.objects.filter(user=user).first()
+
+    # Reports are resolved rather than completed; keep the public key stable
+    completed_reports = reports['by_status'].get('resolved', 0)
+
+    return {
+        'user_info': {
+            'username': user.username,
+            'email': user.email,
+            'phone_number': profile.phone_number if profile else None,
+            'address': profile.address if profile else None
+        },
+        'reports_summary': {
+            'total_reports': reports['total'],
+            'reports_by_status': [
+                {'status': key, 'count': count} for key, count in reports['by_status'].items()
+            ],
+            'reports_by_type': [
+                {'waste_type': key, 'count': count} for key, count in reports['by_type'].items()
+            ],
+            'recent_reports': WasteReportSerializer(recent_reports, many=True).data
+        },
+        'waste_tracking': {
+            'monthly_statistics': {
+                'total_reports': reports['last_30_days'],
+                'resolution_rate': _rate(completed_reports, reports['total'])
+            },
+            'status_breakdown': {
+                'pending': reports['by_status'].get('pending', 0),
+                'in_progress': reports['by_status'].get('in_progress', 0),
+                'completed': completed_reports,
+                'attention_needed': reports['attention_needed']
+            },
+            'recent_updates': WasteReportSerializer(recently_updated, many=True).data,
+            'timeline': {
+                'last_30_days': reports['last_30_days'],
+                'pending_over_7_days': reports['attention_needed']
+            }
+        },
+        'pickups_summary': {
+            'upcoming_pickups': PickupRequestSerializer(upcoming_pickups, many=True).data,
+            'past_pickups': PickupRequestSerializer(past_pickups, many=True).data,
+            'statistics': {
+                'total_pickups': pickups['total'],
+                'completed_pickups': pickups['completed'],
+                'pending_pickups': pickups['pending'],
+                'completion_rate': _rate(pickups['completed'], pickups['total'])
+            }
+        },
+        'notifications': {
+            'recent': NotificationSerializer(recent_notifications, many=True).data,
+            'unread_count': notifications['unread'],
+            'by_type': [
+                {'notification_type': key, 'count': count}
+                for key, count in notifications['by_type'].items()
+            ],
+            'has_new': notifications['unread'] > 0
+        },
+        'educational_resources': EducationalContentSerializer(educational_resources, many=True).data
+    }
+
+
+def _new_version():
+    # Seeded from the clock so a version evicted from the cache never comes
+    # back with a number an older payload was stored under.
+    return time.time_ns() // 1000
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), None)
+
+
+def _count(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)
+
+
+def dashboard_version(user_id):
+    return f"{_get_version(GLOBAL_VERSION_KEY)}.{_get_version(USER_VERSION_KEY.format(user_id))}"
+
+
+def get_user_dashboard(user):
+    version = dashboard_version(user.pk)
+    key = PAYLOAD_KEY.format(user.pk, version)
+    payload = cache.get(key)
+    if payload is None:
+        _count(MISSES_KEY)
+        payload = build_user_dashboard(user)
+        payload['version'] = version
+        cache.set(key, payload, settings.DASHBOARD_CACHE_TIMEOUT)
+    else:
+        _count(HITS_KEY)
+    return payload
+
+
+def invalidate_user_dashboard(user_id):
+    _bump_version(USER_VERSION_KEY.format(user_id))
+
+
+def invalidate_all_dashboards():
+    _bump_version(GLOBAL_VERSION_KEY)
+
+
+def dashboard_cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total > 0 else 0.0
+    }
+
+
+def build_admin_dashboard():
+    since = timezone.now() - timedelta(days=30)
+    data = {
+        'total_reports': WasteReport.objects.count(),
+        'pending_pickups': Pickup.objects.filter(
+            status__in=['scheduled', 'in_progress']
+        ).count(),
+        # Distinct reporters straight off the report table, no user join
+        'active_users': WasteReport.objects.filter(
+            created_at__gte=since
+        ).values('user').distinct().count(),
+        'recent_reports': WasteReport.objects.prefetch_related('media')
+            .order_by('-created_at')[:10]
+    }
+    return AdminDashboardSerializer(data).data
+
+
+def build_admin_stats():
+    # Report and pickup figures come from the daily rollups
+    waste_reports_by_status = distribution(WasteReportDailyStat, 'status')
+    pickups_by_status = distribution(PickupRequestDailyStat, 'status')
+    recent_users = CustomUser.objects.order_by('-created_at')[:5]
+    return {
+        'total_users': CustomUser.objects.count(),
+        'total_waste_reports': sum(item['count'] for item in waste_reports_by_status),
+        'total_pickups': sum(item['count'] for item in pickups_by_status),
+        'recent_users': UserAdminSerializer(recent_users, many=True).data,
+        'waste_reports_by_status': waste_reports_by_status,
+        'pickups_by_status': pickups_by_status
+    }
+
+
+def _store_snapshot(name, build):
+    payload = dict(build())
+    payload['computed_at'] = timezone.now()
+    # Kept past its fresh period so there is something to serve while the
+    # refresh runs; only a cold or long-idle cache builds inline.
+    cache.set(
+        SNAPSHOT_KEY.format(name),
+        {'payload': payload, 'fresh_until': time.time() + settings.ADMIN_DASHBOARD_CACHE_TIMEOUT},
+        settings.ADMIN_DASHBOARD_CACHE_TIMEOUT + settings.ADMIN_DASHBOARD_STALE_TIMEOUT
+    )
+    return payload
+
+
+def _refresh_in_worker(name, build):
+    close_old_connections()
+    try:
+        _store_snapshot(name, build)
+    except Exception:
+        logger.exception('Refreshing the %s dashboard snapshot failed', name)
+    finally:
+        cache.delete(REFRESH_LOCK_KEY.format(name))
+        close_old_connections()
+
+
+def get_snapshot(name, build):
+    # Stale-while-revalidate: a stale snapshot is still served, and the
+    # first request to see it queues the one background rebuild.
+    entry = cache.get(SNAPSHOT_KEY.format(name))
+    if entry is None:
+        return _store_snapshot(name, build)
+    if time.time() >= entry['fresh_until'] and cache.add(
+        REFRESH_LOCK_KEY.format(name), True, settings.ADMIN_DASHBOARD_CACHE_TIMEOUT
+    ):
+        _refresh_executor.submit(_refresh_in_worker, name, build)
+    return entry['payload']
+
+
+def get_admin_dashboard():
+    return get_snapshot('admin', build_admin_dashboard)
+
+
+def get_admin_stats():
+    return get_snapshot('admin_stats', build_admin_stats)
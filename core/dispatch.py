@@ -0,0 +1,165 @@
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from .geo import GRID_SIZE, EARTH_RADIUS_KM, haversine_km, grid_row, grid_column
+from .locations import latest_positions
+from .models import PickupRequest, WasteCollector
+from .notifications import notify
+
+# Kilometres per degree of latitude; a grid row is GRID_SIZE of these tall
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+MAX_RING = 60
+
+
+class CollectorIndex:
+    # In-memory grid over collector positions. A lookup walks outward ring
+    # by ring from the pickup's cell and stops once no unvisited ring can
+    # hold anything closer than the best match found so far.
+
+    def __init__(self, collectors):
+        self.cells = defaultdict(list)
+        self.collectors = {}
+        for collector in collectors:
+            if collector.current_location_lat is None or collector.current_location_lng is None:
+                continue
+            lat = float(collector.current_location_lat)
+            lng = float(collector.current_location_lng)
+            self.collectors[collector.pk] = (collector, lat, lng)
+            self.cells[(grid_row(lat), grid_column(lng))].append(collector.pk)
+
+    def __len__(self):
+        return len(self.collectors)
+
+    def remove(self, collector_id):
+        entry = self.collectors.pop(collector_id, None)
+        if entry is not None:
+            _, lat, lng = entry
+            self.cells[(grid_row(lat), grid_column(lng))].remove(collector_id)
+
+    def _ring(self, row, column, radius):
+        if radius == 0:
+            yield row, column
+            return
+        for d in range(-radius, radius + 1):
+            yield row - radius, column + d
+            yield row + radius, column + d
+        for d in range(-radius + 1, radius):
+            yield row + d, column - radius
+            yield row + d, column + radius
+
+    def nearest(self, lat, lng, exclude=()):
+        if not self.collectors:
+            return None, None
+
+        row, column = grid_row(lat), grid_column(lng)
+        # A ring `r` cells out is at least (r - 1) cells away; longitude cells
+        # shrink with latitude, so bound with the narrower of the two sides.
+        cell_km = GRID_SIZE * KM_PER_DEGREE * max(
+            math.cos(math.radians(min(abs(lat) + MAX_RING * GRID_SIZE, 90))), 0.01
+        )
+
+        best, best_distance = None, None
+        for radius in range(MAX_RING + 1):
+            if best is not None and best_distance <= (radius - 1) * cell_km:
+                return best, best_distance
+            for cell in self._ring(row, column, radius):
+                for collector_id in self.cells.get(cell, ()):
+                    if collector_id in exclude:
+                        continue
+                    collector, c_lat, c_lng = self.collectors[collector_id]
+                    distance = haversine_km(lat, lng, c_lat, c_lng)
+                    if best is None or (distance, collector_id) < (best_distance, best.pk):
+                        best, best_distance = collector, distance
+
+        # Nothing close by: fall back to a full scan of the remaining collectors
+        for collector_id, (collector, c_lat, c_lng) in self.collectors.items():
+            if collector_id in exclude:
+                continue
+            distance = haversine_km(lat, lng, c_lat, c_lng)
+            if best is None or (distance, collector_id) < (best_distance, best.pk):
+                best, best_distance = collector, distance
+        return best, best_distance
+
+
+def build_collector_index():
+    collectors = list(WasteCollector.objects.filter(is_available=True))
+    # Prefer buffered GPS positions that have not been flushed to the DB yet
+    positions = latest_positions([collector.pk for collector in collectors])
+    for collector in collectors:
+        position = positions.get(collector.pk)
+        if position is not None:
+            collector.current_location_lat = position['latitude']
+            collector.current_location_lng = position['longitude']
+    return CollectorIndex(collectors)
+
+
+def _assign(pickup_id, index, capacity):
+    # Lock the pickup, then the chosen collector, and re-check both under the
+    # lock so concurrent dispatchers can neither assign a pickup twice nor
+    # push a collector past its daily capacity.
+    with transaction.atomic():
+        pickup = PickupRequest.objects.select_for_update().filter(
+            pk=pickup_id, status='pending', collector__isnull=True
+        ).first()
+        if pickup is None:
+            return None, None
+
+        tried = set()
+        while True:
+            candidate, distance = index.nearest(float(pickup.latitude), float(pickup.longitude), exclude=tried)
+            if candidate is None:
+                return pickup, None
+            tried.add(candidate.pk)
+
+            collector = WasteCollector.objects.select_for_update().filter(
+                pk=candidate.pk, is_available=True
+            ).first()
+            if collector is None:
+                index.remove(candidate.pk)
+                continue
+
+            booked = PickupRequest.objects.filter(
+                collector=collector, pickup_date=pickup.pickup_date
+            ).exclude(status='cancelled').count()
+            if booked >= capacity:
+                continue
+
+            pickup.collector = collector
+            pickup.status = 'scheduled'
+            pickup.save()
+
+            notify(
+                pickup.user,
+                'Pickup Scheduled',
+                f'Your pickup request has been scheduled for {pickup.pickup_date}',
+                'pickup_status',
+                reference_id=pickup.pk
+            )
+            return pickup, {'collector_id': collector.pk, 'distance_km': round(distance, 3)}
+
+
+def auto_assign(pickup_ids, index=None):
+    index = index if index is not None else build_collector_index()
+    capacity = settings.COLLECTOR_DAILY_CAPACITY
+    assigned, unassigned = [], []
+    for pickup_id in pickup_ids:
+        pickup, assignment = _assign(pickup_id, index, capacity)
+        if pickup is None:
+            continue
+        if assignment is None:
+            unassigned.append(pickup_id)
+        else:
+            assigned.append({'pickup_id': pickup_id, **assignment})
+    return {'assigned': assigned, 'unassigned': unassigned}
+
+
+def pending_pickup_ids(queryset=None):
+    queryset = queryset if queryset is not None else PickupRequest.objects.all()
+    return list(
+        queryset.filter(status='pending', collector__isnull=True)
+        .order_by('pickup_date', 'pickup_time', 'created_at')
+        .values_list('id', flat=True)
+    )
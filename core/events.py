@@ -0,0 +1,209 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+USER_CHANNEL = 'user:{}'
+
+
+def user_channel(user_id):
+    return USER_CHANNEL.format(user_id)
+
+
+class Subscription:
+    # One connected client. Events arrive from any thread through the
+    # owning event loop; a client that falls too far behind is cut off and
+    # replays what it missed when it reconnects with Last-Event-ID.
+
+    def __init__(self, channel, loop, max_pending):
+        self.channel = channel
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def deliver(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    @property
+    def closed(self):
+        return self.overflowed and self.queue.empty()
+
+    async def get(self, timeout):
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def drain(self):
+        events = []
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return events
+
+
+class LocalBroker:
+    # In-process pub/sub. Only clients connected to this process see its
+    # events, so a multi-worker deployment needs a shared broker (e.g. Redis
+    # pub/sub) exposing the same publish/subscribe/unsubscribe methods.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = defaultdict(set)
+        # channel -> (last publish time, recent events), least recently
+        # published first. Replay only has to bridge a reconnect, so a
+        # channel's history is dropped once it has been quiet for
+        # EVENT_HISTORY_SECONDS, oldest first past EVENT_HISTORY_CHANNELS;
+        # otherwise a broadcast would leave a deque behind per recipient.
+        self.history = OrderedDict()
+        # Millisecond-based ids keep growing across restarts, so a stale
+        # Last-Event-ID never hides newer events.
+        first_id = int(time.time() * 1000)
+        self.ids = itertools.count(first_id)
+        self.last_event_id = first_id - 1
+
+    def publish(self, channel, event_type, data):
+        with self.lock:
+            event = {'id': next(self.ids), 'type': event_type, 'data': data}
+            self.last_event_id = event['id']
+            self._remember(channel, event)
+            subscribers = list(self.subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The client's event loop has already shut down
+                self.unsubscribe(subscription)
+        return event
+
+    def _remember(self, channel, event):
+        now = time.monotonic()
+        _, events = self.history.pop(channel, (None, None))
+        if events is None:
+            events = deque(maxlen=settings.EVENT_HISTORY_SIZE)
+        events.append(event)
+        self.history[channel] = (now, events)
+
+        expired = now - settings.EVENT_HISTORY_SECONDS
+        while self.history and (
+            len(self.history) > settings.EVENT_HISTORY_CHANNELS or next(iter(self.history.values()))[0] < expired
+        ):
+            self.history.popitem(last=False)
+
+    def subscribe(self, channel, after=None):
+        subscription = Subscription(channel, asyncio.get_running_loop(), settings.EVENT_MAX_PENDING)
+        with self.lock:
+            # Replay under the lock so nothing slips between history and live
+            if after is not None:
+                for event in self.history.get(channel, (None, ()))[1]:
+                    if event['id'] > after:
+                        subscription.deliver(event)
+            self.subscribers[channel].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscribers = self.subscribers.get(subscription.channel)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.subscribers[subscription.channel]
+
+    def connection_count(self):
+        with self.lock:
+            return sum(len(subscribers) for subscribers in self.subscribers.values())
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.EVENT_BROKER)()
+    return _broker
+
+
+def publish_to_user(user_id, event_type, data):
+    # Wait for the commit so clients never hear about rows they can't read yet
+    transaction.on_commit(lambda: get_broker().publish(user_channel(user_id), event_type, data))
+
+
+def notification_payload(notification):
+    return {
+        'id': notification.pk,
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'reference_id': notification.reference_id,
+        'is_read': notification.is_read,
+        'created_at': notification.created_at,
+    }
+
+
+def format_sse(event):
+    data = json.dumps(event['data'], cls=DjangoJSONEncoder)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
+
+
+def encode_event(event):
+    # JsonResponse can't serialize datetimes nested in the data dicts
+    return json.loads(json.dumps(event, cls=DjangoJSONEncoder))
+
+
+def authenticate_stream(request):
+    # EventSource can't send an Authorization header, so the access token
+    # may also come in the query string.
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else request.GET.get('token')
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def parse_event_id(value):
+    try:
+        return int(value) if value not in (None, '') else None
+    except (TypeError, ValueError):
+        return None
+
+
+async def sse_stream(channel, after):
+    broker = get_broker()
+    subscription = broker.subscribe(channel, after)
+    try:
+        yield f'retry: {settings.EVENT_RETRY_MS}\n\n'
+        while not subscription.closed:
+            event = await subscription.get(settings.EVENT_HEARTBEAT_SECONDS)
+            # Comment lines keep proxies from closing an idle connection
+            yield format_sse(event) if event is not None else ': keepalive\n\n'
+    finally:
+        broker.unsubscribe(subscription)
+
+
+async def wait_for_events(channel, after, timeout):
+    broker = get_broker()
+    subscription = broker.subscribe(channel, after)
+    try:
+        first = await subscription.get(timeout)
+        return [first] + subscription.drain() if first is not None else []
+    finally:
+        broker.unsubscribe(subscription)
@@ -0,0 +1,226 @@
+import csv
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import serializers
+
+from .models import ExportJob, WasteReport, PickupRequest
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 2000
+
+WASTE_REPORT_HEADER = [
+    'ID', 'Title', 'Description', 'Waste Type', 'Status',
+    'Location', 'Created At', 'Updated At'
+]
+WASTE_REPORT_FIELDS = (
+    'id', 'title', 'description', 'waste_type', 'status',
+    'address', 'created_at', 'updated_at'
+)
+
+PICKUP_REQUEST_HEADER = [
+    'ID', 'User', 'Waste Type', 'Pickup Date', 'Status',
+    'Address', 'Collector', 'Created At'
+]
+PICKUP_REQUEST_FIELDS = (
+    'id', 'user__username', 'waste_type', 'pickup_date', 'status',
+    'address', 'collector__name', 'created_at'
+)
+PICKUP_REQUEST_KEYS = (
+    'id', 'user', 'waste_type', 'pickup_date', 'status',
+    'address', 'collector', 'created_at'
+)
+
+_executor = ThreadPoolExecutor(max_workers=settings.EXPORT_JOB_WORKERS, thread_name_prefix='export')
+
+
+class Echo:
+    # csv.writer only needs an object with write(); hand each line straight back
+    def write(self, value):
+        return value
+
+
+def _parse_date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    # parse_date returns None for a malformed string but raises for an
+    # impossible date (2024-02-30) or a non-string
+    try:
+        parsed = parse_date(value)
+    except (ValueError, TypeError):
+        parsed = None
+    if parsed is None:
+        raise serializers.ValidationError({name: 'Enter a date in YYYY-MM-DD format.'})
+    return parsed
+
+
+def filter_waste_reports(queryset, params):
+    date_from = _parse_date_param(params, 'date_from')
+    date_to = _parse_date_param(params, 'date_to')
+    report_status = params.get('status')
+    waste_type = params.get('waste_type')
+
+    if date_from:
+        queryset = queryset.filter(created_at__date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(created_at__date__lte=date_to)
+    if report_status:
+        queryset = queryset.filter(status=report_status)
+    if waste_type:
+        queryset = queryset.filter(waste_type=waste_type)
+    return queryset
+
+
+def filter_pickup_requests(queryset, params):
+    date_from = _parse_date_param(params, 'date_from')
+    date_to = _parse_date_param(params, 'date_to')
+    pickup_status = params.get('status')
+    waste_type = params.get('waste_type')
+
+    if date_from:
+        queryset = queryset.filter(pickup_date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(pickup_date__lte=date_to)
+    if pickup_status:
+        queryset = queryset.filter(status=pickup_status)
+    if waste_type:
+        queryset = queryset.filter(waste_type=waste_type)
+    return queryset
+
+
+def waste_report_rows(queryset):
+    # values_list + iterator() keeps a server-side cursor open and never
+    # materialises model instances or the whole result set.
+    return queryset.order_by('id').values_list(*WASTE_REPORT_FIELDS).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+
+
+def pickup_request_rows(queryset):
+    # The user and collector names come from the same joined query
+    rows = queryset.order_by('id').values_list(*PICKUP_REQUEST_FIELDS).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+    collector_index = PICKUP_REQUEST_FIELDS.index('collector__name')
+    for row in rows:
+        if row[collector_index] is None:
+            row = row[:collector_index] + ('Not Assigned',) + row[collector_index + 1:]
+        yield row
+
+
+def stream_csv(header, rows, filename):
+    writer = csv.writer(Echo())
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def get_export_source(export_type, filters):
+    if export_type == 'waste_reports':
+        queryset = filter_waste_reports(WasteReport.objects.all(), filters)
+        return WASTE_REPORT_HEADER, WASTE_REPORT_FIELDS, waste_report_rows(queryset)
+    if export_type == 'pickup_requests':
+        queryset = filter_pickup_requests(PickupRequest.objects.all(), filters)
+        return PICKUP_REQUEST_HEADER, PICKUP_REQUEST_KEYS, pickup_request_rows(queryset)
+    raise ValueError(f'Unknown export type: {export_type}')
+
+
+def export_file_path(job):
+    return os.path.join(settings.EXPORT_ROOT, job.file_name)
+
+
+def _write_csv(handle, header, keys, rows):
+    writer = csv.writer(handle)
+    writer.writerow(header)
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def _write_jsonl(handle, header, keys, rows):
+    count = 0
+    for row in rows:
+        handle.write(json.dumps(dict(zip(keys, row)), cls=DjangoJSONEncoder))
+        handle.write('\n')
+        count += 1
+    return count
+
+
+WRITERS = {
+    'csv': _write_csv,
+    'jsonl': _write_jsonl,
+}
+
+
+def claimable_export_jobs():
+    # Pending jobs, and running ones claimed so long ago that their worker
+    # must have died with them
+    stale = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_STALE_SECONDS)
+    return ExportJob.objects.filter(Q(status='pending') | Q(status='running', updated_at__lt=stale))
+
+
+def run_export_job(job_id):
+    # Claim the job with a conditional UPDATE so that two workers never
+    # process the same job.
+    claimed = claimable_export_jobs().filter(pk=job_id).update(status='running', updated_at=timezone.now())
+    if not claimed:
+        return
+
+    job = ExportJob.objects.get(pk=job_id)
+    job.file_name = f'{job.export_type}-{job.pk}.{job.file_format}'
+    path = export_file_path(job)
+    temp_path = None
+
+    try:
+        os.makedirs(settings.EXPORT_ROOT, exist_ok=True)
+        header, keys, rows = get_export_source(job.export_type, job.filters)
+        # A temporary file of its own, in case a reclaimed job's first
+        # worker is in fact still writing
+        fd, temp_path = tempfile.mkstemp(dir=settings.EXPORT_ROOT, prefix=f'{job.file_name}.', suffix='.part')
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as handle:
+            job.row_count = WRITERS[job.file_format](handle, header, keys, rows)
+        os.replace(temp_path, path)
+        job.status = 'completed'
+    except Exception as exc:
+        logger.exception('Export job %s failed', job_id)
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+        job.file_name = ''
+        job.status = 'failed'
+        job.error = str(exc)
+
+    job.completed_at = timezone.now()
+    job.save()
+
+
+def _run_in_worker(job_id):
+    close_old_connections()
+    try:
+        run_export_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def enqueue_export_job(job):
+    transaction.on_commit(lambda: _executor.submit(_run_in_worker, job.pk))
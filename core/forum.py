@@ -0,0 +1,31 @@
+from django.db.models import Count, F, Max, Q, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import ForumTopic
+
+# ForumTopic.comment_count/last_activity_at are kept with single-row F()
+# updates, so concurrent comments never overwrite each other's changes.
+
+
+def comment_added(topic_id, created_at):
+    ForumTopic.objects.filter(pk=topic_id).update(
+        comment_count=F('comment_count') + 1,
+        last_activity_at=Greatest(F('last_activity_at'), Value(created_at))
+    )
+
+
+def comment_removed(topic_id):
+    # Activity never moves backwards; only the count drops
+    ForumTopic.objects.filter(pk=topic_id, comment_count__gt=0).update(
+        comment_count=F('comment_count') - 1
+    )
+
+
+def topic_stats(topics):
+    # Recomputed stats for drift repair and backfills
+    return topics.annotate(
+        approved_comments=Count('comments', filter=Q(comments__is_approved=True)),
+        latest_comment_at=Max('comments__created_at', filter=Q(comments__is_approved=True)),
+    ).annotate(
+        activity_at=Coalesce('latest_comment_at', 'created_at')
+    ).values_list('pk', 'approved_comments', 'activity_at')
@@ -0,0 +1,138 @@
+import math
+
+from django.db.models import FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Least, Power, Radians, Sin, Sqrt
+from rest_framework import serializers
+
+# Fixed lat/lng grid used as a portable spatial index (no PostGIS needed).
+# Each cell is GRID_SIZE degrees square; cells are numbered row-major so the
+# cells of one grid row form a contiguous integer range.
+GRID_SIZE = 0.05
+GRID_COLUMNS = int(round(360 / GRID_SIZE))
+GRID_ROWS = int(round(180 / GRID_SIZE))
+
+# Beyond this many grid rows a bbox is filtered on lat/lng alone
+MAX_GRID_ROWS = 200
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_RADIUS_KM = 5
+MAX_RADIUS_KM = 200
+
+
+def grid_row(lat):
+    return min(max(int(math.floor((float(lat) + 90) / GRID_SIZE)), 0), GRID_ROWS - 1)
+
+
+def grid_column(lng):
+    return min(max(int(math.floor((float(lng) + 180) / GRID_SIZE)), 0), GRID_COLUMNS - 1)
+
+
+def grid_cell(lat, lng):
+    if lat is None or lng is None:
+        return None
+    return grid_row(lat) * GRID_COLUMNS + grid_column(lng)
+
+
+def grid_cell_filter(min_lat, min_lng, max_lat, max_lng, field='grid_cell'):
+    first_row, last_row = grid_row(min_lat), grid_row(max_lat)
+    if last_row - first_row + 1 > MAX_GRID_ROWS:
+        return None
+    first_column, last_column = grid_column(min_lng), grid_column(max_lng)
+
+    condition = Q()
+    for row in range(first_row, last_row + 1):
+        base = row * GRID_COLUMNS
+        condition |= Q(**{f'{field}__range': (base + first_column, base + last_column)})
+    return condition
+
+
+def filter_bbox(queryset, min_lat, min_lng, max_lat, max_lng):
+    cells = grid_cell_filter(min_lat, min_lng, max_lat, max_lng)
+    if cells is not None:
+        queryset = queryset.filter(cells)
+    # The grid is coarse; trim the cell edges with the exact coordinates
+    return queryset.filter(
+        latitude__range=(min_lat, max_lat),
+        longitude__range=(min_lng, max_lng)
+    )
+
+
+def radius_bbox(lat, lng, radius_km):
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(lat))
+    lng_delta = 180.0 if cos_lat < 1e-6 else min(math.degrees(radius_km / (EARTH_RADIUS_KM * cos_lat)), 180.0)
+    return (
+        max(lat - lat_delta, -90.0),
+        max(lng - lng_delta, -180.0),
+        min(lat + lat_delta, 90.0),
+        min(lng + lng_delta, 180.0),
+    )
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = map(math.radians, (float(lat1), float(lng1), float(lat2), float(lng2)))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2 +
+        math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _parse_floats(value, count, name):
+    try:
+        numbers = [float(part) for part in value.split(',')]
+    except (AttributeError, ValueError):
+        numbers = []
+    if len(numbers) != count or not all(math.isfinite(number) for number in numbers):
+        raise serializers.ValidationError({name: f'Expected {count} comma-separated numbers.'})
+    return numbers
+
+
+def _validate_point(lat, lng, name):
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise serializers.ValidationError({name: 'Coordinates are out of range.'})
+
+
+def parse_bbox(value):
+    # ?bbox=min_lat,min_lng,max_lat,max_lng
+    min_lat, min_lng, max_lat, max_lng = _parse_floats(value, 4, 'bbox')
+    _validate_point(min_lat, min_lng, 'bbox')
+    _validate_point(max_lat, max_lng, 'bbox')
+    if min_lat > max_lat or min_lng > max_lng:
+        raise serializers.ValidationError({'bbox': 'Minimum corner must come before maximum corner.'})
+    return min_lat, min_lng, max_lat, max_lng
+
+
+def parse_near(value, radius=DEFAULT_RADIUS_KM):
+    # ?near=lat,lng&radius_km=5
+    lat, lng = _parse_floats(value, 2, 'near')
+    _validate_point(lat, lng, 'near')
+    try:
+        radius_km = float(radius)
+    except (TypeError, ValueError):
+        raise serializers.ValidationError({'radius_km': 'A number is required.'})
+    if not 0 < radius_km <= MAX_RADIUS_KM:
+        raise serializers.ValidationError({'radius_km': f'Must be between 0 and {MAX_RADIUS_KM}.'})
+    return lat, lng, radius_km
+
+
+def distance_km_expression(lat, lng, lat_field='latitude', lng_field='longitude'):
+    # haversine_km as SQL, so rows can be filtered, ordered and limited by
+    # distance in the database
+    lat_r, lng_r = math.radians(lat), math.radians(lng)
+    row_lat = Radians(Cast(lat_field, FloatField()))
+    row_lng = Radians(Cast(lng_field, FloatField()))
+    a = (
+        Power(Sin((row_lat - Value(lat_r)) / Value(2.0)), 2) +
+        Value(math.cos(lat_r)) * Cos(row_lat) * Power(Sin((row_lng - Value(lng_r)) / Value(2.0)), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(Least(a, Value(1.0))))
+
+
+def nearest(queryset, lat, lng, radius_km):
+    # Index-backed bbox prefilter, then the exact great-circle distance as a
+    # `distance_km` annotation; callers order by it (and page on it)
+    candidates = filter_bbox(queryset, *radius_bbox(lat, lng, radius_km))
+    return candidates.annotate(
+        distance_km=distance_km_expression(lat, lng)
+    ).filter(distance_km__lte=radius_km)
@@ -0,0 +1,50 @@
+import os
+
+from django.conf import settings
+from PIL import Image, ImageOps
+
+# (name, longest edge in pixels)
+VARIANTS = (
+    ('thumbnail', 320),
+    ('medium', 1024),
+    ('full', 2048),
+)
+
+
+def render_variants(source_path, stem):
+    # Re-encode the image at each variant size. Orientation from EXIF is
+    # applied first and no metadata is written back, so GPS and camera tags
+    # never leave the server. Raises PIL.UnidentifiedImageError/OSError for
+    # files Pillow cannot read.
+    image_format = settings.IMAGE_VARIANT_FORMAT
+    extension = 'jpg' if image_format == 'JPEG' else image_format.lower()
+    largest = max(edge for _, edge in VARIANTS)
+    directory = os.path.dirname(source_path)
+
+    variants = []
+    with Image.open(source_path) as original:
+        # Let the JPEG decoder downscale while decoding when it can
+        original.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        target_mode = 'RGBA' if has_alpha and image_format != 'JPEG' else 'RGB'
+        if image.mode != target_mode:
+            image = image.convert(target_mode)
+
+        for name, edge in VARIANTS:
+            variant = image.copy()
+            variant.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            path = os.path.join(directory, f'{stem}_{name}.{extension}')
+            options = {'quality': settings.IMAGE_VARIANT_QUALITY}
+            if image_format == 'JPEG':
+                options.update(optimize=True, progressive=True)
+            variant.save(path, format=image_format, **options)
+            variants.append({
+                'name': name,
+                'path': path,
+                'width': variant.width,
+                'height': variant.height,
+                'bytes': os.path.getsize(path),
+                'format': extension,
+            })
+    return variants
@@ -0,0 +1,166 @@
+import atexit
+import logging
+import threading
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .geo import haversine_km
+from .models import WasteCollector, CollectorLocation
+
+logger = logging.getLogger(__name__)
+
+LOCATION_KEY = 'collector:location:{}'
+LOCATION_TIMEOUT = 60 * 60 * 24
+COORDINATE_PLACES = Decimal('0.000001')
+
+
+def _location_key(collector_id):
+    return LOCATION_KEY.format(collector_id)
+
+
+class LocationBuffer:
+    # Write-behind store for collector GPS pings. The latest position per
+    # collector lives in the cache; this process remembers which collectors
+    # it has touched and writes them to the database in one bulk_update per
+    # interval. Other workers see a ping at once only with a shared cache
+    # backend (see CACHES); with the default locmem cache they read the
+    # database columns, which trail by up to a flush interval.
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dirty = set()
+        self.history = []
+        self.last_kept = {}
+        self.timer = None
+
+    def ingest(self, pings):
+        # Keep only the newest ping per collector from this batch
+        latest = {}
+        for ping in pings:
+            current = latest.get(ping['collector_id'])
+            if current is None or ping['recorded_at'] >= current['recorded_at']:
+                latest[ping['collector_id']] = ping
+
+        keys = {_location_key(collector_id): collector_id for collector_id in latest}
+        cached = cache.get_many(list(keys))
+        updates = {}
+        for key, collector_id in keys.items():
+            ping = latest[collector_id]
+            previous = cached.get(key)
+            if previous is not None and parse_datetime(previous['recorded_at']) > ping['recorded_at']:
+                continue
+            updates[key] = {
+                'latitude': ping['latitude'],
+                'longitude': ping['longitude'],
+                'recorded_at': ping['recorded_at'].isoformat(),
+            }
+        cache.set_many(updates, LOCATION_TIMEOUT)
+
+        with self.lock:
+            self.dirty.update(keys[key] for key in updates)
+            if settings.COLLECTOR_LOCATION_HISTORY:
+                self._thin_history(pings)
+            self._schedule()
+        return len(updates)
+
+    def _thin_history(self, pings):
+        # Drop pings that moved less than the threshold since the last kept
+        # one, so parked trucks don't fill the history table.
+        threshold_km = settings.COLLECTOR_LOCATION_HISTORY_MIN_METERS / 1000
+        for ping in sorted(pings, key=lambda p: p['recorded_at']):
+            previous = self.last_kept.get(ping['collector_id'])
+            if previous is not None:
+                if ping['recorded_at'] <= previous['recorded_at']:
+                    continue
+                if haversine_km(previous['latitude'], previous['longitude'],
+                                ping['latitude'], ping['longitude']) < threshold_km:
+                    continue
+            self.last_kept[ping['collector_id']] = ping
+            self.history.append(ping)
+
+    def _schedule(self):
+        if self.timer is None:
+            self.timer = threading.Timer(settings.COLLECTOR_LOCATION_FLUSH_INTERVAL, self._flush_in_background)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _flush_in_background(self):
+        close_old_connections()
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Collector location flush failed')
+        finally:
+            close_old_connections()
+
+    def flush(self):
+        with self.lock:
+            dirty, self.dirty = self.dirty, set()
+            history, self.history = self.history, []
+            self.timer = None
+
+        try:
+            with transaction.atomic():
+                if dirty:
+                    positions = latest_positions(dirty)
+                    collectors = []
+                    for collector_id, position in positions.items():
+                        collectors.append(WasteCollector(
+                            pk=collector_id,
+                            current_location_lat=Decimal(str(position['latitude'])).quantize(COORDINATE_PLACES),
+                            current_location_lng=Decimal(str(position['longitude'])).quantize(COORDINATE_PLACES),
+                            location_updated_at=parse_datetime(position['recorded_at']),
+                        ))
+                    WasteCollector.objects.bulk_update(
+                        collectors,
+                        ['current_location_lat', 'current_location_lng', 'location_updated_at'],
+                        batch_size=500
+                    )
+
+                if history:
+                    # Collectors deleted since the ping would fail every retry
+                    existing = set(WasteCollector.objects.filter(
+                        pk__in={ping['collector_id'] for ping in history}
+                    ).values_list('pk', flat=True))
+                    CollectorLocation.objects.bulk_create([
+                        CollectorLocation(
+                            collector_id=ping['collector_id'],
+                            latitude=Decimal(str(ping['latitude'])).quantize(COORDINATE_PLACES),
+                            longitude=Decimal(str(ping['longitude'])).quantize(COORDINATE_PLACES),
+                            recorded_at=ping['recorded_at'],
+                        )
+                        for ping in history if ping['collector_id'] in existing
+                    ], batch_size=1000)
+        except Exception:
+            # Put the work back so the next flush retries it; the cached
+            # positions are still there to be read again
+            with self.lock:
+                self.dirty.update(dirty)
+                self.history[:0] = history
+                self._schedule()
+            raise
+
+        return len(dirty), len(history)
+
+
+def latest_positions(collector_ids):
+    keys = {_location_key(collector_id): collector_id for collector_id in collector_ids}
+    return {keys[key]: value for key, value in cache.get_many(list(keys)).items()}
+
+
+def normalize_ping(ping):
+    return {
+        'collector_id': ping['collector_id'],
+        'latitude': round(ping['latitude'], 6),
+        'longitude': round(ping['longitude'], 6),
+        'recorded_at': ping.get('recorded_at') or timezone.now(),
+    }
+
+
+buffer = LocationBuffer()
+atexit.register(buffer._flush_in_background)
@@ -0,0 +1,20 @@
+import glob
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.metrics import FILE_PATTERN
+
+
+class Command(BaseCommand):
+    help = 'Delete the request metric files (per-process and archived) in METRICS_DIR; run before starting the server'
+
+    def handle(self, *args, **options):
+        if not settings.METRICS_DIR:
+            self.stdout.write('METRICS_DIR is not set; nothing to clear')
+            return
+        paths = glob.glob(os.path.join(settings.METRICS_DIR, FILE_PATTERN))
+        for path in paths:
+            os.remove(path)
+        self.stdout.write(f'Deleted {len(paths)} metric files')
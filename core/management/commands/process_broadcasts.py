@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.models import NotificationBroadcast
+from core.notifications import claimable_broadcasts, run_broadcast
+
+
+class Command(BaseCommand):
+    help = (
+        'Run pending notification broadcasts and resume running ones whose worker stopped, '
+        'e.g. ones left behind by a restarted web worker'
+    )
+
+    def handle(self, *args, **options):
+        broadcast_ids = list(claimable_broadcasts().order_by('created_at').values_list('id', flat=True))
+        for broadcast_id in broadcast_ids:
+            run_broadcast(broadcast_id)
+            broadcast = NotificationBroadcast.objects.get(pk=broadcast_id)
+            self.stdout.write(
+                f'Broadcast {broadcast_id}: {broadcast.status} '
+                f'({broadcast.sent_count}/{broadcast.total_recipients} sent)'
+            )
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.exports import claimable_export_jobs, run_export_job
+from core.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Run pending export jobs and re-run ones whose worker died, e.g. in a restarted web worker'
+
+    def handle(self, *args, **options):
+        job_ids = list(
+            claimable_export_jobs().order_by('created_at').values_list('id', flat=True)
+        )
+        for job_id in job_ids:
+            run_export_job(job_id)
+            job = ExportJob.objects.get(pk=job_id)
+            self.stdout.write(f'Export job {job_id}: {job.status} ({job.row_count} rows)')
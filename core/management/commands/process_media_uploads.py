@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from core.media import claimable_media, claimable_profile_pictures, process_media_upload, process_profile_picture
+from core.models import UserProfile, WasteReportMedia
+
+
+class Command(BaseCommand):
+    help = (
+        'Upload queued report media and profile pictures, and re-upload ones whose worker died, '
+        'e.g. files left behind by a restarted web worker'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='Re-queue failed uploads first')
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            WasteReportMedia.objects.filter(upload_status='failed').update(upload_status='pending', upload_error='')
+            UserProfile.objects.filter(picture_upload_status='failed').update(
+                picture_upload_status='pending', picture_upload_error=''
+            )
+
+        media_ids = list(
+            claimable_media().order_by('id').values_list('id', flat=True)
+        )
+        for media_id in media_ids:
+            process_media_upload(media_id)
+            media = WasteReportMedia.objects.get(pk=media_id)
+            self.stdout.write(f'Report media {media_id}: {media.upload_status}')
+
+        profile_ids = list(
+            claimable_profile_pictures().order_by('id').values_list('id', flat=True)
+        )
+        for profile_id in profile_ids:
+            process_profile_picture(profile_id)
+            profile = UserProfile.objects.get(pk=profile_id)
+            self.stdout.write(f'Profile picture {profile_id}: {profile.picture_upload_status}')
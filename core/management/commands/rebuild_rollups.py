@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.rollups import rebuild_all
+
+
+class Command(BaseCommand):
+    help = 'Recompute the daily report and pickup rollup tables from their source tables'
+
+    def handle(self, *args, **options):
+        for label, buckets in rebuild_all().items():
+            self.stdout.write(f'{label}: {buckets} daily buckets')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import EducationalContent, FAQ, ForumTopic, SearchDocument
+from core.search import build_documents
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the /api/search/ document table from educational content, FAQs and forum topics'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            SearchDocument.objects.all().delete()
+            total = 0
+            for model in (EducationalContent, FAQ, ForumTopic):
+                documents = build_documents(model.objects.iterator(chunk_size=500))
+                SearchDocument.objects.bulk_create(documents, batch_size=500)
+                total += len(documents)
+        self.stdout.write(f'Indexed {total} search documents')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.forum import topic_stats
+from core.models import ForumTopic
+
+
+class Command(BaseCommand):
+    help = 'Recompute every forum topic\'s comment_count and last_activity_at from its comments'
+
+    def handle(self, *args, **options):
+        topics = [
+            ForumTopic(pk=pk, comment_count=count, last_activity_at=activity_at)
+            for pk, count, activity_at in topic_stats(ForumTopic.objects.all())
+        ]
+        ForumTopic.objects.bulk_update(topics, ['comment_count', 'last_activity_at'], batch_size=500)
+        self.stdout.write(f'Resynced {len(topics)} forum topics')
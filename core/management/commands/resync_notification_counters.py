@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+
+from core.models import CustomUser, NotificationCounter
+
+
+class Command(BaseCommand):
+    help = 'Recompute every user\'s unread notification counter from the notifications table'
+
+    def handle(self, *args, **options):
+        rows = CustomUser.objects.annotate(
+            unread=Count('notification', filter=Q(notification__is_read=False))
+        ).values_list('pk', 'unread')
+        with transaction.atomic():
+            counters = [NotificationCounter(user_id=pk, unread=unread) for pk, unread in rows]
+            NotificationCounter.objects.bulk_create(
+                counters,
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=['user'],
+                update_fields=['unread']
+            )
+        self.stdout.write(f'Resynced {len(counters)} notification counters')
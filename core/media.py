@@ -0,0 +1,257 @@
+import logging
+import os
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from cloudinary import CloudinaryResource, uploader
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from PIL import UnidentifiedImageError
+
+from .images import render_variants
+from .models import UserProfile, WasteReportMedia
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=settings.MEDIA_UPLOAD_WORKERS, thread_name_prefix='media-upload')
+
+
+class CloudinaryUploadBackend:
+    def upload(self, path, field):
+        options = {'type': field.type, 'resource_type': field.resource_type, **field.options}
+        return uploader.upload_resource(path, **options).get_prep_value()
+
+    def url(self, name, field):
+        # Accepts a stored name or the CloudinaryResource a field loads
+        return field.to_python(name).url
+
+
+class LocalUploadBackend:
+    # Filesystem stand-in for Cloudinary, used in development and tests
+    def upload(self, path, field):
+        name = os.path.join(field.options.get('folder', ''), os.path.basename(path))
+        destination = os.path.join(settings.MEDIA_ROOT, name)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(path, destination)
+        return name
+
+    def url(self, name, field):
+        if isinstance(name, CloudinaryResource):
+            name = f'{name.public_id}.{name.format}' if name.format else name.public_id
+        return settings.MEDIA_URL + name
+
+
+def get_upload_backend():
+    return import_string(settings.MEDIA_UPLOAD_BACKEND)()
+
+
+def upload_image_variants(path, field, backend=None):
+    # Returns None when Pillow cannot read the file, so callers can fall back
+    # to storing it untouched (e.g. formats Pillow has no decoder for).
+    backend = backend or get_upload_backend()
+    stem = os.path.splitext(os.path.basename(path))[0]
+    try:
+        rendered = render_variants(path, stem)
+    except (UnidentifiedImageError, OSError):
+        logger.warning('Could not process image %s; storing original', path)
+        return None
+
+    variants = {}
+    try:
+        for variant in rendered:
+            name = backend.upload(variant['path'], field)
+            variants[variant['name']] = {
+                'name': name,
+                'url': backend.url(name, field),
+                'width': variant['width'],
+                'height': variant['height'],
+                'bytes': variant['bytes'],
+                'format': variant['format'],
+            }
+    finally:
+        for variant in rendered:
+            if os.path.exists(variant['path']):
+                os.remove(variant['path'])
+    return variants
+
+
+def stage_file(uploaded_file):
+    os.makedirs(settings.MEDIA_STAGING_ROOT, exist_ok=True)
+    extension = os.path.splitext(uploaded_file.name)[1].lower()
+    path = os.path.join(settings.MEDIA_STAGING_ROOT, f'{uuid.uuid4().hex}{extension}')
+    with open(path, 'wb') as handle:
+        for chunk in uploaded_file.chunks():
+            handle.write(chunk)
+    return path
+
+
+def queue_report_media(waste_report, uploaded_files):
+    # Files are written to local staging and recorded as pending rows; the
+    # rows are the durable queue, so a restart loses nothing.
+    media = WasteReportMedia.objects.bulk_create([
+        WasteReportMedia(
+            waste_report=waste_report,
+            media_type='video' if (file.content_type or '').startswith('video') else 'image',
+            upload_status='pending',
+            staged_path=stage_file(file),
+            original_name=file.name[:255]
+        )
+        for file in uploaded_files
+    ])
+    for item in media:
+        enqueue_media_upload(item.pk)
+    return media
+
+
+def _claimable(status_field, claimed_at_field):
+    # Pending uploads, and ones claimed so long ago that their worker must
+    # have died (rows claimed before claims were timestamped included)
+    stale = timezone.now() - timedelta(seconds=settings.MEDIA_UPLOAD_STALE_SECONDS)
+    return Q(**{status_field: 'pending'}) | (
+        Q(**{status_field: 'uploading'}) &
+        (Q(**{f'{claimed_at_field}__lt': stale}) | Q(**{f'{claimed_at_field}__isnull': True}))
+    )
+
+
+def claimable_media():
+    return WasteReportMedia.objects.filter(_claimable('upload_status', 'upload_claimed_at'))
+
+
+def claimable_profile_pictures():
+    return UserProfile.objects.filter(_claimable('picture_upload_status', 'picture_claimed_at'))
+
+
+def _claim_lost(media_id, claimed_at):
+    # Another worker reclaimed the upload as stale; it now owns the row and
+    # the staged file
+    return not WasteReportMedia.objects.select_for_update().filter(
+        pk=media_id, upload_claimed_at=claimed_at
+    ).exists()
+
+
+def process_media_upload(media_id):
+    claimed_at = timezone.now()
+    claimed = claimable_media().filter(pk=media_id).update(upload_status='uploading', upload_claimed_at=claimed_at)
+    if not claimed:
+        return
+
+    media = WasteReportMedia.objects.get(pk=media_id)
+    field = WasteReportMedia._meta.get_field('file')
+    backend = get_upload_backend()
+    try:
+        variants = None
+        if media.media_type == 'image':
+            variants = upload_image_variants(media.staged_path, field, backend)
+        if variants:
+            media.file = variants['full']['name']
+            media.variants = variants
+        else:
+            media.file = backend.upload(media.staged_path, field)
+    except Exception as exc:
+        logger.exception('Upload of report media %s failed', media_id)
+        with transaction.atomic():
+            if _claim_lost(media_id, claimed_at):
+                return
+            media.upload_status = 'failed'
+            media.upload_error = str(exc)
+            media.save(update_fields=['upload_status', 'upload_error'])
+        return
+
+    staged_path = media.staged_path
+    with transaction.atomic():
+        if _claim_lost(media_id, claimed_at):
+            return
+        media.upload_status = 'uploaded'
+        media.upload_error = ''
+        media.staged_path = ''
+        media.save(update_fields=['file', 'variants', 'upload_status', 'upload_error', 'staged_path'])
+    try:
+        os.remove(staged_path)
+    except FileNotFoundError:
+        pass
+
+
+def stage_profile_picture(uploaded_file):
+    # Fields to save on the profile; enqueue_profile_picture_upload once saved
+    return {
+        'picture_staged_path': stage_file(uploaded_file),
+        'picture_upload_status': 'pending',
+        'picture_upload_error': '',
+    }
+
+
+def process_profile_picture(profile_id):
+    claimed = claimable_profile_pictures().filter(pk=profile_id).update(
+        picture_upload_status='uploading', picture_claimed_at=timezone.now()
+    )
+    if not claimed:
+        return
+
+    profile = UserProfile.objects.get(pk=profile_id)
+    staged_path = profile.picture_staged_path
+    field = UserProfile._meta.get_field('profile_picture')
+    backend = get_upload_backend()
+    try:
+        variants = upload_image_variants(staged_path, field, backend)
+        name = variants['full']['name'] if variants else backend.upload(staged_path, field)
+    except Exception as exc:
+        logger.exception('Upload of profile picture %s failed', profile_id)
+        with transaction.atomic():
+            if _picture_superseded(profile_id, staged_path):
+                return
+            profile.picture_upload_status = 'failed'
+            profile.picture_upload_error = str(exc)
+            profile.save(update_fields=['picture_upload_status', 'picture_upload_error'])
+        return
+
+    with transaction.atomic():
+        if _picture_superseded(profile_id, staged_path):
+            return
+        profile.profile_picture = name
+        profile.profile_picture_variants = variants or {}
+        profile.picture_upload_status = 'uploaded'
+        profile.picture_upload_error = ''
+        profile.picture_staged_path = ''
+        profile.save(update_fields=[
+            'profile_picture', 'profile_picture_variants', 'picture_upload_status', 'picture_upload_error',
+            'picture_staged_path'
+        ])
+    try:
+        os.remove(staged_path)
+    except FileNotFoundError:
+        pass
+
+
+def _picture_superseded(profile_id, staged_path):
+    # A newer picture was staged while this one uploaded; that one wins
+    current = UserProfile.objects.select_for_update().filter(pk=profile_id).values_list(
+        'picture_staged_path', flat=True
+    ).first()
+    if current == staged_path:
+        return False
+    try:
+        os.remove(staged_path)
+    except FileNotFoundError:
+        pass
+    return True
+
+
+def _run_in_worker(process, object_id):
+    close_old_connections()
+    try:
+        process(object_id)
+    finally:
+        close_old_connections()
+
+
+def enqueue_media_upload(media_id):
+    transaction.on_commit(lambda: _executor.submit(_run_in_worker, process_media_upload, media_id))
+
+
+def enqueue_profile_picture_upload(profile_id):
+    transaction.on_commit(lambda: _executor.submit(_run_in_worker, process_profile_picture, profile_id))
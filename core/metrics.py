@@ -0,0 +1,365 @@
+import atexit
+import glob
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+try:
+    import fcntl
+except ImportError:  # Windows: dead workers' files are left for clear_metrics
+    fcntl = None
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# name -> (help text, bucket upper bounds)
+HISTOGRAMS = {
+    'wms_http_request_duration_seconds': (
+        'Wall time spent handling the request.',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'wms_http_request_db_seconds': (
+        'Time spent waiting on database queries during the request.',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    ),
+    'wms_http_request_queries': (
+        'Database queries run during the request.',
+        (0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+    ),
+    'wms_http_response_bytes': (
+        'Size of the response body; streamed responses are not measured.',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    ),
+}
+RESPONSES = 'wms_http_responses_total'
+LABELS = ('view', 'action', 'method')
+# Requests that matched no URL share one label value
+UNRESOLVED = '<unresolved>'
+FILE_PATTERN = 'metrics-*.json'
+# Totals of workers that have exited, folded into one file
+ARCHIVE_FILE = 'metrics-archive.json'
+LOCK_FILE = '.metrics.lock'
+HOST = socket.gethostname()
+
+
+class QueryTimer:
+    # Counts one request's queries and sums their time
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.queries += 1
+
+
+class MetricsRegistry:
+    # In-process histograms, keyed by (view, action, method). Each process
+    # writes its totals to its own file under METRICS_DIR every flush
+    # interval; the metrics endpoint sums every file it finds there, so the
+    # figures cover all workers. Files are named by host, pid and a token
+    # unique to the process, so a recycled pid never overwrites the totals
+    # of the worker that had it. When collecting, the files of this host's
+    # exited workers are folded into one archive file, so totals only go up
+    # until the directory is cleared (clear_metrics).
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.responses = {}
+        self.timer = None
+        self.token = uuid.uuid4().hex
+
+    def observe(self, labels, status, values):
+        with self.lock:
+            series = self.histograms.setdefault(labels, {})
+            for name, value in values.items():
+                bounds = HISTOGRAMS[name][1]
+                # Per-bucket (not cumulative) counts, then sum and count
+                histogram = series.setdefault(name, [0] * (len(bounds) + 1) + [0.0, 0])
+                histogram[_bucket(bounds, value)] += 1
+                histogram[-2] += value
+                histogram[-1] += 1
+            key = (*labels, str(status))
+            self.responses[key] = self.responses.get(key, 0) + 1
+            self._schedule()
+
+    def _schedule(self):
+        if self.timer is None and settings.METRICS_DIR:
+            self.timer = threading.Timer(settings.METRICS_FLUSH_INTERVAL, self._flush_in_background)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Metrics flush failed')
+
+    def snapshot(self):
+        with self.lock:
+            self.timer = None
+            return {
+                'histograms': [
+                    [list(labels), {name: list(values) for name, values in series.items()}]
+                    for labels, series in self.histograms.items()
+                ],
+                'responses': [[list(key), count] for key, count in self.responses.items()],
+            }
+
+    def file_name(self):
+        return f'metrics-{HOST}-{os.getpid()}-{self.token}.json'
+
+    def flush(self):
+        if not settings.METRICS_DIR:
+            return
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        _write_json(os.path.join(settings.METRICS_DIR, self.file_name()), self.snapshot())
+
+    def collect(self):
+        # Every process's totals summed; this process's are written first
+        # so they are current
+        if not settings.METRICS_DIR:
+            return _merge([self.snapshot()])
+        self.flush()
+        with _directory_lock():
+            fold_exited_workers()
+            return _merge(_read_snapshots(glob.glob(os.path.join(settings.METRICS_DIR, FILE_PATTERN))))
+
+
+def _write_json(path, data):
+    # Write then rename, so a reader never sees half a file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as tmp:
+        json.dump(data, tmp)
+    os.replace(tmp_path, path)
+
+
+def _read_snapshots(paths):
+    snapshots = []
+    for path in paths:
+        try:
+            with open(path) as metrics_file:
+                snapshots.append(json.load(metrics_file))
+        except (OSError, ValueError):
+            logger.warning('Skipping unreadable metrics file %s', path)
+    return snapshots
+
+
+@contextmanager
+def _directory_lock():
+    # Serialises folding between the workers sharing METRICS_DIR
+    if fcntl is None:
+        yield False
+        return
+    with open(os.path.join(settings.METRICS_DIR, LOCK_FILE), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _exited_worker_files():
+    # Only this host's files: pids mean nothing across machines
+    prefix = f'metrics-{HOST}-'
+    exited = []
+    for path in glob.glob(os.path.join(glob.escape(settings.METRICS_DIR), glob.escape(prefix) + '*.json')):
+        pid = os.path.basename(path)[len(prefix):].split('-', 1)[0]
+        if pid.isdigit() and not _process_exists(int(pid)):
+            exited.append(path)
+    return exited
+
+
+def fold_exited_workers():
+    # Adds the totals of exited workers to the archive file, then deletes
+    # their files. The archive lists what it has absorbed, so a crash
+    # between the two steps can't count a file twice. Call with the
+    # directory lock held.
+    if fcntl is None:
+        return
+    archive_path = os.path.join(settings.METRICS_DIR, ARCHIVE_FILE)
+    archive = (_read_snapshots([archive_path]) if os.path.exists(archive_path) else []) or [
+        {'histograms': [], 'responses': []}
+    ]
+    archive = archive[0]
+    folded = [path for path in archive.get('folded', []) if os.path.exists(path)]
+    for path in folded:
+        os.remove(path)
+
+    exited = _exited_worker_files()
+    if not exited:
+        return
+    histograms, responses = _merge([archive, *_read_snapshots(exited)])
+    _write_json(archive_path, {
+        'histograms': [[list(labels), series] for labels, series in histograms.items()],
+        'responses': [[list(key), count] for key, count in responses.items()],
+        'folded': exited,
+    })
+    for path in exited:
+        os.remove(path)
+
+
+def _bucket(bounds, value):
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            return index
+    return len(bounds)
+
+
+def _merge(snapshots):
+    histograms = {}
+    responses = {}
+    for snapshot in snapshots:
+        for labels, series in snapshot['histograms']:
+            merged = histograms.setdefault(tuple(labels), {})
+            for name, values in series.items():
+                if name in merged:
+                    merged[name] = [a + b for a, b in zip(merged[name], values)]
+                else:
+                    merged[name] = list(values)
+        for key, count in snapshot['responses']:
+            responses[tuple(key)] = responses.get(tuple(key), 0) + count
+    return histograms, responses
+
+
+def _label_text(names, values):
+    escaped = (
+        str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        for value in values
+    )
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(histograms, responses):
+    # Prometheus text exposition format 0.0.4
+    lines = []
+    for name, (help_text, bounds) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for labels in sorted(histograms):
+            values = histograms[labels].get(name)
+            if values is None:
+                continue
+            label_text = _label_text(LABELS, labels)
+            cumulative = 0
+            for bound, count in zip((*bounds, '+Inf'), values):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{{label_text}}} {_number(values[-2])}')
+            lines.append(f'{name}_count{{{label_text}}} {values[-1]}')
+
+    lines += [f'# HELP {RESPONSES} Responses by status code.', f'# TYPE {RESPONSES} counter']
+    for key in sorted(responses):
+        lines.append(f'{RESPONSES}{{{_label_text((*LABELS, "status"), key)}}} {responses[key]}')
+    return '\n'.join(lines) + '\n'
+
+
+def request_labels(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return (UNRESOLVED, '', request.method)
+    # Viewsets map the HTTP method to an action (list, create, analytics...)
+    actions = getattr(match.func, 'actions', None) or {}
+    return (match.view_name, actions.get(request.method.lower(), ''), request.method)
+
+
+def record(request, response, started, query_timer):
+    values = {
+        'wms_http_request_duration_seconds': time.perf_counter() - started,
+        'wms_http_request_db_seconds': query_timer.seconds,
+        'wms_http_request_queries': query_timer.queries,
+    }
+    if not response.streaming:
+        values['wms_http_response_bytes'] = len(response.content)
+    registry.observe(request_labels(request), response.status_code, values)
+
+
+# The running request's QueryTimer. asgiref copies the context into
+# sync_to_async threads, so queries a sync view runs under ASGI are still
+# attributed to the request that awaited it.
+_current_timer = ContextVar('query_timer', default=None)
+
+
+def _time_query(execute, sql, params, many, context):
+    query_timer = _current_timer.get()
+    if query_timer is None:
+        return execute(sql, params, many, context)
+    return query_timer(execute, sql, params, many, context)
+
+
+def install_query_hook(connection):
+    # Installed on each connection as it is opened, on whichever thread
+    # opens it; connections are per thread, so a wrapper added around the
+    # request on the middleware's thread would miss sync views under ASGI.
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+class RequestMetricsMiddleware:
+    # Times every request and counts its queries; see MetricsRegistry.
+    # Streaming responses are timed until the view returns, not until the
+    # last chunk is sent. Runs natively under ASGI too, so the async event
+    # views aren't pushed onto a thread.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        query_timer = QueryTimer()
+        token = _current_timer.set(query_timer)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        record(request, response, started, query_timer)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        query_timer = QueryTimer()
+        token = _current_timer.set(query_timer)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timer.reset(token)
+        record(request, response, started, query_timer)
+        return response
+
+
+registry = MetricsRegistry()
+atexit.register(registry._flush_in_background)
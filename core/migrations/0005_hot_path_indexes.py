@@ -0,0 +1,45 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_exportjob'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='forumtopic',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['created_at'], name='forumtopic_approved_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at'], name='notification_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', 'created_at'], name='notification_unread_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pickuprequest',
+            index=models.Index(fields=['user', 'created_at'], name='pickup_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pickuprequest',
+            index=models.Index(fields=['status', 'created_at'], name='pickup_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pickuprequest',
+            index=models.Index(fields=['user', 'pickup_date', 'status'], name='pickup_user_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wastereport',
+            index=models.Index(fields=['user', 'created_at'], name='wastereport_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wastereport',
+            index=models.Index(fields=['status', 'created_at'], name='wastereport_status_created_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:53
+
+from django.db import migrations, models
+
+from core.geo import grid_cell
+
+
+def backfill_grid_cells(apps, schema_editor):
+    for model_name in ('WasteReport', 'PickupRequest'):
+        model = apps.get_model('core', model_name)
+        batch = []
+        for obj in model.objects.only('id', 'latitude', 'longitude').iterator(chunk_size=2000):
+            obj.grid_cell = grid_cell(obj.latitude, obj.longitude)
+            batch.append(obj)
+            if len(batch) >= 2000:
+                model.objects.bulk_update(batch, ['grid_cell'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['grid_cell'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pickuprequest',
+            name='grid_cell',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='wastereport',
+            name='grid_cell',
+            field=models.IntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_grid_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_grid_cell'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wastecollector',
+            name='location_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='CollectorLocation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('longitude', models.DecimalField(decimal_places=6, max_digits=9)),
+                ('recorded_at', models.DateTimeField()),
+                ('collector', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='locations', to='core.wastecollector')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['collector', 'recorded_at'], name='collectorloc_time_idx')],
+            },
+        ),
+    ]
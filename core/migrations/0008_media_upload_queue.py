@@ -0,0 +1,39 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:56
+
+import cloudinary.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_collector_location_buffer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wastereportmedia',
+            name='original_name',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='wastereportmedia',
+            name='staged_path',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='wastereportmedia',
+            name='upload_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='wastereportmedia',
+            name='upload_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('uploading', 'Uploading'), ('uploaded', 'Uploaded'), ('failed', 'Failed')], default='uploaded', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='wastereportmedia',
+            name='file',
+            field=cloudinary.models.CloudinaryField(blank=True, max_length=255, null=True, verbose_name='waste_reports'),
+        ),
+    ]
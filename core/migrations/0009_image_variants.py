@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_media_upload_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='profile_picture_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='wastereportmedia',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-17 06:59
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationBroadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('message', models.TextField()),
+                ('notification_type', models.CharField(choices=[('waste_report', 'Waste Report'), ('pickup_request', 'Pickup Request'), ('status_update', 'Status Update'), ('pickup_status', 'Pickup Status'), ('educational', 'Educational Content')], max_length=20)),
+                ('reference_id', models.IntegerField(blank=True, null=True)),
+                ('segment', models.CharField(choices=[('all', 'All Active Users'), ('admins', 'Administrators'), ('recent_reporters', 'Reported Waste in Last 30 Days'), ('open_pickups', 'Users with Open Pickup Requests')], default='all', max_length=30)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_recipients', models.PositiveIntegerField(default=0)),
+                ('sent_count', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
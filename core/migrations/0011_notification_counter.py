@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Notification = apps.get_model('core', 'Notification')
+    NotificationCounter = apps.get_model('core', 'NotificationCounter')
+    rows = Notification.objects.filter(is_read=False).values('user_id').annotate(unread=Count('id')).order_by()
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=row['user_id'], unread=row['unread']) for row in rows],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_notification_broadcast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
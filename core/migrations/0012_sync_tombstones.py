@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_notification_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(choices=[('waste_report', 'Waste Report'), ('pickup_request', 'Pickup Request'), ('notification', 'Notification')], max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('user_id', models.IntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'updated_at'], name='notification_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pickuprequest',
+            index=models.Index(fields=['user', 'updated_at'], name='pickup_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pickuprequest',
+            index=models.Index(fields=['updated_at'], name='pickup_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wastereport',
+            index=models.Index(fields=['user', 'updated_at'], name='wastereport_user_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wastereport',
+            index=models.Index(fields=['updated_at'], name='wastereport_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['model', 'user_id', 'deleted_at'], name='tombstone_model_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='synctombstone',
+            index=models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+from core.forum import topic_stats
+
+
+def backfill_forum_stats(apps, schema_editor):
+    ForumTopic = apps.get_model('core', 'ForumTopic')
+    topics = [
+        ForumTopic(pk=pk, comment_count=count, last_activity_at=activity_at)
+        for pk, count, activity_at in topic_stats(ForumTopic.objects.all())
+    ]
+    ForumTopic.objects.bulk_update(topics, ['comment_count', 'last_activity_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='forumtopic',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='forumtopic',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='forumcomment',
+            index=models.Index(fields=['topic', 'created_at'], name='forumcomment_topic_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumtopic',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['last_activity_at'], name='forumtopic_activity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='forumtopic',
+            index=models.Index(fields=['last_activity_at'], name='forumtopic_activity_all_idx'),
+        ),
+        migrations.RunPython(backfill_forum_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:10
+
+from django.db import migrations, models
+
+from core.search import build_documents, create_text_index, drop_text_index
+
+
+def add_text_index(apps, schema_editor):
+    create_text_index(schema_editor)
+
+
+def remove_text_index(apps, schema_editor):
+    drop_text_index(schema_editor)
+
+
+def backfill_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('core', 'SearchDocument')
+    for model_name in ('EducationalContent', 'FAQ', 'ForumTopic'):
+        model = apps.get_model('core', model_name)
+        documents = build_documents(model.objects.iterator(chunk_size=500), model=SearchDocument)
+        SearchDocument.objects.bulk_create(documents, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_forum_activity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('educational_content', 'Educational Content'), ('faq', 'FAQ'), ('forum_topic', 'Forum Topic')], max_length=30)),
+                ('object_id', models.IntegerField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'object_id'), name='searchdocument_source_uniq')],
+            },
+        ),
+        migrations.RunPython(add_text_index, remove_text_index),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:12
+
+from django.db import migrations, models
+
+from core.rollups import rebuild
+
+
+def backfill_rollups(apps, schema_editor):
+    rebuild(apps.get_model('core', 'WasteReport'), apps.get_model('core', 'WasteReportDailyStat'), 'quantity', 'quantity')
+    rebuild(
+        apps.get_model('core', 'PickupRequest'), apps.get_model('core', 'PickupRequestDailyStat'),
+        'quantity_estimate', 'quantity_estimate'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PickupRequestDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('waste_type', models.CharField(choices=[('plastic', 'Plastic'), ('organic', 'Organic'), ('medical', 'Medical'), ('electronic', 'Electronic'), ('hazardous', 'Hazardous'), ('general', 'General'), ('other', 'Other')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('scheduled', 'Scheduled'), ('in_progress', 'In Progress'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('quantity_estimate', models.FloatField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'waste_type', 'status'), name='pickup_daily_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='WasteReportDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('waste_type', models.CharField(choices=[('plastic', 'Plastic'), ('organic', 'Organic'), ('electronic', 'Electronic'), ('hazardous', 'Hazardous'), ('metal', 'Metal'), ('glass', 'Glass'), ('other', 'Other')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('reviewed', 'Reviewed'), ('in_progress', 'In Progress'), ('resolved', 'Resolved'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('quantity', models.FloatField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'waste_type', 'status'), name='wastereport_daily_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
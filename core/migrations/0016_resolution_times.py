@@ -0,0 +1,48 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:14
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_resolution_times(apps, schema_editor):
+    # The real moment is unknown for rows that were already closed; their
+    # last update is the closest record of it.
+    apps.get_model('core', 'WasteReport').objects.filter(status='resolved').update(resolved_at=F('updated_at'))
+    apps.get_model('core', 'PickupRequest').objects.filter(status='completed').update(completed_at=F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pickuprequest',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='wastereport',
+            name='resolved_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='pickuprequest',
+            index=models.Index(fields=['created_at'], name='pickup_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pickuprequest',
+            index=models.Index(fields=['completed_at'], name='pickup_completed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wastereport',
+            index=models.Index(fields=['created_at'], name='wastereport_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='wastereport',
+            index=models.Index(fields=['resolved_at'], name='wastereport_resolved_idx'),
+        ),
+        migrations.RunPython(backfill_resolution_times, migrations.RunPython.noop),
+    ]
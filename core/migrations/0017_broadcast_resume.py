@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_resolution_times'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationbroadcast',
+            name='last_recipient_id',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+    ]
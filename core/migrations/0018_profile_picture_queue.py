@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_broadcast_resume'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='picture_staged_path',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='picture_upload_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='picture_upload_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('uploading', 'Uploading'), ('uploaded', 'Uploaded'), ('failed', 'Failed')], default='uploaded', max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-17 07:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_profile_picture_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='picture_claimed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='wastereportmedia',
+            name='upload_claimed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
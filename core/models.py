@@ -6,6 +6,14 @@ from django.core.exceptions import ValidationError
 from django.utils.text import slugify
 from django.conf import settings
 from cloudinary.models import CloudinaryField
+from .geo import grid_cell
+
+
+def stamp_status_time(status, final_status, stamped_at):
+    # When a row reached its final status; cleared again if it is reopened
+    if status != final_status:
+        return None
+    return stamped_at or timezone.now()
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, username, email, password=None, **extra_fields):
@@ -62,6 +70,7 @@ class WasteReport(models.Model):
     # Location fields
     latitude = models.DecimalField(max_digits=9, decimal_places=6)
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    grid_cell = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
     address = models.TextField()
     
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -73,20 +82,54 @@ class WasteReport(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    resolved_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='wastereport_user_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='wastereport_status_created_idx'),
+            models.Index(fields=['user', 'updated_at'], name='wastereport_user_updated_idx'),
+            models.Index(fields=['updated_at'], name='wastereport_updated_idx'),
+            models.Index(fields=['created_at'], name='wastereport_created_idx'),
+            models.Index(fields=['resolved_at'], name='wastereport_resolved_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.grid_cell = grid_cell(self.latitude, self.longitude)
+        self.resolved_at = stamp_status_time(self.status, 'resolved', self.resolved_at)
+        super().save(*args, **kwargs)
 
 class WasteReportMedia(models.Model):
     MEDIA_TYPES = [
         ('image', 'Image'),
         ('video', 'Video')
     ]
+
+    UPLOAD_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('uploading', 'Uploading'),
+        ('uploaded', 'Uploaded'),
+        ('failed', 'Failed')
+    ]
     
     waste_report = models.ForeignKey(WasteReport, related_name='media', on_delete=models.CASCADE)
     media_type = models.CharField(max_length=10, choices=MEDIA_TYPES)
+    # Empty until the upload queue has pushed the staged file to storage
     file = CloudinaryField(
         'waste_reports',
         resource_type='auto',
-        folder='waste_reports'
+        folder='waste_reports',
+        null=True,
+        blank=True
     )
+    upload_status = models.CharField(max_length=20, choices=UPLOAD_STATUS_CHOICES, default='uploaded')
+    # When a worker last claimed the upload; see MEDIA_UPLOAD_STALE_SECONDS
+    upload_claimed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    staged_path = models.CharField(max_length=500, blank=True)
+    original_name = models.CharField(max_length=255, blank=True)
+    upload_error = models.TextField(blank=True)
+    # Resized copies keyed by variant name; see core.images
+    variants = models.JSONField(default=dict, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
 class CleanupTeam(models.Model):
@@ -138,10 +181,69 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='notification_user_created_idx'),
+            models.Index(fields=['user', 'updated_at'], name='notification_user_updated_idx'),
+            models.Index(
+                fields=['user', 'created_at'],
+                condition=models.Q(is_read=False),
+                name='notification_unread_idx'
+            ),
+        ]
 
     def __str__(self):
         return f"{self.notification_type} - {self.title}"
 
+class NotificationCounter(models.Model):
+    # Denormalised unread count per user; maintained by core.notifications
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        primary_key=True,
+        related_name='notification_counter',
+        on_delete=models.CASCADE
+    )
+    unread = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class NotificationBroadcast(models.Model):
+    SEGMENTS = [
+        ('all', 'All Active Users'),
+        ('admins', 'Administrators'),
+        ('recent_reporters', 'Reported Waste in Last 30 Days'),
+        ('open_pickups', 'Users with Open Pickup Requests')
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed')
+    ]
+
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPES)
+    reference_id = models.IntegerField(null=True, blank=True)
+    segment = models.CharField(max_length=30, choices=SEGMENTS, default='all')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total_recipients = models.PositiveIntegerField(default=0)
+    sent_count = models.PositiveIntegerField(default=0)
+    # Recipients go out in user id order; a resumed broadcast starts after this
+    last_recipient_id = models.IntegerField(null=True, blank=True, editable=False)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
 class UserProfile(models.Model):
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     phone_number = models.CharField(max_length=15, blank=True)
@@ -152,6 +254,15 @@ class UserProfile(models.Model):
         null=True,
         blank=True
     )
+    profile_picture_variants = models.JSONField(default=dict, blank=True)
+    # A new picture waits in local staging for the media upload queue; the
+    # current one is kept until it has been replaced
+    picture_upload_status = models.CharField(
+        max_length=20, choices=WasteReportMedia.UPLOAD_STATUS_CHOICES, default='uploaded'
+    )
+    picture_claimed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    picture_staged_path = models.CharField(max_length=500, blank=True)
+    picture_upload_error = models.TextField(blank=True)
 
 class PickupRequest(models.Model):
     WASTE_TYPES = [
@@ -179,6 +290,7 @@ class PickupRequest(models.Model):
     address = models.TextField()
     latitude = models.DecimalField(max_digits=9, decimal_places=6)
     longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    grid_cell = models.IntegerField(null=True, blank=True, editable=False, db_index=True)
     instructions = models.TextField(blank=True)
     quantity_estimate = models.FloatField(help_text="Estimated quantity in kg")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -190,6 +302,23 @@ class PickupRequest(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='pickup_user_created_idx'),
+            models.Index(fields=['status', 'created_at'], name='pickup_status_created_idx'),
+            models.Index(fields=['user', 'pickup_date', 'status'], name='pickup_user_date_status_idx'),
+            models.Index(fields=['user', 'updated_at'], name='pickup_user_updated_idx'),
+            models.Index(fields=['updated_at'], name='pickup_updated_idx'),
+            models.Index(fields=['created_at'], name='pickup_created_idx'),
+            models.Index(fields=['completed_at'], name='pickup_completed_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.grid_cell = grid_cell(self.latitude, self.longitude)
+        self.completed_at = stamp_status_time(self.status, 'completed', self.completed_at)
+        super().save(*args, **kwargs)
 
     def clean(self):
         # Validate that pickup date is not in the past
@@ -214,8 +343,21 @@ class WasteCollector(models.Model):
         null=True,
         blank=True
     )
+    location_updated_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+class CollectorLocation(models.Model):
+    # Thinned GPS trail kept for route replay; see core.locations
+    collector = models.ForeignKey(WasteCollector, related_name='locations', on_delete=models.CASCADE)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6)
+    recorded_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['collector', 'recorded_at'], name='collectorloc_time_idx'),
+        ]
+
 class EducationalContent(models.Model):
     CONTENT_TYPES = [
         ('article', 'Article'),
@@ -275,9 +417,27 @@ class ForumTopic(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     is_approved = models.BooleanField(default=False)
     views = models.PositiveIntegerField(default=0)
+    # Approved comments only; maintained by core.forum
+    comment_count = models.PositiveIntegerField(default=0)
+    last_activity_at = models.DateTimeField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(is_approved=True),
+                name='forumtopic_approved_idx'
+            ),
+            models.Index(
+                fields=['last_activity_at'],
+                condition=models.Q(is_approved=True),
+                name='forumtopic_activity_idx'
+            ),
+            models.Index(fields=['last_activity_at'], name='forumtopic_activity_all_idx'),
+        ]
+
 class ForumComment(models.Model):
     topic = models.ForeignKey(ForumTopic, related_name='comments', on_delete=models.CASCADE)
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -286,9 +446,116 @@ class ForumComment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['topic', 'created_at'], name='forumcomment_topic_created_idx'),
+        ]
+
 class FAQ(models.Model):
     question = models.TextField()
     answer = models.TextField()
     category = models.CharField(max_length=100)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+class ExportJob(models.Model):
+    EXPORT_TYPES = [
+        ('waste_reports', 'Waste Reports'),
+        ('pickup_requests', 'Pickup Requests')
+    ]
+
+    FORMATS = [
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines')
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed')
+    ]
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    export_type = models.CharField(max_length=20, choices=EXPORT_TYPES)
+    file_format = models.CharField(max_length=10, choices=FORMATS, default='csv')
+    filters = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    file_name = models.CharField(max_length=255, blank=True)
+    row_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+class SyncTombstone(models.Model):
+    # Left behind when a synced row is deleted so ?since= delta syncs can
+    # report the deletion. user_id is a plain column: the owner may be the
+    # thing being deleted.
+    MODELS = [
+        ('waste_report', 'Waste Report'),
+        ('pickup_request', 'Pickup Request'),
+        ('notification', 'Notification')
+    ]
+
+    model = models.CharField(max_length=20, choices=MODELS)
+    object_id = models.IntegerField()
+    user_id = models.IntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'user_id', 'deleted_at'], name='tombstone_model_user_idx'),
+            models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx'),
+        ]
+
+class SearchDocument(models.Model):
+    # One row per searchable object, maintained by core.search. The text
+    # index lives outside the ORM: a generated tsvector column with a GIN
+    # index on PostgreSQL, an FTS5 table kept in step by triggers on SQLite.
+    SOURCES = [
+        ('educational_content', 'Educational Content'),
+        ('faq', 'FAQ'),
+        ('forum_topic', 'Forum Topic')
+    ]
+
+    source = models.CharField(max_length=30, choices=SOURCES)
+    object_id = models.IntegerField()
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'object_id'], name='searchdocument_source_uniq'),
+        ]
+
+class WasteReportDailyStat(models.Model):
+    # Rollup of waste reports per creation day, waste type and status;
+    # maintained by core.rollups
+    day = models.DateField()
+    waste_type = models.CharField(max_length=20, choices=WasteReport.WASTE_TYPES)
+    status = models.CharField(max_length=20, choices=WasteReport.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    quantity = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'waste_type', 'status'], name='wastereport_daily_uniq'),
+        ]
+
+class PickupRequestDailyStat(models.Model):
+    # Rollup of pickup requests per creation day, waste type and status
+    day = models.DateField()
+    waste_type = models.CharField(max_length=20, choices=PickupRequest.WASTE_TYPES)
+    status = models.CharField(max_length=20, choices=PickupRequest.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    quantity_estimate = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'waste_type', 'status'], name='pickup_daily_uniq'),
+        ]
@@ -0,0 +1,164 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .dashboard import invalidate_user_dashboard
+from .events import publish_to_user, notification_payload
+from .models import (
+    CustomUser, Notification, NotificationBroadcast, NotificationCounter, WasteReport, PickupRequest
+)
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='broadcast')
+
+
+def adjust_unread(user_ids, delta, create_missing=True):
+    user_ids = list(user_ids)
+    updated = NotificationCounter.objects.filter(user_id__in=user_ids).update(
+        unread=F('unread') + delta, updated_at=timezone.now()
+    )
+    if updated < len(user_ids) and create_missing:
+        # Create the missing rows at zero, then apply the delta to exactly
+        # those rows, so a concurrent creator can't make us lose an update.
+        existing = set(NotificationCounter.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True))
+        missing = [user_id for user_id in user_ids if user_id not in existing]
+        NotificationCounter.objects.bulk_create(
+            [NotificationCounter(user_id=user_id) for user_id in missing],
+            ignore_conflicts=True
+        )
+        NotificationCounter.objects.filter(user_id__in=missing).update(
+            unread=F('unread') + delta, updated_at=timezone.now()
+        )
+
+
+def unread_count(user):
+    unread = NotificationCounter.objects.filter(user=user).values_list('unread', flat=True).first()
+    if unread is None:
+        unread = Notification.objects.filter(user=user, is_read=False).count()
+        NotificationCounter.objects.get_or_create(user=user, defaults={'unread': unread})
+    return max(unread, 0)
+
+
+def notify(user, title, message, notification_type, reference_id=None):
+    # The post_save receiver bumps the unread counter in the same transaction
+    with transaction.atomic():
+        return Notification.objects.create(
+            user=user,
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            reference_id=reference_id
+        )
+
+
+def mark_read(user, notification_ids=None):
+    # One UPDATE for the notifications and one for the counter
+    with transaction.atomic():
+        notifications = Notification.objects.filter(user=user, is_read=False)
+        if notification_ids is not None:
+            notifications = notifications.filter(pk__in=notification_ids)
+        marked = notifications.update(is_read=True, updated_at=timezone.now())
+        if marked:
+            adjust_unread([user.pk], -marked)
+    if marked:
+        invalidate_user_dashboard(user.pk)
+    return marked
+
+
+def segment_user_ids(segment):
+    users = CustomUser.objects.filter(is_active=True)
+    if segment == 'admins':
+        users = users.filter(is_admin=True)
+    elif segment == 'recent_reporters':
+        since = timezone.now() - timedelta(days=30)
+        users = users.filter(pk__in=WasteReport.objects.filter(created_at__gte=since).values('user_id'))
+    elif segment == 'open_pickups':
+        users = users.filter(
+            pk__in=PickupRequest.objects.filter(status__in=['pending', 'scheduled', 'in_progress']).values('user_id')
+        )
+    return users.order_by('pk').values_list('pk', flat=True)
+
+
+def claimable_broadcasts():
+    # Pending broadcasts, and running ones whose worker has stopped: a
+    # running broadcast touches updated_at with every chunk it sends
+    stale = timezone.now() - timedelta(seconds=settings.NOTIFICATION_BROADCAST_STALE_SECONDS)
+    return NotificationBroadcast.objects.filter(Q(status='pending') | Q(status='running', updated_at__lt=stale))
+
+
+def run_broadcast(broadcast_id):
+    claimed = claimable_broadcasts().filter(pk=broadcast_id).update(status='running', updated_at=timezone.now())
+    if not claimed:
+        return
+
+    broadcast = NotificationBroadcast.objects.get(pk=broadcast_id)
+    chunk_size = settings.NOTIFICATION_FANOUT_CHUNK_SIZE
+    recipients = segment_user_ids(broadcast.segment)
+    NotificationBroadcast.objects.filter(pk=broadcast_id).update(total_recipients=recipients.count())
+    if broadcast.last_recipient_id is not None:
+        # Resuming: the earlier worker got this far
+        recipients = recipients.filter(pk__gt=broadcast.last_recipient_id)
+
+    try:
+        # Short per-chunk transactions keep lock time on the notification
+        # table bounded however large the segment is.
+        batch = []
+        for user_id in recipients.iterator(chunk_size=chunk_size):
+            batch.append(user_id)
+            if len(batch) >= chunk_size:
+                _send_chunk(broadcast, batch)
+                batch = []
+        if batch:
+            _send_chunk(broadcast, batch)
+        broadcast.status = 'completed'
+    except Exception as exc:
+        logger.exception('Notification broadcast %s failed', broadcast_id)
+        broadcast.status = 'failed'
+        broadcast.error = str(exc)
+
+    broadcast.refresh_from_db(fields=['total_recipients', 'sent_count', 'last_recipient_id'])
+    broadcast.completed_at = timezone.now()
+    broadcast.save(update_fields=['status', 'error', 'completed_at', 'updated_at'])
+
+
+def _send_chunk(broadcast, user_ids):
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create([
+            Notification(
+                user_id=user_id,
+                title=broadcast.title,
+                message=broadcast.message,
+                notification_type=broadcast.notification_type,
+                reference_id=broadcast.reference_id
+            )
+            for user_id in user_ids
+        ])
+        adjust_unread(user_ids, 1)
+        NotificationBroadcast.objects.filter(pk=broadcast.pk).update(
+            sent_count=F('sent_count') + len(user_ids), last_recipient_id=user_ids[-1], updated_at=timezone.now()
+        )
+    # bulk_create skips post_save, so neither the dashboard nor the push
+    # receivers fire
+    for user_id in user_ids:
+        invalidate_user_dashboard(user_id)
+    for notification in notifications:
+        publish_to_user(notification.user_id, 'notification', notification_payload(notification))
+    return len(user_ids)
+
+
+def _run_in_worker(broadcast_id):
+    close_old_connections()
+    try:
+        run_broadcast(broadcast_id)
+    finally:
+        close_old_connections()
+
+
+def enqueue_broadcast(broadcast):
+    transaction.on_commit(lambda: _executor.submit(_run_in_worker, broadcast.pk))
@@ -0,0 +1,184 @@
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    # Newest-first seek pagination on (created_at, id): each page filters
+    # past the previous page's boundary row instead of using OFFSET. Models
+    # without a created_at column page on id alone. Subclasses may page on
+    # another column or oldest-first.
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering_field = 'created_at'
+    descending = True
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.field = self.get_ordering_field(queryset)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor['reverse'])
+
+        if cursor is not None:
+            queryset = queryset.filter(self.get_seek_filter(cursor['key'], reverse))
+        queryset = queryset.order_by(*self.get_ordering(reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = cursor is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                value = int(request.query_params[self.page_size_query_param])
+                if value > 0:
+                    return min(value, self.max_page_size) if self.max_page_size else value
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering_field(self, queryset):
+        try:
+            queryset.model._meta.get_field(self.ordering_field)
+        except FieldDoesNotExist:
+            return None
+        return self.ordering_field
+
+    def get_ordering(self, reverse=False):
+        fields = [self.field, 'pk'] if self.field else ['pk']
+        prefix = '-' if self.descending != reverse else ''
+        return [prefix + field for field in fields]
+
+    def get_seek_filter(self, key, reverse=False):
+        value, pk = key
+        lookup = 'lt' if self.descending != reverse else 'gt'
+        if not self.field:
+            return Q(**{f'pk__{lookup}': pk})
+        return (
+            Q(**{f'{self.field}__{lookup}': value}) |
+            Q(**{self.field: value, f'pk__{lookup}': pk})
+        )
+
+    def get_key(self, instance):
+        if not self.field:
+            return [None, instance.pk]
+        return [getattr(instance, self.field).isoformat(), instance.pk]
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_key(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.get_key(self.page[0]), reverse=True)
+
+    def encode_cursor(self, key, reverse):
+        token = {'k': key}
+        if reverse:
+            token['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(token).encode('ascii')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            token = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            value, pk = token['k']
+            pk = int(pk)
+            if self.field:
+                value = parse_datetime(value)
+                if value is None:
+                    raise ValueError
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return {'key': (value, pk), 'reverse': bool(token.get('r'))}
+
+
+class ForumTopicPagination(KeysetPagination):
+    # ?ordering=activity lists the most recently active topics first
+    def get_ordering_field(self, queryset):
+        if self.request.query_params.get('ordering') == 'activity':
+            return 'last_activity_at'
+        return super().get_ordering_field(queryset)
+
+
+class ChronologicalPagination(KeysetPagination):
+    descending = False
+
+
+class DistancePagination(KeysetPagination):
+    # Closest first on a `distance_km` annotation (see geo.nearest), with
+    # the same seek cursors: (distance, id) of the boundary row
+    ordering_field = 'distance_km'
+    descending = False
+
+    def get_ordering_field(self, queryset):
+        return self.ordering_field
+
+    def get_key(self, instance):
+        return [instance.distance_km, instance.pk]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            token = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            value, pk = token['k']
+            value, pk = float(value), int(pk)
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return {'key': (value, pk), 'reverse': bool(token.get('r'))}
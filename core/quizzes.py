@@ -0,0 +1,43 @@
+from django.core.cache import cache
+
+from .models import QuizQuestion
+
+ANSWER_KEY_CACHE_KEY = 'quiz:answers:{}:{}'
+ANSWER_KEY_TIMEOUT = 60 * 60 * 24
+
+
+def get_answer_key(quiz):
+    # Question edits touch the quiz's updated_at (see core.signals), so keying
+    # on it retires stale answer keys without any explicit invalidation.
+    key = ANSWER_KEY_CACHE_KEY.format(quiz.pk, quiz.updated_at.timestamp())
+    answer_key = cache.get(key)
+    if answer_key is None:
+        answer_key = [
+            (question_id, answer.strip().lower())
+            for question_id, answer in QuizQuestion.objects.filter(quiz=quiz)
+            .order_by('pk').values_list('pk', 'correct_answer')
+        ]
+        cache.set(key, answer_key, ANSWER_KEY_TIMEOUT)
+    return answer_key
+
+
+def grade(answer_key, answers):
+    # `answers` maps question ids (as sent by the client, usually strings)
+    # to the chosen option; unknown ids are ignored.
+    submitted = {str(question_id): answer for question_id, answer in answers.items()}
+    results = []
+    correct_answers = 0
+    for question_id, correct_answer in answer_key:
+        answer = submitted.get(str(question_id))
+        correct = answer is not None and str(answer).strip().lower() == correct_answer
+        correct_answers += correct
+        results.append({'question_id': question_id, 'answered': answer is not None, 'correct': correct})
+
+    total_questions = len(answer_key)
+    score = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
+    return {
+        'score': score,
+        'correct_answers': correct_answers,
+        'total_questions': total_questions,
+        'results': results,
+    }
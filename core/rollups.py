@@ -0,0 +1,96 @@
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import WasteReport, PickupRequest, WasteReportDailyStat, PickupRequestDailyStat
+
+# source model -> (rollup model, summed source field, summed rollup field)
+ROLLUP_MODELS = {
+    WasteReport: (WasteReportDailyStat, 'quantity', 'quantity'),
+    PickupRequest: (PickupRequestDailyStat, 'quantity_estimate', 'quantity_estimate'),
+}
+
+
+def rollup_key(instance):
+    # (day, waste_type, status, quantity) as loaded, or None for an unsaved
+    # row or one loaded without these fields
+    _, source_field, _ = ROLLUP_MODELS[type(instance)]
+    values = instance.__dict__
+    if any(values.get(name) is None for name in ('created_at', 'waste_type', 'status', source_field)):
+        return None
+    return (
+        timezone.localdate(values['created_at']),
+        values['waste_type'],
+        values['status'],
+        values[source_field],
+    )
+
+
+def _apply(model, quantity_field, day, waste_type, status, count, quantity):
+    bucket = model.objects.filter(day=day, waste_type=waste_type, status=status)
+    changes = {'count': F('count') + count, quantity_field: F(quantity_field) + quantity}
+    if not bucket.update(**changes):
+        # Create the bucket at zero and apply the change to it, so two
+        # first writers for a new day can't lose each other's increment.
+        model.objects.bulk_create(
+            [model(day=day, waste_type=waste_type, status=status)],
+            ignore_conflicts=True
+        )
+        bucket.update(**changes)
+
+
+def record_change(instance, previous, current):
+    # Move one row's contribution from its previous bucket to its current one
+    if previous == current:
+        return
+    model, _, quantity_field = ROLLUP_MODELS[type(instance)]
+    with transaction.atomic():
+        if previous is not None:
+            day, waste_type, status, quantity = previous
+            _apply(model, quantity_field, day, waste_type, status, -1, -quantity)
+        if current is not None:
+            day, waste_type, status, quantity = current
+            _apply(model, quantity_field, day, waste_type, status, 1, quantity)
+
+
+def rebuild(source, rollup, source_field, rollup_field):
+    # Recompute a rollup table with one grouped query over its source.
+    # Takes the models as arguments so migrations can pass historical ones.
+    rows = source.objects.annotate(day=TruncDate('created_at')).values(
+        'day', 'waste_type', 'status'
+    ).annotate(total=Count('id'), summed=Sum(source_field)).order_by()
+    with transaction.atomic():
+        rollup.objects.all().delete()
+        rollup.objects.bulk_create([
+            rollup(**{
+                'day': row['day'],
+                'waste_type': row['waste_type'],
+                'status': row['status'],
+                'count': row['total'],
+                rollup_field: row['summed'] or 0,
+            })
+            for row in rows
+        ], batch_size=1000)
+    return len(rows)
+
+
+def rebuild_all():
+    return {
+        source._meta.label: rebuild(source, rollup, source_field, rollup_field)
+        for source, (rollup, source_field, rollup_field) in ROLLUP_MODELS.items()
+    }
+
+
+def distribution(rollup, field, since=None, quantity_field=None):
+    # Counts (and optionally summed quantities) per value of `field`
+    rows = rollup.objects.all()
+    if since is not None:
+        rows = rows.filter(day__gte=since)
+    aggregates = {'count': Sum('count')}
+    if quantity_field:
+        aggregates['quantity'] = Sum(quantity_field)
+    return [
+        row for row in rows.values(field).annotate(**aggregates).order_by(field)
+        if row['count']
+    ]
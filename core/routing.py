@@ -0,0 +1,180 @@
+import hashlib
+import json
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+
+from .geo import EARTH_RADIUS_KM, grid_cell
+from .locations import latest_positions
+from .models import PickupRequest
+
+ROUTE_CACHE_KEY = 'route:{}:{}:{}'
+ROUTE_CACHE_TIMEOUT = 60 * 60 * 24
+MAX_TWO_OPT_PASSES = 50
+
+
+def distance_matrix(lats, lngs):
+    # Pairwise haversine distances (km) for all points at once
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lng = np.radians(np.asarray(lngs, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlng = lng[:, None] - lng[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def path_length(matrix, path):
+    path = np.asarray(path)
+    return float(matrix[path[:-1], path[1:]].sum()) if len(path) > 1 else 0.0
+
+
+def nearest_neighbour(matrix, start, stops):
+    path = [start]
+    remaining = list(stops)
+    while remaining:
+        distances = matrix[path[-1], remaining]
+        path.append(remaining.pop(int(np.argmin(distances))))
+    return path
+
+
+def two_opt(matrix, path):
+    # Open-path 2-opt: the first node (where the truck is) stays fixed and
+    # the route may end anywhere.
+    path = list(path)
+    n = len(path)
+    for _ in range(MAX_TWO_OPT_PASSES):
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                before = matrix[path[i - 1], path[i]]
+                after = matrix[path[i - 1], path[j]]
+                if j + 1 < n:
+                    before += matrix[path[j], path[j + 1]]
+                    after += matrix[path[i], path[j + 1]]
+                if after < before - 1e-9:
+                    path[i:j + 1] = reversed(path[i:j + 1])
+                    improved = True
+        if not improved:
+            break
+    return path
+
+
+def time_window(pickup_time):
+    minutes = pickup_time.hour * 60 + pickup_time.minute
+    return minutes // settings.ROUTE_TIME_WINDOW_MINUTES
+
+
+def plan_order(stops, start=None):
+    # Indices into `stops` in visiting order. `stops` are dicts with
+    # id/latitude/longitude/pickup_time. Stops are visited window by window
+    # in pickup_time order; inside each window the order is nearest-neighbour
+    # then improved with 2-opt.
+    if not stops:
+        return []
+
+    points = ([start] if start else []) + [(s['latitude'], s['longitude']) for s in stops]
+    matrix = distance_matrix([p[0] for p in points], [p[1] for p in points])
+    offset = 1 if start else 0
+
+    windows = {}
+    for index, stop in enumerate(stops):
+        windows.setdefault(time_window(stop['pickup_time']), []).append(index + offset)
+
+    order = []
+    current = 0 if start else None
+    for window in sorted(windows):
+        members = sorted(windows[window], key=lambda i: (stops[i - offset]['pickup_time'], stops[i - offset]['id']))
+        if current is None:
+            current, members = members[0], members[1:]
+            order.append(current)
+        path = two_opt(matrix, nearest_neighbour(matrix, current, members))
+        order.extend(path[1:])
+        current = path[-1]
+    return [node - offset for node in order]
+
+
+def route_length(stops, start=None):
+    points = ([start] if start else []) + [(s['latitude'], s['longitude']) for s in stops]
+    if not points:
+        return 0.0
+    matrix = distance_matrix([p[0] for p in points], [p[1] for p in points])
+    return path_length(matrix, list(range(len(points))))
+
+
+def describe_route(stops, start=None):
+    # Legs for `stops` visited in the given order, from `start` if known
+    points = ([start] if start else []) + [(s['latitude'], s['longitude']) for s in stops]
+    if not stops:
+        return []
+    matrix = distance_matrix([p[0] for p in points], [p[1] for p in points])
+    offset = 1 if start else 0
+
+    route = []
+    total = 0.0
+    for sequence, stop in enumerate(stops, start=1):
+        node = sequence - 1 + offset
+        leg = float(matrix[node - 1, node]) if node > 0 else 0.0
+        total += leg
+        route.append({
+            'sequence': sequence,
+            'pickup_id': stop['id'],
+            'address': stop['address'],
+            'latitude': stop['latitude'],
+            'longitude': stop['longitude'],
+            'pickup_time': stop['pickup_time'].isoformat(),
+            'leg_km': round(leg, 3),
+            'cumulative_km': round(total, 3),
+        })
+    return route
+
+
+def plan_route(stops, start=None):
+    return describe_route([stops[index] for index in plan_order(stops, start)], start)
+
+
+def collector_position(collector):
+    # The buffered GPS position when there is one (as dispatch uses), else
+    # the last one flushed to the database
+    position = latest_positions([collector.pk]).get(collector.pk)
+    if position is not None:
+        return (float(position['latitude']), float(position['longitude']))
+    if collector.current_location_lat is not None and collector.current_location_lng is not None:
+        return (float(collector.current_location_lat), float(collector.current_location_lng))
+    return None
+
+
+def collector_route(collector, pickup_date):
+    rows = list(
+        PickupRequest.objects.filter(collector=collector, pickup_date=pickup_date)
+        .exclude(status__in=['cancelled', 'completed'])
+        .order_by('created_at', 'id')
+        .values('id', 'address', 'latitude', 'longitude', 'pickup_time')
+    )
+    for row in rows:
+        row['latitude'] = float(row['latitude'])
+        row['longitude'] = float(row['longitude'])
+    start = collector_position(collector)
+
+    # Only the visiting order is cached. Its key covers the assignment set
+    # (and each stop's position/time) plus the grid cell the truck is in, so
+    # GPS pings within a cell reuse the plan; the legs are recomputed from
+    # the live position on every call.
+    signature = hashlib.sha1(json.dumps(rows, default=str, sort_keys=True).encode()).hexdigest()
+    cell = grid_cell(*start) if start else 'none'
+    key = ROUTE_CACHE_KEY.format(collector.pk, pickup_date.isoformat(), f'{signature}:{cell}')
+    order = cache.get(key)
+    if order is None:
+        order = [rows[index]['id'] for index in plan_order(rows, start)]
+        cache.set(key, order, ROUTE_CACHE_TIMEOUT)
+
+    by_id = {row['id']: row for row in rows}
+    stops = describe_route([by_id[pickup_id] for pickup_id in order], start)
+    return {
+        'collector_id': collector.pk,
+        'date': pickup_date.isoformat(),
+        'start': {'latitude': start[0], 'longitude': start[1]} if start else None,
+        'stops': stops,
+        'total_km': stops[-1]['cumulative_km'] if stops else 0.0,
+        'insertion_order_km': round(route_length(rows, start), 3),
+    }
@@ -0,0 +1,216 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+
+from .models import SearchDocument
+
+SEARCH_CONFIG = 'english'
+MAX_TERMS = 8
+MAX_LIMIT = 50
+DEFAULT_LIMIT = 20
+
+# Highlight markers that can't occur in stored text; swapped for <mark>
+# after the text has been HTML-escaped.
+MARK_START = '\ue000'
+MARK_END = '\ue001'
+
+FTS_TABLE = 'core_searchdocument_fts'
+
+POSTGRES_SETUP = [
+    f"""
+    ALTER TABLE core_searchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(body, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX searchdocument_vector_idx ON core_searchdocument USING GIN (search_vector)',
+]
+POSTGRES_TEARDOWN = [
+    'DROP INDEX IF EXISTS searchdocument_vector_idx',
+    'ALTER TABLE core_searchdocument DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_SETUP = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, body, content='core_searchdocument', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER core_searchdocument_ai AFTER INSERT ON core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER core_searchdocument_ad AFTER DELETE ON core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+    END
+    """,
+    f"""
+    CREATE TRIGGER core_searchdocument_au AFTER UPDATE ON core_searchdocument BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, body) VALUES ('delete', old.id, old.title, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, title, body) VALUES (new.id, new.title, new.body);
+    END
+    """,
+]
+SQLITE_TEARDOWN = [
+    'DROP TRIGGER IF EXISTS core_searchdocument_ai',
+    'DROP TRIGGER IF EXISTS core_searchdocument_ad',
+    'DROP TRIGGER IF EXISTS core_searchdocument_au',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+
+def create_text_index(schema_editor):
+    statements = {'postgresql': POSTGRES_SETUP, 'sqlite': SQLITE_SETUP}
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_text_index(schema_editor):
+    statements = {'postgresql': POSTGRES_TEARDOWN, 'sqlite': SQLITE_TEARDOWN}
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+# Per source: which rows are searchable and how they become title/body
+def _educational_content(obj):
+    if not obj.is_published:
+        return None
+    return obj.title, f'{obj.description}\n{obj.content}'
+
+
+def _faq(obj):
+    return obj.question[:255], f'{obj.answer}\n{obj.category}'
+
+
+def _forum_topic(obj):
+    if not obj.is_approved:
+        return None
+    return obj.title, obj.description
+
+
+DOCUMENT_BUILDERS = {
+    'EducationalContent': ('educational_content', _educational_content),
+    'FAQ': ('faq', _faq),
+    'ForumTopic': ('forum_topic', _forum_topic),
+}
+
+
+def build_documents(instances, model=SearchDocument):
+    # Takes historical models too, so the migration backfill can use it
+    documents = []
+    for instance in instances:
+        source, builder = DOCUMENT_BUILDERS[type(instance).__name__]
+        text = builder(instance)
+        if text is not None:
+            documents.append(model(source=source, object_id=instance.pk, title=text[0], body=text[1]))
+    return documents
+
+
+def index_object(instance):
+    # One upsert per save; hidden rows (drafts, unapproved topics) are dropped
+    documents = build_documents([instance])
+    if documents:
+        SearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=['source', 'object_id'],
+            update_fields=['title', 'body', 'updated_at']
+        )
+    else:
+        unindex_object(instance)
+
+
+def unindex_object(instance):
+    source, _ = DOCUMENT_BUILDERS[type(instance).__name__]
+    SearchDocument.objects.filter(source=source, object_id=instance.pk).delete()
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _highlight(text):
+    return escape(text).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def _postgres_search(terms, sources, limit):
+    # Every term is a prefix match: "recyc" finds "recycling"
+    tsquery = ' & '.join(f'{term}:*' for term in terms)
+    markers = f'StartSel={MARK_START}, StopSel={MARK_END}'
+    # Headlines are costly, so they are only built for the ranked page
+    sql = f"""
+        SELECT hit.source, hit.object_id, hit.rank,
+               ts_headline('{SEARCH_CONFIG}', hit.title, q, %s),
+               ts_headline('{SEARCH_CONFIG}', hit.body, q, %s)
+        FROM (
+            SELECT d.source, d.object_id, d.title, d.body, ts_rank_cd(d.search_vector, q) AS rank
+            FROM core_searchdocument d, to_tsquery('{SEARCH_CONFIG}', %s) q
+            WHERE d.search_vector @@ q AND d.source = ANY(%s)
+            ORDER BY rank DESC, d.id
+            LIMIT %s
+        ) hit, to_tsquery('{SEARCH_CONFIG}', %s) q
+        ORDER BY hit.rank DESC
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [
+            f'{markers}, HighlightAll=true',
+            f'{markers}, MaxFragments=2, MaxWords=25, MinWords=8',
+            tsquery, list(sources), limit, tsquery
+        ])
+        return cursor.fetchall()
+
+
+def _sqlite_search(terms, sources, limit):
+    match = ' '.join(f'"{term}"*' for term in terms)
+    placeholders = ', '.join(['%s'] * len(sources))
+    # bm25() is lower-is-better; title matches weigh ten times the body
+    sql = f"""
+        SELECT d.source, d.object_id, -bm25({FTS_TABLE}, 10.0, 1.0) AS rank,
+               highlight({FTS_TABLE}, 0, %s, %s),
+               snippet({FTS_TABLE}, 1, %s, %s, '…', 24)
+        FROM {FTS_TABLE}
+        JOIN core_searchdocument d ON d.id = {FTS_TABLE}.rowid
+        WHERE {FTS_TABLE} MATCH %s AND d.source IN ({placeholders})
+        ORDER BY bm25({FTS_TABLE}, 10.0, 1.0), d.id
+        LIMIT %s
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [MARK_START, MARK_END, MARK_START, MARK_END, match, *sources, limit])
+        return cursor.fetchall()
+
+
+def _fallback_search(terms, sources, limit):
+    # Other backends: unranked substring match on the document table
+    documents = SearchDocument.objects.filter(source__in=sources)
+    for term in terms:
+        documents = documents.filter(Q(title__icontains=term) | Q(body__icontains=term))
+    return [
+        (source, object_id, 0.0, title, body[:200])
+        for source, object_id, title, body in documents.order_by('-updated_at')[:limit]
+        .values_list('source', 'object_id', 'title', 'body')
+    ]
+
+
+def search(query, sources=None, limit=DEFAULT_LIMIT):
+    terms = search_terms(query)
+    if not terms:
+        return []
+    sources = sources or [source for source, _ in SearchDocument.SOURCES]
+    backends = {'postgresql': _postgres_search, 'sqlite': _sqlite_search}
+    rows = backends.get(connection.vendor, _fallback_search)(terms, sources, limit)
+    return [
+        {
+            'type': source,
+            'id': object_id,
+            'rank': round(float(rank), 4),
+            'title': _highlight(title),
+            'snippet': _highlight(snippet),
+        }
+        for source, object_id, rank, title, snippet in rows
+    ]
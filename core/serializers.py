@@ -1,8 +1,12 @@
 from rest_framework import serializers
+from django.core.files.uploadedfile import UploadedFile
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
-from .models import WasteReport, Pickup, EducationalResource, Notification, UserProfile, WasteReportMedia, CleanupTeam, PickupRequest, WasteCollector, EducationalContent, Quiz, QuizQuestion, UserQuizAttempt, ForumTopic, ForumComment, FAQ, CustomUser
+from .models import WasteReport, Pickup, EducationalResource, Notification, UserProfile, WasteReportMedia, CleanupTeam, PickupRequest, WasteCollector, EducationalContent, Quiz, QuizQuestion, UserQuizAttempt, ForumTopic, ForumComment, FAQ, CustomUser, ExportJob, NotificationBroadcast
 from django.utils import timezone
+from django.urls import reverse
+from .exports import filter_waste_reports, filter_pickup_requests
+from .media import queue_report_media, stage_profile_picture, enqueue_profile_picture_upload, get_upload_backend
 
 class SignUpSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=True, validators=[validate_password])
@@ -30,10 +34,31 @@ class LoginSerializer(serializers.Serializer):
     username = serializers.CharField(required=True)
     password = serializers.CharField(required=True, write_only=True)
 
+def preferred_variant(context):
+    # Lists show thumbnails; single-object views get the medium rendition
+    view = context.get('view')
+    return 'medium' if view is not None and getattr(view, 'action', None) == 'retrieve' else 'thumbnail'
+
 class WasteReportMediaSerializer(serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+
     class Meta:
         model = WasteReportMedia
-        fields = ['id', 'media_type', 'file', 'uploaded_at']
+        fields = ['id', 'media_type', 'file', 'url', 'variants', 'upload_status', 'uploaded_at']
+
+    def get_url(self, obj):
+        variant = obj.variants.get(preferred_variant(self.context))
+        if variant:
+            return variant['url']
+        if not obj.file:
+            return None
+        return get_upload_backend().url(obj.file, WasteReportMedia._meta.get_field('file'))
+
+    def to_representation(self, instance):
+        representation = super().to_representation(instance)
+        if preferred_variant(self.context) == 'thumbnail':
+            representation.pop('variants')
+        return representation
 
 class CleanupTeamSerializer(serializers.ModelSerializer):
     class Meta:
@@ -60,14 +85,8 @@ class WasteReportSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         uploaded_files = validated_data.pop('uploaded_files', [])
         waste_report = WasteReport.objects.create(**validated_data)
-        
-        for file in uploaded_files:
-            media_type = 'video' if file.content_type.startswith('video') else 'image'
-            WasteReportMedia.objects.create(
-                waste_report=waste_report,
-                media_type=media_type,
-                file=file
-            )
+        # Uploads to storage happen in the background; see core.media
+        queue_report_media(waste_report, uploaded_files)
         return waste_report
 
 class PickupSerializer(serializers.ModelSerializer):
@@ -94,8 +113,38 @@ class UserProfileSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = UserProfile
-        fields = ('id', 'username', 'email', 'phone_number', 'address', 'profile_picture')
-        read_only_fields = ('user', 'id', 'username', 'email')
+        fields = (
+            'id', 'username', 'email', 'phone_number', 'address', 'profile_picture',
+            'profile_picture_variants', 'picture_upload_status', 'picture_upload_error'
+        )
+        read_only_fields = (
+            'user', 'id', 'username', 'email', 'profile_picture_variants', 'picture_upload_status',
+            'picture_upload_error'
+        )
+
+    def _stage_picture(self, validated_data):
+        # A new file goes through the media upload queue; the picture and its
+        # variants are replaced once it has been uploaded
+        picture = validated_data.get('profile_picture')
+        if not isinstance(picture, UploadedFile):
+            return False
+        del validated_data['profile_picture']
+        validated_data.update(stage_profile_picture(picture))
+        return True
+
+    def create(self, validated_data):
+        staged = self._stage_picture(validated_data)
+        profile = super().create(validated_data)
+        if staged:
+            enqueue_profile_picture_upload(profile.pk)
+        return profile
+
+    def update(self, instance, validated_data):
+        staged = self._stage_picture(validated_data)
+        profile = super().update(instance, validated_data)
+        if staged:
+            enqueue_profile_picture_upload(profile.pk)
+        return profile
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
@@ -172,12 +221,12 @@ class UserQuizAttemptSerializer(serializers.ModelSerializer):
 
 class ForumTopicSerializer(serializers.ModelSerializer):
     author_name = serializers.CharField(source='author.username', read_only=True)
-    comments_count = serializers.IntegerField(read_only=True)
+    comments_count = serializers.IntegerField(source='comment_count', read_only=True)
     
     class Meta:
         model = ForumTopic
-        fields = '__all__'           
-        read_only_fields = ('author', 'is_approved', 'views')
+        exclude = ('comment_count',)
+        read_only_fields = ('author', 'is_approved', 'views', 'last_activity_at')
 
 class ForumCommentSerializer(serializers.ModelSerializer):
     author_name = serializers.CharField(source='author.username', read_only=True)
@@ -185,7 +234,7 @@ class ForumCommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = ForumComment
         fields = '__all__'
-        read_only_fields = ('author', 'is_approved')
+        read_only_fields = ('topic', 'author', 'is_approved')
 
 class FAQSerializer(serializers.ModelSerializer):
     class Meta:
@@ -196,4 +245,68 @@ class UserAdminSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ('id', 'username', 'email', 'is_admin', 'created_at', 'is_active')
-        read_only_fields = ('created_at',) 
\ No newline at end of file
+        read_only_fields = ('created_at',)
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = (
+            'id', 'export_type', 'file_format', 'filters', 'status', 'row_count',
+            'error', 'download_url', 'created_at', 'updated_at', 'completed_at'
+        )
+        read_only_fields = (
+            'status', 'row_count', 'error', 'created_at', 'updated_at', 'completed_at'
+        )
+
+    def validate_filters(self, value):
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Filters must be an object")
+        if not all(isinstance(item, str) for item in value.values()):
+            raise serializers.ValidationError("Filter values must be strings")
+        return value
+
+    def validate(self, attrs):
+        # Reject malformed filters up front rather than failing in the worker
+        if attrs['export_type'] == 'waste_reports':
+            filter_waste_reports(WasteReport.objects.none(), attrs.get('filters', {}))
+        else:
+            filter_pickup_requests(PickupRequest.objects.none(), attrs.get('filters', {}))
+        return attrs
+
+    def get_download_url(self, obj):
+        if obj.status != 'completed':
+            return None
+        request = self.context.get('request')
+        url = reverse('export-job-download', args=[obj.pk])
+        return request.build_absolute_uri(url) if request else url
+
+class CollectorLocationPingSerializer(serializers.Serializer):
+    collector_id = serializers.IntegerField()
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    recorded_at = serializers.DateTimeField(required=False, allow_null=True)
+
+class CollectorLocationBatchSerializer(serializers.Serializer):
+    pings = CollectorLocationPingSerializer(many=True, allow_empty=False, max_length=1000)
+
+class NotificationBroadcastSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = NotificationBroadcast
+        fields = (
+            'id', 'title', 'message', 'notification_type', 'reference_id', 'segment', 'status',
+            'total_recipients', 'sent_count', 'progress', 'error', 'created_at', 'completed_at'
+        )
+        read_only_fields = (
+            'status', 'total_recipients', 'sent_count', 'error', 'created_at', 'completed_at'
+        )
+
+    def get_progress(self, obj):
+        if obj.status == 'completed':
+            return 100.0
+        if not obj.total_recipients:
+            return 0.0
+        return round(obj.sent_count / obj.total_recipients * 100, 1)
@@ -0,0 +1,214 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import (
+    WasteReport, WasteReportMedia, WasteCollector, PickupRequest, Notification, UserProfile, EducationalContent, Quiz,
+    QuizQuestion, ForumComment, ForumTopic, FAQ
+)
+from .dashboard import invalidate_user_dashboard, invalidate_all_dashboards
+from .notifications import adjust_unread
+from .events import publish_to_user, notification_payload
+from .sync import record_tombstone
+from .forum import comment_added, comment_removed
+from .search import index_object, unindex_object
+from .rollups import rollup_key, record_change
+from .metrics import install_query_hook
+
+
+@receiver([post_save, post_delete], sender=WasteReport)
+@receiver([post_save, post_delete], sender=PickupRequest)
+@receiver([post_save, post_delete], sender=Notification)
+@receiver([post_save, post_delete], sender=UserProfile)
+def invalidate_owner_dashboard(sender, instance, **kwargs):
+    invalidate_user_dashboard(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=settings.AUTH_USER_MODEL)
+def invalidate_user_info_dashboard(sender, instance, **kwargs):
+    invalidate_user_dashboard(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=WasteReportMedia)
+def touch_media_report(sender, instance, **kwargs):
+    # Delta sync finds changed reports by updated_at, and media finish
+    # uploading in the background without saving their report
+    WasteReport.objects.filter(pk=instance.waste_report_id).update(updated_at=timezone.now())
+
+
+@receiver([post_save, post_delete], sender=WasteReportMedia)
+def invalidate_media_owner_dashboard(sender, instance, **kwargs):
+    # Reports on the dashboard nest their media, upload status and variants
+    # included. Gone when the report itself is being deleted, and that
+    # invalidates the dashboard anyway.
+    user_id = WasteReport.objects.filter(pk=instance.waste_report_id).values_list('user_id', flat=True).first()
+    if user_id is not None:
+        invalidate_user_dashboard(user_id)
+
+
+@receiver(pre_delete, sender=WasteCollector)
+def remember_collector_customers(sender, instance, **kwargs):
+    # Deleting a collector clears pickup.collector with a plain UPDATE, so
+    # the pickups' own receivers never see it
+    instance._customer_ids = list(
+        PickupRequest.objects.filter(collector=instance).values_list('user_id', flat=True).distinct()
+    )
+
+
+@receiver(post_delete, sender=WasteCollector)
+def invalidate_collector_customer_dashboards(sender, instance, **kwargs):
+    for user_id in getattr(instance, '_customer_ids', ()):
+        invalidate_user_dashboard(user_id)
+
+
+@receiver([post_save, post_delete], sender=EducationalContent)
+def invalidate_educational_dashboards(sender, instance, **kwargs):
+    # Published content is listed on every user's dashboard
+    invalidate_all_dashboards()
+
+
+@receiver(post_init, sender=Notification)
+def remember_read(sender, instance, **kwargs):
+    instance._loaded_read = instance.__dict__.get('is_read')
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, **kwargs):
+    # Bulk creates and queryset updates skip this; their callers adjust the
+    # counter themselves (see core.notifications)
+    previous = False if created else getattr(instance, '_loaded_read', None)
+    if created:
+        if not instance.is_read:
+            adjust_unread([instance.user_id], 1)
+    elif previous is not None and previous != instance.is_read:
+        adjust_unread([instance.user_id], -1 if instance.is_read else 1)
+    instance._loaded_read = instance.is_read
+
+
+@receiver(post_delete, sender=Notification)
+def release_unread_notification(sender, instance, **kwargs):
+    # Never recreate a counter here: during a user cascade delete the
+    # counter row may already be gone.
+    if not instance.is_read:
+        adjust_unread([instance.user_id], -1, create_missing=False)
+
+
+@receiver(post_save, sender=Notification)
+def push_notification(sender, instance, created, **kwargs):
+    if created:
+        publish_to_user(instance.user_id, 'notification', notification_payload(instance))
+
+
+@receiver(post_init, sender=WasteReport)
+@receiver(post_init, sender=PickupRequest)
+def remember_status(sender, instance, **kwargs):
+    # Read __dict__ directly so a deferred status field isn't fetched
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=WasteReport)
+@receiver(post_save, sender=PickupRequest)
+def push_status_change(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_loaded_status', None)
+    if created or previous is None or previous == instance.status:
+        instance._loaded_status = instance.status
+        return
+    data = {
+        'id': instance.pk,
+        'status': instance.status,
+        'previous_status': previous,
+        'updated_at': instance.updated_at,
+    }
+    if sender is PickupRequest:
+        data['collector_id'] = instance.collector_id
+        data['pickup_date'] = instance.pickup_date
+    event_type = 'waste_report.status' if sender is WasteReport else 'pickup_request.status'
+    publish_to_user(instance.user_id, event_type, data)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=WasteReport)
+def tombstone_waste_report(sender, instance, **kwargs):
+    record_tombstone('waste_report', instance)
+
+
+@receiver(post_delete, sender=PickupRequest)
+def tombstone_pickup_request(sender, instance, **kwargs):
+    record_tombstone('pickup_request', instance)
+
+
+@receiver(post_delete, sender=Notification)
+def tombstone_notification(sender, instance, **kwargs):
+    record_tombstone('notification', instance)
+
+
+@receiver([post_save, post_delete], sender=QuizQuestion)
+def touch_quiz(sender, instance, **kwargs):
+    # Questions are serialized inside their quiz, so they bump its ETag
+    Quiz.objects.filter(pk=instance.quiz_id).update(updated_at=timezone.now())
+
+
+@receiver(post_init, sender=ForumComment)
+def remember_approval(sender, instance, **kwargs):
+    instance._loaded_approved = instance.__dict__.get('is_approved')
+
+
+@receiver(post_save, sender=ForumComment)
+def count_approved_comment(sender, instance, created, **kwargs):
+    previous = False if created else getattr(instance, '_loaded_approved', None)
+    if previous is not None and previous != instance.is_approved:
+        if instance.is_approved:
+            comment_added(instance.topic_id, instance.created_at)
+        else:
+            comment_removed(instance.topic_id)
+    instance._loaded_approved = instance.is_approved
+
+
+@receiver(post_delete, sender=ForumComment)
+def uncount_deleted_comment(sender, instance, **kwargs):
+    if instance.is_approved:
+        comment_removed(instance.topic_id)
+
+
+@receiver(post_save, sender=EducationalContent)
+@receiver(post_save, sender=FAQ)
+@receiver(post_save, sender=ForumTopic)
+def update_search_document(sender, instance, **kwargs):
+    index_object(instance)
+
+
+@receiver(post_delete, sender=EducationalContent)
+@receiver(post_delete, sender=FAQ)
+@receiver(post_delete, sender=ForumTopic)
+def remove_search_document(sender, instance, **kwargs):
+    unindex_object(instance)
+
+
+@receiver(post_init, sender=WasteReport)
+@receiver(post_init, sender=PickupRequest)
+def remember_rollup_key(sender, instance, **kwargs):
+    instance._rollup_key = rollup_key(instance)
+
+
+@receiver(post_save, sender=WasteReport)
+@receiver(post_save, sender=PickupRequest)
+def update_daily_rollup(sender, instance, created, **kwargs):
+    previous = None if created else instance._rollup_key
+    # A row loaded without its rollup fields can't say which bucket it
+    # left; rebuild_rollups repairs that rare case.
+    if created or previous is not None:
+        record_change(instance, previous, rollup_key(instance))
+    instance._rollup_key = rollup_key(instance)
+
+
+@receiver(post_delete, sender=WasteReport)
+@receiver(post_delete, sender=PickupRequest)
+def remove_from_daily_rollup(sender, instance, **kwargs):
+    record_change(instance, rollup_key(instance), None)
+
+
+@receiver(connection_created)
+def time_request_queries(sender, connection, **kwargs):
+    install_query_hook(connection)
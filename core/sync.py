@@ -0,0 +1,124 @@
+import base64
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers, status
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .models import SyncTombstone
+
+SYNC_QUERY_PARAM = 'since'
+# ?since=0 starts a full sync from the beginning
+FULL_SYNC = '0'
+
+
+# A watermark is a position in the combined change stream: rows by
+# (updated_at, id) and tombstones by (deleted_at, id), with a row sorting
+# before a tombstone stamped at the same instant
+ROW, TOMBSTONE = 0, 1
+
+
+def encode_watermark(timestamp, pk, kind=ROW):
+    token = {'t': timestamp.isoformat(), 'id': pk, 'k': kind}
+    return base64.urlsafe_b64encode(json.dumps(token).encode('ascii')).decode('ascii')
+
+
+def decode_watermark(value):
+    if value == FULL_SYNC:
+        return None
+    try:
+        token = json.loads(base64.urlsafe_b64decode(value.encode('ascii')))
+        timestamp = parse_datetime(token['t'])
+        pk = int(token['id'])
+        # Watermarks issued before tombstones were paged have no kind
+        kind = int(token.get('k', ROW))
+        if timestamp is None or kind not in (ROW, TOMBSTONE):
+            raise ValueError
+    except (TypeError, ValueError, KeyError, AttributeError, UnicodeEncodeError):
+        raise serializers.ValidationError({SYNC_QUERY_PARAM: 'Invalid watermark.'})
+    return timestamp, pk, kind
+
+
+def record_tombstone(model, instance):
+    SyncTombstone.objects.create(model=model, object_id=instance.pk, user_id=instance.user_id)
+
+
+class DeltaSyncMixin:
+    # ?since=<watermark> turns list into a delta sync: the rows changed after
+    # the watermark in (updated_at, id) order, the ids deleted since, and the
+    # watermark to send next time. Pages are capped at the page size, rows
+    # and deletions together; keep calling with the returned watermark while
+    # has_more is true.
+    sync_model = None
+    # Staff list every row, so they also see every deletion
+    sync_staff_sees_all = True
+
+    def list(self, request, *args, **kwargs):
+        since = request.query_params.get(SYNC_QUERY_PARAM)
+        if since is None:
+            return super().list(request, *args, **kwargs)
+        return self.sync(request, since)
+
+    def get_tombstone_queryset(self, request):
+        tombstones = SyncTombstone.objects.filter(model=self.sync_model)
+        if not (self.sync_staff_sees_all and request.user.is_staff):
+            tombstones = tombstones.filter(user_id=request.user.pk)
+        return tombstones
+
+    def sync(self, request, since):
+        started = timezone.now()
+        watermark = decode_watermark(since)
+        if watermark is not None and watermark[0] < started - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+            return Response(
+                {'error': f'Watermark has expired; sync again with {SYNC_QUERY_PARAM}={FULL_SYNC}'},
+                status=status.HTTP_410_GONE
+            )
+
+        limit = self.paginator.get_page_size(request) if self.paginator is not None else api_settings.PAGE_SIZE
+        rows = self.get_queryset()
+        tombstones = self.get_tombstone_queryset(request)
+        if watermark is not None:
+            timestamp, pk, kind = watermark
+            # The redundant >= bounds let the (user, updated_at) and
+            # (model, user_id, deleted_at) indexes seek
+            rows = rows.filter(
+                Q(updated_at__gte=timestamp),
+                Q(updated_at__gt=timestamp) | Q(pk__gt=pk) if kind == ROW else Q(updated_at__gt=timestamp)
+            )
+            tombstones = tombstones.filter(
+                Q(deleted_at__gte=timestamp),
+                Q(deleted_at__gt=timestamp) | Q(pk__gt=pk) if kind == TOMBSTONE else Q()
+            )
+
+        # Up to a page of each, merged; the first `limit` changes are sent
+        changes = [(row.updated_at, ROW, row.pk, row) for row in rows.order_by('updated_at', 'pk')[:limit + 1]]
+        changes += [
+            (tombstone.deleted_at, TOMBSTONE, tombstone.pk, tombstone)
+            for tombstone in tombstones.order_by('deleted_at', 'pk')[:limit + 1]
+        ]
+        changes.sort(key=lambda change: change[:3])
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        if has_more:
+            last = changes[-1]
+            next_watermark = (last[0], last[2], last[1])
+        else:
+            # Step back a little so rows from transactions that were still
+            # open at `started` are picked up next time; the overlap is
+            # re-sent, which clients apply idempotently.
+            next_watermark = (started - timedelta(seconds=settings.SYNC_WATERMARK_LAG_SECONDS), 0, ROW)
+            if watermark is not None and watermark[0] >= next_watermark[0]:
+                next_watermark = watermark
+
+        return Response({
+            'results': self.get_serializer([change[3] for change in changes if change[1] == ROW], many=True).data,
+            'deleted': [change[3].object_id for change in changes if change[1] == TOMBSTONE],
+            'watermark': encode_watermark(*next_watermark),
+            'has_more': has_more,
+        })
@@ -1,3 +1,2113 @@
-from django.test import TestCase
+import base64
+import csv
+import json
+import os
+import random
+import shutil
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from unittest import mock
+
+import numpy as np
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import AsyncClient, TestCase, SimpleTestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from .counters import ViewCounterBuffer, view_counts
+from .dashboard import REFRESH_LOCK_KEY, build_user_dashboard, get_snapshot, get_user_dashboard
+from .dispatch import CollectorIndex, auto_assign, build_collector_index
+from .events import LocalBroker
+from .exports import export_file_path, run_export_job
+from .geo import haversine_km
+from .locations import LocationBuffer, buffer as location_buffer, latest_positions, normalize_ping
+from .media import (
+    _run_in_worker, process_media_upload, process_profile_picture, queue_report_media, stage_profile_picture,
+    upload_image_variants
+)
+from .metrics import MetricsRegistry, registry, render_prometheus, _merge
+from .models import (
+    CustomUser, WasteReport, PickupRequest, Notification, ForumTopic, ForumComment, FAQ, WasteCollector,
+    SyncTombstone, NotificationBroadcast, ExportJob, WasteReportMedia, UserProfile,
+    WasteReportDailyStat, PickupRequestDailyStat, CleanupTeam, NotificationCounter, CollectorLocation,
+    Quiz, QuizQuestion, UserQuizAttempt, EducationalContent, SearchDocument
+)
+from .notifications import notify, run_broadcast, unread_count
+from .quizzes import get_answer_key
+from .rollups import rebuild, rebuild_all
+from .search import search
+from .routing import collector_route, plan_order, plan_route, route_length
+from .sync import encode_watermark
+from .timeseries import aggregate, bucket_axis, bucket_floor
+
+
+class HotPathIndexTests(TestCase):
+    # EXPLAIN QUERY PLAN on SQLite names the index a SEARCH uses, so these
+    # guard against a hot dashboard/list query silently falling back to a scan.
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('indexer', 'indexer@example.com', 'password')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, msg=plan)
+
+    def test_reports_by_user_and_date(self):
+        self.assertUsesIndex(
+            WasteReport.objects.filter(user=self.user).order_by('-created_at'),
+            'wastereport_user_created_idx'
+        )
+
+    def test_reports_by_status_and_date(self):
+        self.assertUsesIndex(
+            WasteReport.objects.filter(status='pending').order_by('-created_at'),
+            'wastereport_status_created_idx'
+        )
+
+    def test_pickups_by_status_and_date(self):
+        self.assertUsesIndex(
+            PickupRequest.objects.filter(status='pending').order_by('-created_at'),
+            'pickup_status_created_idx'
+        )
+
+    def test_upcoming_pickups(self):
+        self.assertUsesIndex(
+            PickupRequest.objects.filter(
+                user=self.user,
+                pickup_date__gte=date.today(),
+                status__in=['pending', 'scheduled', 'in_progress']
+            ).order_by('pickup_date', 'pickup_time'),
+            'pickup_user_date_status_idx'
+        )
+
+    def test_unread_notifications(self):
+        self.assertUsesIndex(
+            Notification.objects.filter(user=self.user, is_read=False).order_by('-created_at'),
+            'notification_unread_idx'
+        )
+
+    def test_notification_list(self):
+        self.assertUsesIndex(
+            Notification.objects.filter(user=self.user).order_by('-created_at'),
+            'notification_user_created_idx'
+        )
+
+    def test_approved_forum_topics(self):
+        self.assertUsesIndex(
+            ForumTopic.objects.filter(is_approved=True).order_by('-created_at'),
+            'forumtopic_approved_idx'
+        )
+
+
+class ForumCommentListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user('author', 'author@example.com', 'password')
+        cls.other = CustomUser.objects.create_user('other', 'other@example.com', 'password')
+        cls.topic = ForumTopic.objects.create(title='Compost', description='Tips', author=cls.author, is_approved=True)
+        cls.approved = ForumComment.objects.create(topic=cls.topic, author=cls.other, content='yes', is_approved=True)
+        cls.pending = ForumComment.objects.create(topic=cls.topic, author=cls.author, content='maybe')
+
+    def comment_ids(self, client):
+        response = client.get(f'/api/forum-topics/{self.topic.pk}/comments/')
+        self.assertEqual(response.status_code, 200)
+        return [comment['id'] for comment in response.data['results']]
+
+    def test_anonymous_sees_approved_comments(self):
+        self.assertEqual(self.comment_ids(APIClient()), [self.approved.pk])
+
+    def test_author_sees_own_unapproved_comment(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        self.assertEqual(self.comment_ids(client), [self.approved.pk, self.pending.pk])
+
+    def test_other_users_do_not_see_unapproved_comment(self):
+        client = APIClient()
+        client.force_authenticate(self.other)
+        self.assertEqual(self.comment_ids(client), [self.approved.pk])
+
+
+class EventHistoryTests(SimpleTestCase):
+
+    @override_settings(EVENT_HISTORY_CHANNELS=3)
+    def test_history_keeps_most_recent_channels(self):
+        broker = LocalBroker()
+        for user_id in range(10):
+            broker.publish(f'user:{user_id}', 'notification', {})
+        broker.publish('user:7', 'notification', {})
+        self.assertEqual(list(broker.history), ['user:8', 'user:9', 'user:7'])
+        self.assertEqual(len(broker.history['user:7'][1]), 2)
+
+    @override_settings(EVENT_HISTORY_SECONDS=60)
+    def test_quiet_channels_expire(self):
+        broker = LocalBroker()
+        with mock.patch('core.events.time.monotonic', return_value=1000.0):
+            broker.publish('user:1', 'notification', {})
+        with mock.patch('core.events.time.monotonic', return_value=1030.0):
+            broker.publish('user:2', 'notification', {})
+        with mock.patch('core.events.time.monotonic', return_value=1070.0):
+            broker.publish('user:3', 'notification', {})
+        self.assertEqual(list(broker.history), ['user:2', 'user:3'])
+
+
+@override_settings(METRICS_DIR='')
+class RequestMetricsTests(TestCase):
+    labels = ('faq-list', 'list', 'GET')
+
+    def test_observe_fills_one_bucket(self):
+        metrics = MetricsRegistry()
+        metrics.observe(self.labels, 200, {'wms_http_request_queries': 3})
+        metrics.observe(self.labels, 200, {'wms_http_request_queries': 1000})
+        histogram = metrics.histograms[self.labels]['wms_http_request_queries']
+        # Buckets ..., 2, 5, ...; the last slot before sum/count is +Inf
+        self.assertEqual(histogram[3], 1)
+        self.assertEqual(histogram[-3], 1)
+        self.assertEqual(histogram[-2:], [1003, 2])
+        self.assertEqual(metrics.responses[(*self.labels, '200')], 2)
+
+    def test_merge_sums_processes(self):
+        first, second = MetricsRegistry(), MetricsRegistry()
+        first.observe(self.labels, 200, {'wms_http_request_queries': 1})
+        second.observe(self.labels, 200, {'wms_http_request_queries': 1})
+        second.observe(self.labels, 500, {'wms_http_request_queries': 50})
+        histograms, responses = _merge([first.snapshot(), second.snapshot()])
+        self.assertEqual(histograms[self.labels]['wms_http_request_queries'][-2:], [52, 3])
+        self.assertEqual(responses[(*self.labels, '200')], 2)
+        self.assertEqual(responses[(*self.labels, '500')], 1)
+
+    def test_render_is_cumulative_and_escaped(self):
+        metrics = MetricsRegistry()
+        labels = ('say "hi"', '', 'GET')
+        metrics.observe(labels, 200, {'wms_http_request_queries': 0})
+        metrics.observe(labels, 200, {'wms_http_request_queries': 2})
+        text = render_prometheus(*_merge([metrics.snapshot()]))
+        label_text = 'view="say \\"hi\\"",action="",method="GET"'
+        self.assertIn(f'wms_http_request_queries_bucket{{{label_text},le="0"}} 1', text)
+        self.assertIn(f'wms_http_request_queries_bucket{{{label_text},le="2"}} 2', text)
+        self.assertIn(f'wms_http_request_queries_bucket{{{label_text},le="+Inf"}} 2', text)
+        self.assertIn(f'wms_http_request_queries_count{{{label_text}}} 2', text)
+        self.assertIn(f'wms_http_responses_total{{{label_text},status="200"}} 2', text)
+
+    async def test_sync_view_queries_are_counted_under_asgi(self):
+        registry.histograms.clear()
+        registry.responses.clear()
+        response = await AsyncClient().get('/api/faqs/')
+        self.assertEqual(response.status_code, 200)
+        queries = registry.histograms[self.labels]['wms_http_request_queries']
+        self.assertEqual(queries[-1], 1)
+        self.assertGreater(queries[-2], 0)
+
+    def use_metrics_dir(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        override = override_settings(METRICS_DIR=directory)
+        override.enable()
+        self.addCleanup(override.disable)
+        return directory
+
+    def test_same_pid_writes_separate_files(self):
+        # A recycled pid must not overwrite the totals of the worker that had it
+        directory = self.use_metrics_dir()
+        exited, current = MetricsRegistry(), MetricsRegistry()
+        exited.observe(self.labels, 200, {'wms_http_request_queries': 1})
+        current.observe(self.labels, 200, {'wms_http_request_queries': 1})
+        exited.flush()
+        histograms, responses = current.collect()
+        self.assertEqual(len(os.listdir(directory)), 3)  # two workers and the lock
+        self.assertEqual(responses[(*self.labels, '200')], 2)
+
+    def test_exited_workers_are_folded_into_the_archive(self):
+        directory = self.use_metrics_dir()
+        exited, current = MetricsRegistry(), MetricsRegistry()
+        exited.observe(self.labels, 200, {'wms_http_request_queries': 4})
+        current.observe(self.labels, 200, {'wms_http_request_queries': 1})
+        with mock.patch('core.metrics.os.getpid', return_value=999999):
+            exited.flush()
+
+        with mock.patch('core.metrics._process_exists', side_effect=lambda pid: pid == os.getpid()):
+            histograms, responses = current.collect()
+            self.assertEqual(responses[(*self.labels, '200')], 2)
+            self.assertEqual(histograms[self.labels]['wms_http_request_queries'][-2:], [5, 2])
+            self.assertEqual(
+                sorted(name for name in os.listdir(directory) if name.endswith('.json')),
+                sorted(['metrics-archive.json', current.file_name()]),
+            )
+
+            # The archive keeps the totals on later collections
+            current.observe(self.labels, 500, {'wms_http_request_queries': 1})
+            histograms, responses = current.collect()
+            self.assertEqual(responses[(*self.labels, '200')], 2)
+            self.assertEqual(responses[(*self.labels, '500')], 1)
+
+    def test_file_already_in_the_archive_is_not_counted_twice(self):
+        # A crash between writing the archive and deleting the folded file
+        directory = self.use_metrics_dir()
+        exited, current = MetricsRegistry(), MetricsRegistry()
+        exited.observe(self.labels, 200, {'wms_http_request_queries': 4})
+        with mock.patch('core.metrics.os.getpid', return_value=999999):
+            exited.flush()
+            exited_path = os.path.join(directory, exited.file_name())
+        with open(exited_path) as exited_file:
+            snapshot = json.load(exited_file)
+        with open(os.path.join(directory, 'metrics-archive.json'), 'w') as archive:
+            json.dump({**snapshot, 'folded': [exited_path]}, archive)
+
+        with mock.patch('core.metrics._process_exists', side_effect=lambda pid: pid == os.getpid()):
+            histograms, responses = current.collect()
+        self.assertEqual(responses[(*self.labels, '200')], 1)
+        self.assertFalse(os.path.exists(exited_path))
+
+
+class NearestListTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('near', 'near@example.com', 'password')
+        # Two reports share a spot so a page boundary falls inside a tie
+        offsets = [0.002, 0.004, 0.004, 0.008, 0.012, 0.5]
+        cls.reports = [
+            WasteReport.objects.create(
+                user=cls.user, title=f'r{index}', description='d', waste_type='plastic', quantity=1,
+                latitude=4.05 + offset, longitude=9.7, address='a'
+            )
+            for index, offset in enumerate(offsets)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_pages_closest_first_in_sql(self):
+        url = '/api/waste-reports/?near=4.05,9.7&radius_km=3&page_size=2'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen += response.data['results']
+            url = response.data['next']
+
+        # The report 0.5 degrees away is outside the radius
+        self.assertEqual([item['id'] for item in seen], [report.pk for report in self.reports[:5]])
+        for item, report in zip(seen, self.reports):
+            self.assertAlmostEqual(item['distance_km'], haversine_km(4.05, 9.7, report.latitude, report.longitude), places=3)
+
+    def test_previous_link_returns_to_first_page(self):
+        first = self.client.get('/api/waste-reports/?near=4.05,9.7&radius_km=3&page_size=2')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [item['id'] for item in back.data['results']],
+            [item['id'] for item in first.data['results']]
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/waste-reports/?near=4.05,9.7&cursor=bogus')
+        self.assertEqual(response.status_code, 404)
+
+
+class CollectorRouteCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('router', 'router@example.com', 'password')
+        cls.collector = WasteCollector.objects.create(
+            name='Truck', vehicle_number='LT-1', phone_number='1', email='truck@example.com',
+            current_location_lat=4.0, current_location_lng=9.7
+        )
+        cls.day = date(2026, 3, 2)
+        cls.pickups = [
+            PickupRequest.objects.create(
+                user=cls.user, waste_type='plastic', pickup_date=cls.day, pickup_time=time(9, 0),
+                address=f'Stop {index}', latitude=4.0 + 0.01 * index, longitude=9.7, quantity_estimate=1,
+                collector=cls.collector, status='scheduled'
+            )
+            for index in (3, 1, 2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def route(self, position=None):
+        positions = {self.collector.pk: position} if position else {}
+        with mock.patch('core.routing.latest_positions', return_value=positions), \
+                mock.patch('core.routing.plan_order', wraps=plan_order) as planner:
+            route = collector_route(self.collector, self.day)
+        return route, planner.call_count
+
+    def test_orders_stops_from_database_position(self):
+        route, planned = self.route()
+        self.assertEqual(planned, 1)
+        self.assertEqual(route['start'], {'latitude': 4.0, 'longitude': 9.7})
+        self.assertEqual([stop['address'] for stop in route['stops']], ['Stop 1', 'Stop 2', 'Stop 3'])
+        self.assertAlmostEqual(route['total_km'], haversine_km(4.0, 9.7, 4.03, 9.7), places=2)
+
+    def test_pings_within_a_cell_reuse_the_order(self):
+        self.route({'latitude': 4.001, 'longitude': 9.701})
+        route, planned = self.route({'latitude': 4.002, 'longitude': 9.702})
+        self.assertEqual(planned, 0)
+        # Legs are measured from the live position, not the cached one
+        self.assertEqual(route['start'], {'latitude': 4.002, 'longitude': 9.702})
+        self.assertAlmostEqual(
+            route['stops'][0]['leg_km'], haversine_km(4.002, 9.702, 4.01, 9.7), places=3
+        )
+
+    def test_buffered_position_wins_over_database(self):
+        route, _ = self.route({'latitude': 4.05, 'longitude': 9.7})
+        self.assertEqual(route['start'], {'latitude': 4.05, 'longitude': 9.7})
+        self.assertEqual([stop['address'] for stop in route['stops']], ['Stop 3', 'Stop 2', 'Stop 1'])
+
+    def test_moving_to_another_cell_replans(self):
+        self.route({'latitude': 4.0, 'longitude': 9.7})
+        _, planned = self.route({'latitude': 4.2, 'longitude': 9.7})
+        self.assertEqual(planned, 1)
+
+    def test_assignment_change_replans(self):
+        self.route()
+        PickupRequest.objects.filter(pk=self.pickups[0].pk).update(status='cancelled')
+        route, planned = self.route()
+        self.assertEqual(planned, 1)
+        self.assertEqual([stop['address'] for stop in route['stops']], ['Stop 1', 'Stop 2'])
+
+    def test_no_pickups(self):
+        route = collector_route(self.collector, date(2026, 3, 3))
+        self.assertEqual(route['stops'], [])
+        self.assertEqual(route['total_km'], 0.0)
+
+
+class DeltaSyncTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('syncer', 'syncer@example.com', 'password')
+        cls.other = CustomUser.objects.create_user('bystander', 'bystander@example.com', 'password')
+        cls.base = timezone.now() - timedelta(hours=1)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def notification(self, seconds, user=None):
+        notification = Notification.objects.create(
+            user=user or self.user, title='Hello', message='Hi', notification_type='educational'
+        )
+        # update() skips auto_now, so the sync order is under the test's control
+        Notification.objects.filter(pk=notification.pk).update(updated_at=self.base + timedelta(seconds=seconds))
+        return notification.pk
+
+    def delete(self, pk, seconds):
+        Notification.objects.get(pk=pk).delete()
+        SyncTombstone.objects.filter(object_id=pk).update(deleted_at=self.base + timedelta(seconds=seconds))
+
+    def sync_all(self, page_size):
+        pages = []
+        response = self.client.get(f'/api/notifications/?since=0&page_size={page_size}')
+        while True:
+            self.assertEqual(response.status_code, 200)
+            pages.append(([item['id'] for item in response.data['results']], response.data['deleted']))
+            if not response.data['has_more']:
+                return pages, response.data['watermark']
+            response = self.client.get(
+                f'/api/notifications/?since={response.data["watermark"]}&page_size={page_size}'
+            )
+
+    def test_deletions_share_the_page_size(self):
+        kept = [self.notification(seconds) for seconds in (1, 2, 5)]
+        deleted = [self.notification(seconds) for seconds in (3, 4, 6)]
+        for pk, seconds in zip(deleted, (7, 8, 9)):
+            self.delete(pk, seconds)
+
+        pages, _ = self.sync_all(page_size=2)
+        self.assertTrue(all(len(results) + len(gone) <= 2 for results, gone in pages))
+        self.assertEqual([pk for results, _ in pages for pk in results], kept)
+        self.assertEqual([pk for _, gone in pages for pk in gone], deleted)
+        self.assertEqual(len(pages), 3)
+
+    def test_row_and_deletion_at_the_same_instant(self):
+        first, second = self.notification(1), self.notification(2)
+        self.delete(second, 1)
+
+        pages, _ = self.sync_all(page_size=1)
+        # The row sorts before the deletion stamped at the same time
+        self.assertEqual(pages[:2], [([first], []), ([], [second])])
+
+    def test_only_own_deletions(self):
+        theirs = self.notification(1, user=self.other)
+        self.delete(theirs, 2)
+        mine = self.notification(3)
+        self.delete(mine, 4)
+
+        pages, _ = self.sync_all(page_size=10)
+        self.assertEqual(pages, [([], [mine])])
+
+    def test_nothing_new_after_catching_up(self):
+        self.notification(1)
+        _, watermark = self.sync_all(page_size=10)
+        response = self.client.get(f'/api/notifications/?since={watermark}')
+        self.assertEqual((response.data['results'], response.data['deleted']), ([], []))
+        self.assertFalse(response.data['has_more'])
+
+    def test_watermark_without_kind_is_accepted(self):
+        pk = self.notification(2)
+        watermark = base64.urlsafe_b64encode(
+            json.dumps({'t': (self.base + timedelta(seconds=1)).isoformat(), 'id': 0}).encode()
+        ).decode()
+        response = self.client.get(f'/api/notifications/?since={watermark}')
+        self.assertEqual([item['id'] for item in response.data['results']], [pk])
+
+    def test_rows_sharing_a_timestamp_across_pages(self):
+        tied = [self.notification(1) for _ in range(3)]
+        pages, _ = self.sync_all(page_size=2)
+        self.assertEqual([results for results, _ in pages], [tied[:2], tied[2:]])
+
+    def test_changes_after_a_watermark(self):
+        self.notification(1)
+        _, watermark = self.sync_all(page_size=10)
+        # Made after the sync, so newer than the watermark despite its lag
+        updated = Notification.objects.create(
+            user=self.user, title='Later', message='Hi', notification_type='educational'
+        )
+        gone = self.notification(2)
+        Notification.objects.get(pk=gone).delete()
+
+        response = self.client.get(f'/api/notifications/?since={watermark}')
+        self.assertEqual([item['id'] for item in response.data['results']], [updated.pk])
+        self.assertEqual(response.data['deleted'], [gone])
+
+    def test_staff_see_every_report_deletion(self):
+        staff = CustomUser.objects.create_user('auditor', 'auditor@example.com', 'password', is_staff=True)
+        for owner in (self.user, self.other):
+            WasteReport.objects.create(
+                user=owner, title='Heap', description='Heap', waste_type='plastic',
+                latitude=4.05, longitude=9.7, address='Road', quantity=1
+            ).delete()
+
+        own = self.client.get('/api/waste-reports/?since=0')
+        self.client.force_authenticate(staff)
+        every = self.client.get('/api/waste-reports/?since=0')
+        self.assertEqual(len(own.data['deleted']), 1)
+        self.assertEqual(len(every.data['deleted']), 2)
+
+    def test_media_finishing_after_the_watermark(self):
+        report = WasteReport.objects.create(
+            user=self.user, title='Heap', description='Heap', waste_type='plastic',
+            latitude=4.05, longitude=9.7, address='Road', quantity=1
+        )
+        media = WasteReportMedia.objects.create(
+            waste_report=report, media_type='image', upload_status='pending', staged_path='/tmp/heap.jpg'
+        )
+        WasteReport.objects.filter(pk=report.pk).update(updated_at=self.base)
+        first = self.client.get('/api/waste-reports/?since=0')
+        self.assertEqual(first.data['results'][0]['media'][0]['upload_status'], 'pending')
+
+        # As the media worker finishes the upload
+        media.upload_status = 'uploaded'
+        media.save(update_fields=['upload_status'])
+
+        response = self.client.get(f'/api/waste-reports/?since={first.data["watermark"]}')
+        self.assertEqual([item['id'] for item in response.data['results']], [report.pk])
+        self.assertEqual(response.data['results'][0]['media'][0]['upload_status'], 'uploaded')
+
+    def test_invalid_watermark(self):
+        self.assertEqual(self.client.get('/api/notifications/?since=bogus').status_code, 400)
+
+    def test_expired_watermark(self):
+        watermark = encode_watermark(timezone.now() - timedelta(days=400), 0)
+        self.assertEqual(self.client.get(f'/api/notifications/?since={watermark}').status_code, 410)
+
+
+@override_settings(NOTIFICATION_FANOUT_CHUNK_SIZE=2)
+class BroadcastTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            CustomUser.objects.create_user(f'listener{index}', f'listener{index}@example.com', 'password')
+            for index in range(5)
+        ]
+
+    def broadcast(self, **fields):
+        broadcast = NotificationBroadcast.objects.create(
+            title='Collection moved', message='Thursday this week', notification_type='educational', **fields
+        )
+        updated_at = fields.get('updated_at')
+        if updated_at is not None:
+            NotificationBroadcast.objects.filter(pk=broadcast.pk).update(updated_at=updated_at)
+        return broadcast
+
+    def test_invalidates_only_recipient_dashboards(self):
+        broadcast = self.broadcast()
+        with mock.patch('core.notifications.invalidate_user_dashboard') as invalidate, \
+                mock.patch('core.dashboard.invalidate_all_dashboards') as invalidate_all:
+            run_broadcast(broadcast.pk)
+        self.assertEqual(
+            sorted(call.args[0] for call in invalidate.call_args_list), [user.pk for user in self.users]
+        )
+        invalidate_all.assert_not_called()
+
+    def test_command_resumes_stale_running_broadcast(self):
+        broadcast = self.broadcast(
+            status='running', sent_count=2, last_recipient_id=self.users[1].pk,
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        output = StringIO()
+        call_command('process_broadcasts', stdout=output)
+
+        broadcast.refresh_from_db()
+        self.assertEqual(broadcast.status, 'completed')
+        self.assertEqual((broadcast.sent_count, broadcast.total_recipients), (5, 5))
+        # Users the first worker reached are not notified twice
+        self.assertEqual(
+            sorted(Notification.objects.values_list('user_id', flat=True)), [user.pk for user in self.users[2:]]
+        )
+        self.assertIn(f'Broadcast {broadcast.pk}: completed (5/5 sent)', output.getvalue())
+
+    def test_command_runs_pending_and_leaves_live_running_broadcasts(self):
+        pending = self.broadcast()
+        live = self.broadcast(status='running', updated_at=timezone.now())
+        call_command('process_broadcasts', stdout=StringIO())
+
+        pending.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual(pending.status, 'completed')
+        self.assertEqual(live.status, 'running')
+        self.assertEqual(Notification.objects.count(), 5)
+
+
+class ExportJobReclaimTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('exporter', 'exporter@example.com', 'password')
+        WasteReport.objects.create(
+            user=cls.user, title='Dumped tyres', description='By the bridge', waste_type='other',
+            latitude=4.05, longitude=9.7, address='Bridge', quantity=40
+        )
+
+    def setUp(self):
+        export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_root)
+        settings_override = override_settings(EXPORT_ROOT=export_root, EXPORT_JOB_STALE_SECONDS=600)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def job(self, status, claimed_ago):
+        job = ExportJob.objects.create(user=self.user, export_type='waste_reports', status=status)
+        ExportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - claimed_ago)
+        return job
+
+    def test_command_reruns_job_abandoned_while_running(self):
+        job = self.job('running', timedelta(hours=1))
+        call_command('process_export_jobs', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.row_count), ('completed', 1))
+        self.assertTrue(os.path.exists(export_file_path(job)))
+        self.assertEqual(os.listdir(os.path.dirname(export_file_path(job))), [job.file_name])
+
+    def test_command_leaves_recently_claimed_job(self):
+        job = self.job('running', timedelta(seconds=30))
+        call_command('process_export_jobs', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'running')
+
+    def test_bad_filters_are_rejected_before_queueing(self):
+        staff = CustomUser.objects.create_user('planner', 'planner@example.com', 'password', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+        for export_type in ('waste_reports', 'pickup_requests'):
+            for filters in ({'date_from': 5}, {'date_from': '2024-02-30'}, {'status': ['open']}, ['date_from']):
+                response = client.post(
+                    '/api/export-jobs/', {'export_type': export_type, 'filters': filters}, format='json'
+                )
+                self.assertEqual(response.status_code, 400, (export_type, filters))
+        self.assertFalse(ExportJob.objects.filter(user=staff).exists())
+
+    def test_finished_jobs_are_not_rerun(self):
+        job = self.job('failed', timedelta(hours=1))
+        run_export_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+
+class DashboardInvalidationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('dashboarder', 'dashboarder@example.com', 'password')
+        cls.report = WasteReport.objects.create(
+            user=cls.user, title='Overflowing bin', description='Market square', waste_type='organic',
+            latitude=4.05, longitude=9.7, address='Market', quantity=10
+        )
+        cls.collector = WasteCollector.objects.create(
+            name='Truck', vehicle_number='LT-1', phone_number='1', email='truck@example.com'
+        )
+        PickupRequest.objects.create(
+            user=cls.user, waste_type='plastic', pickup_date=timezone.localdate() + timedelta(days=1),
+            pickup_time=time(9, 0), address='Home', latitude=4.05, longitude=9.7, quantity_estimate=5,
+            collector=cls.collector, status='scheduled'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_media_upload_status_change(self):
+        media = WasteReportMedia.objects.create(
+            waste_report=self.report, media_type='image', upload_status='pending', staged_path='/tmp/photo.jpg'
+        )
+        get_user_dashboard(self.user)
+
+        # As the media worker finishes an upload
+        media.upload_status = 'failed'
+        media.save(update_fields=['upload_status'])
+
+        recent = get_user_dashboard(self.user)['reports_summary']['recent_reports']
+        self.assertEqual(recent[0]['media'][0]['upload_status'], 'failed')
+
+    def test_collector_deleted(self):
+        get_user_dashboard(self.user)
+        self.collector.delete()
+
+        upcoming = get_user_dashboard(self.user)['pickups_summary']['upcoming_pickups']
+        self.assertIsNone(upcoming[0]['collector'])
+
+    def test_report_deleted_with_media(self):
+        WasteReportMedia.objects.create(waste_report=self.report, media_type='image')
+        self.report.delete()
+        self.assertEqual(get_user_dashboard(self.user)['reports_summary']['recent_reports'], [])
+
+
+class DashboardFiguresTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('figures', 'figures@example.com', 'password')
+        cls.other = CustomUser.objects.create_user('elsewhere', 'elsewhere@example.com', 'password')
+        cls.add_rows(cls.user, 1)
+        cls.add_rows(cls.other, 1)
+
+    @classmethod
+    def add_rows(cls, user, copies):
+        now = timezone.now()
+        statuses = ['pending', 'pending', 'reviewed', 'in_progress', 'resolved', 'resolved', 'cancelled']
+        types = ['plastic', 'organic', 'glass']
+        for copy in range(copies):
+            for index, status in enumerate(statuses):
+                report = WasteReport.objects.create(
+                    user=user, title='r', description='d', waste_type=types[index % len(types)],
+                    latitude=4.05, longitude=9.7, address='a', quantity=1, status=status
+                )
+                # Spread creation over the last 30 days, the last week and before
+                WasteReport.objects.filter(pk=report.pk).update(created_at=now - timedelta(days=(index * 6) % 45))
+                WasteReportMedia.objects.create(waste_report=report, media_type='image', upload_status='pending')
+            for index, status in enumerate(['pending', 'scheduled', 'in_progress', 'completed', 'cancelled']):
+                PickupRequest.objects.create(
+                    user=user, waste_type='plastic', pickup_date=timezone.localdate() + timedelta(days=index - 2),
+                    pickup_time=time(9, 0), address='Home', latitude=4.05, longitude=9.7, quantity_estimate=5,
+                    status=status
+                )
+            for index, notification_type in enumerate(['waste_report', 'pickup_status', 'pickup_status']):
+                Notification.objects.create(
+                    user=user, title='t', message='m', notification_type=notification_type, is_read=index == 0
+                )
+
+    def test_figures_match_per_status_counts(self):
+        now = timezone.now()
+        reports = WasteReport.objects.filter(user=self.user)
+        pickups = PickupRequest.objects.filter(user=self.user)
+        notifications = Notification.objects.filter(user=self.user)
+        dashboard = build_user_dashboard(self.user)
+
+        summary = dashboard['reports_summary']
+        self.assertEqual(summary['total_reports'], reports.count())
+        self.assertEqual(
+            {row['status']: row['count'] for row in summary['reports_by_status']},
+            {status: reports.filter(status=status).count() for status, _ in WasteReport.STATUS_CHOICES},
+        )
+        self.assertEqual(
+            {row['waste_type']: row['count'] for row in summary['reports_by_type']},
+            {waste_type: reports.filter(waste_type=waste_type).count() for waste_type in ('plastic', 'organic', 'glass')},
+        )
+
+        tracking = dashboard['waste_tracking']
+        # Reports are resolved, not completed; the key kept its old name
+        self.assertEqual(tracking['status_breakdown'], {
+            'pending': reports.filter(status='pending').count(),
+            'in_progress': reports.filter(status='in_progress').count(),
+            'completed': reports.filter(status='resolved').count(),
+            'attention_needed': reports.filter(status='pending', created_at__lte=now - timedelta(days=7)).count(),
+        })
+        last_30_days = reports.filter(created_at__gte=now - timedelta(days=30)).count()
+        self.assertEqual(tracking['monthly_statistics'], {
+            'total_reports': last_30_days,
+            'resolution_rate': f'{reports.filter(status="resolved").count() / reports.count() * 100:.1f}%',
+        })
+        self.assertEqual(tracking['timeline']['last_30_days'], last_30_days)
+        self.assertEqual(tracking['timeline']['pending_over_7_days'], tracking['status_breakdown']['attention_needed'])
+
+        self.assertEqual(dashboard['pickups_summary']['statistics'], {
+            'total_pickups': pickups.count(),
+            'completed_pickups': pickups.filter(status='completed').count(),
+            'pending_pickups': pickups.filter(status__in=['pending', 'scheduled']).count(),
+            'completion_rate': f'{pickups.filter(status="completed").count() / pickups.count() * 100:.1f}%',
+        })
+        self.assertEqual(dashboard['notifications']['unread_count'], notifications.filter(is_read=False).count())
+        self.assertEqual(
+            {row['notification_type']: row['count'] for row in dashboard['notifications']['by_type']},
+            {'waste_report': 1, 'pickup_status': 2},
+        )
+
+    def test_empty_dashboard(self):
+        dashboard = build_user_dashboard(CustomUser.objects.create_user('new', 'new@example.com', 'password'))
+        self.assertEqual(dashboard['reports_summary']['total_reports'], 0)
+        self.assertEqual(dashboard['waste_tracking']['monthly_statistics']['resolution_rate'], '0.0%')
+        self.assertEqual(dashboard['pickups_summary']['statistics']['completion_rate'], '0.0%')
+        self.assertFalse(dashboard['notifications']['has_new'])
+
+    def test_query_count_does_not_grow_with_rows(self):
+        # Three grouped aggregates, the profile, and the listed rows with
+        # their media prefetches
+        with self.assertNumQueries(12):
+            build_user_dashboard(self.user)
+        self.add_rows(self.user, 5)
+        with self.assertNumQueries(12):
+            build_user_dashboard(self.user)
+
+
+class ProfilePictureQueueTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('portrait', 'portrait@example.com', 'password')
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        settings_override = override_settings(
+            MEDIA_ROOT=root, MEDIA_STAGING_ROOT=os.path.join(root, 'staging'),
+            MEDIA_UPLOAD_BACKEND='core.media.LocalUploadBackend'
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def picture(self, name='me.jpg'):
+        content = BytesIO()
+        Image.new('RGB', (600, 400), 'green').save(content, 'JPEG')
+        return SimpleUploadedFile(name, content.getvalue(), content_type='image/jpeg')
+
+    def upload(self, picture):
+        with mock.patch('core.media._executor') as executor, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/api/profile/0/', {'profile_picture': picture}, format='multipart')
+        return response, executor
+
+    def test_upload_is_queued_not_done_in_the_request(self):
+        with mock.patch('core.media.upload_image_variants') as upload_variants:
+            response, executor = self.upload(self.picture())
+        upload_variants.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['picture_upload_status'], 'pending')
+        self.assertEqual(response.data['profile_picture_variants'], {})
+        profile = UserProfile.objects.get(user=self.user)
+        executor.submit.assert_called_once_with(_run_in_worker, process_profile_picture, profile.pk)
+        self.assertTrue(os.path.exists(profile.picture_staged_path))
+
+    def test_worker_stores_variants(self):
+        self.upload(self.picture())
+        profile = UserProfile.objects.get(user=self.user)
+        staged_path = profile.picture_staged_path
+        process_profile_picture(profile.pk)
+
+        profile.refresh_from_db()
+        self.assertEqual(profile.picture_upload_status, 'uploaded')
+        self.assertEqual(set(profile.profile_picture_variants), {'thumbnail', 'medium', 'full'})
+        self.assertEqual(
+            f'{profile.profile_picture.public_id}.{profile.profile_picture.format}',
+            profile.profile_picture_variants['full']['name']
+        )
+        self.assertEqual(profile.picture_staged_path, '')
+        self.assertFalse(os.path.exists(staged_path))
+
+    def test_newer_picture_wins(self):
+        self.upload(self.picture('first.jpg'))
+        profile = UserProfile.objects.get(user=self.user)
+        first_path = profile.picture_staged_path
+
+        def replaced_mid_upload(path, field, backend):
+            # The user uploads again while the first picture is being processed
+            self.upload(self.picture('second.jpg'))
+            return upload_image_variants(path, field, backend)
+
+        with mock.patch('core.media.upload_image_variants', side_effect=replaced_mid_upload):
+            process_profile_picture(profile.pk)
+
+        profile.refresh_from_db()
+        self.assertEqual(profile.picture_upload_status, 'pending')
+        self.assertNotEqual(profile.picture_staged_path, first_path)
+        self.assertEqual(profile.profile_picture_variants, {})
+        self.assertFalse(os.path.exists(first_path))
+
+        call_command('process_media_uploads', stdout=StringIO())
+        profile.refresh_from_db()
+        self.assertEqual(profile.picture_upload_status, 'uploaded')
+
+    def test_unreadable_file_is_stored_as_is(self):
+        self.upload(SimpleUploadedFile('me.heic', b'not really an image', content_type='image/heic'))
+        profile = UserProfile.objects.get(user=self.user)
+        process_profile_picture(profile.pk)
+
+        profile.refresh_from_db()
+        self.assertEqual(profile.picture_upload_status, 'uploaded')
+        self.assertEqual(profile.profile_picture_variants, {})
+        self.assertEqual(profile.profile_picture.format, 'heic')
+
+
+class DailyRollupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('roller', 'roller@example.com', 'password')
+
+    def report(self, **fields):
+        values = {
+            'user': self.user, 'title': 'Dumped sacks', 'description': 'Roadside', 'waste_type': 'plastic',
+            'latitude': 4.05, 'longitude': 9.7, 'address': 'Road', 'quantity': 12, **fields
+        }
+        return WasteReport.objects.create(**values)
+
+    def buckets(self):
+        return {
+            (row.waste_type, row.status): (row.count, row.quantity)
+            for row in WasteReportDailyStat.objects.filter(count__gt=0)
+        }
+
+    def assertMatchesRebuild(self):
+        maintained = self.buckets()
+        rebuild(WasteReport, WasteReportDailyStat, 'quantity', 'quantity')
+        self.assertEqual(maintained, self.buckets())
+
+    def test_create_adds_to_bucket(self):
+        self.report()
+        self.report(quantity=3)
+        self.assertEqual(self.buckets(), {('plastic', 'pending'): (2, 15)})
+
+    def test_status_change_moves_bucket(self):
+        report = self.report()
+        self.report()
+        report.status = 'resolved'
+        report.save()
+        self.assertEqual(
+            self.buckets(), {('plastic', 'pending'): (1, 12), ('plastic', 'resolved'): (1, 12)}
+        )
+        self.assertMatchesRebuild()
+
+    def test_quantity_and_type_change(self):
+        report = self.report()
+        report.quantity = 20
+        report.save()
+        self.assertEqual(self.buckets(), {('plastic', 'pending'): (1, 20)})
+        report.waste_type = 'organic'
+        report.save()
+        self.assertEqual(self.buckets(), {('organic', 'pending'): (1, 20)})
+        self.assertMatchesRebuild()
+
+    def test_repeated_saves_count_once(self):
+        report = self.report()
+        report.save()
+        WasteReport.objects.get(pk=report.pk).save()
+        self.assertEqual(self.buckets(), {('plastic', 'pending'): (1, 12)})
+
+    def test_delete_removes_from_bucket(self):
+        report = self.report()
+        report.delete()
+        self.assertEqual(self.buckets(), {})
+        self.assertMatchesRebuild()
+
+    def test_save_of_partially_loaded_row_leaves_buckets(self):
+        report = self.report()
+        partial = WasteReport.objects.only('id', 'title').get(pk=report.pk)
+        partial.title = 'Renamed'
+        partial.save(update_fields=['title'])
+        self.assertEqual(self.buckets(), {('plastic', 'pending'): (1, 12)})
+
+    def test_pickup_status_change(self):
+        pickup = PickupRequest.objects.create(
+            user=self.user, waste_type='general', pickup_date=date(2026, 3, 2), pickup_time=time(9, 0),
+            address='Home', latitude=4.05, longitude=9.7, quantity_estimate=7.5
+        )
+        pickup.status = 'completed'
+        pickup.save()
+        rows = PickupRequestDailyStat.objects.filter(count__gt=0).values_list('status', 'count', 'quantity_estimate')
+        self.assertEqual(list(rows), [('completed', 1, 7.5)])
+
+
+class TimeSeriesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_user('analyst', 'analyst@example.com', 'password', is_staff=True)
+        cls.team = CleanupTeam.objects.create(
+            name='North crew', contact_person='Ada', phone_number='1', email='north@example.com'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def report(self, created, resolved=None, **fields):
+        report = WasteReport.objects.create(**{
+            'user': self.staff, 'title': 'Heap', 'description': 'Heap', 'waste_type': 'plastic',
+            'latitude': 4.05, 'longitude': 9.7, 'address': 'Road', 'quantity': 10, **fields
+        })
+        changes = {'created_at': timezone.make_aware(created)}
+        if resolved is not None:
+            changes.update(status='resolved', resolved_at=timezone.make_aware(resolved))
+        WasteReport.objects.filter(pk=report.pk).update(**changes)
+        return report
+
+    def series(self, **params):
+        response = self.client.get('/api/waste-reports/timeseries/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_bucket_floor(self):
+        days = np.array(['2026-03-01', '2026-03-04', '2026-03-08'], dtype='datetime64[D]')
+        self.assertEqual(
+            [str(day) for day in bucket_floor(days, 'week')], ['2026-02-23', '2026-03-02', '2026-03-02']
+        )
+        self.assertEqual([str(day) for day in bucket_floor(days, 'month')], ['2026-03-01'] * 3)
+
+    def test_median_per_cell(self):
+        axis = bucket_axis(date(2026, 3, 1), date(2026, 3, 3), 'day')
+        days = np.array(['2026-03-01', '2026-03-01', '2026-03-03', '2026-03-01'], dtype='datetime64[D]')
+        keys = np.array([0, 0, 0, 1])
+        _, matrix = aggregate(days, keys, np.array([1.0, 3.0, 5.0, 8.0]), axis, 'day', median=True)
+        np.testing.assert_array_equal(matrix, [[2.0, np.nan, 5.0], [8.0, np.nan, np.nan]])
+
+    def test_daily_counts_fill_gaps(self):
+        self.report(datetime(2026, 3, 1, 10))
+        self.report(datetime(2026, 3, 1, 23), quantity=5)
+        self.report(datetime(2026, 3, 3, 8))
+        rebuild_all()
+
+        data = self.series(**{'from': '2026-03-01', 'to': '2026-03-04'})
+        self.assertEqual(data['buckets'], ['2026-03-01', '2026-03-02', '2026-03-03', '2026-03-04'])
+        self.assertEqual(data['series'], [{'key': 'total', 'label': 'Total', 'values': [2, 0, 1, 0]}])
+        kg = self.series(**{'from': '2026-03-01', 'to': '2026-03-02', 'metric': 'kg'})
+        self.assertEqual(kg['series'][0]['values'], [15.0, 0.0])
+
+    def test_weekly_buckets_span_month_end(self):
+        self.report(datetime(2026, 2, 27, 12))
+        self.report(datetime(2026, 3, 1, 12))
+        self.report(datetime(2026, 3, 2, 12))
+        rebuild_all()
+
+        data = self.series(**{'from': '2026-02-27', 'to': '2026-03-02', 'bucket': 'week'})
+        self.assertEqual(data['buckets'], ['2026-02-23', '2026-03-02'])
+        self.assertEqual(data['series'][0]['values'], [2, 1])
+
+    def test_status_change_moves_between_groups(self):
+        report = WasteReport.objects.create(
+            user=self.staff, title='Heap', description='Heap', waste_type='plastic',
+            latitude=4.05, longitude=9.7, address='Road', quantity=10
+        )
+        today = timezone.localdate().isoformat()
+        params = {'from': today, 'to': today, 'group_by': 'status'}
+        self.assertEqual([series['key'] for series in self.series(**params)['series']], ['pending'])
+
+        report.status = 'resolved'
+        report.save()
+        series = self.series(**params)['series']
+        self.assertEqual([(series['key'], series['label'], series['values']) for series in series], [
+            ('resolved', 'Resolved', [1])
+        ])
+
+    def test_group_by_team_labels_unassigned(self):
+        self.report(datetime(2026, 3, 1, 12), assigned_team=self.team)
+        self.report(datetime(2026, 3, 1, 12))
+        data = self.series(**{'from': '2026-03-01', 'to': '2026-03-01', 'group_by': 'team'})
+        self.assertEqual(
+            [(series['key'], series['label'], series['values']) for series in data['series']],
+            [(None, 'Unassigned', [1]), (self.team.pk, 'North crew', [1])]
+        )
+
+    def test_resolution_time_median(self):
+        self.report(datetime(2026, 3, 1, 8), resolved=datetime(2026, 3, 2, 10))
+        self.report(datetime(2026, 3, 1, 8), resolved=datetime(2026, 3, 2, 20))
+        self.report(datetime(2026, 3, 1, 8))
+        data = self.series(**{'from': '2026-03-01', 'to': '2026-03-02', 'metric': 'resolution_time'})
+        # Bucketed by the day the report was resolved
+        self.assertEqual(data['series'][0]['values'], [None, 31.0])
+
+    def test_empty_range(self):
+        for metric, empty in (('count', 0), ('kg', 0.0), ('resolution_time', None)):
+            data = self.series(**{'from': '2020-01-01', 'to': '2020-01-03', 'metric': metric})
+            self.assertEqual(data['series'], [{'key': 'total', 'label': 'Total', 'values': [empty] * 3}])
+        grouped = self.series(**{'from': '2020-01-01', 'to': '2020-01-03', 'group_by': 'waste_type'})
+        self.assertEqual(grouped['series'], [])
+
+    def test_invalid_parameters(self):
+        for params in (
+            {'from': '2026-03-05', 'to': '2026-03-01'},
+            {'from': 'March'},
+            {'bucket': 'hour'},
+            {'metric': 'weight'},
+            {'group_by': 'collector'},
+            {'from': '2020-01-01', 'to': '2026-01-01'},
+        ):
+            response = self.client.get('/api/waste-reports/timeseries/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.data)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(CustomUser.objects.create_user('resident', 'resident@example.com', 'pw'))
+        self.assertEqual(self.client.get('/api/waste-reports/timeseries/').status_code, 403)
+
+
+class CollectorIndexTests(SimpleTestCase):
+
+    def collectors(self, positions):
+        return [
+            WasteCollector(pk=pk, name=f'Truck {pk}', current_location_lat=lat, current_location_lng=lng)
+            for pk, (lat, lng) in enumerate(positions, start=1)
+        ]
+
+    def test_matches_brute_force(self):
+        generator = random.Random(7)
+        collectors = self.collectors([(generator.uniform(3.8, 4.3), generator.uniform(9.5, 10.0)) for _ in range(200)])
+        index = CollectorIndex(collectors)
+        for _ in range(200):
+            lat, lng = generator.uniform(3.5, 4.6), generator.uniform(9.2, 10.3)
+            exclude = {generator.randint(1, 200) for _ in range(5)}
+            best, distance = index.nearest(lat, lng, exclude=exclude)
+            expected = min(
+                (haversine_km(lat, lng, c.current_location_lat, c.current_location_lng), c.pk)
+                for c in collectors if c.pk not in exclude
+            )
+            self.assertEqual((round(distance, 9), best.pk), (round(expected[0], 9), expected[1]))
+
+    def test_distant_collector_found_by_fallback(self):
+        index = CollectorIndex(self.collectors([(14.0, 9.7)]))
+        best, distance = index.nearest(4.0, 9.7)
+        self.assertEqual(best.pk, 1)
+        self.assertAlmostEqual(distance, haversine_km(4.0, 9.7, 14.0, 9.7))
+
+    def test_collectors_without_position_are_skipped(self):
+        index = CollectorIndex(self.collectors([(None, None)]))
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.nearest(4.0, 9.7), (None, None))
+
+    def test_removed_collector_is_not_returned(self):
+        index = CollectorIndex(self.collectors([(4.0, 9.7), (4.1, 9.7)]))
+        index.remove(1)
+        self.assertEqual(index.nearest(4.0, 9.7)[0].pk, 2)
+
+
+@override_settings(COLLECTOR_DAILY_CAPACITY=1)
+class AutoAssignTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_user('dispatcher', 'dispatcher@example.com', 'password', is_staff=True)
+        cls.near, cls.far = [
+            WasteCollector.objects.create(
+                name=name, vehicle_number=name, phone_number='1', email=f'{name}@example.com',
+                current_location_lat=lat, current_location_lng=9.7
+            )
+            for name, lat in (('near', 4.01), ('far', 4.2))
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def pickup(self, pickup_date=date(2026, 3, 2), hour=9):
+        return PickupRequest.objects.create(
+            user=self.staff, waste_type='general', pickup_date=pickup_date, pickup_time=time(hour, 0),
+            address='Home', latitude=4.0, longitude=9.7, quantity_estimate=5
+        )
+
+    def test_nearest_collector_is_assigned_and_notified(self):
+        pickup = self.pickup()
+        result = auto_assign([pickup.pk])
+        self.assertEqual(result['unassigned'], [])
+        self.assertEqual(result['assigned'][0]['collector_id'], self.near.pk)
+        self.assertAlmostEqual(result['assigned'][0]['distance_km'], haversine_km(4.0, 9.7, 4.01, 9.7), places=3)
+        pickup.refresh_from_db()
+        self.assertEqual((pickup.collector_id, pickup.status), (self.near.pk, 'scheduled'))
+        self.assertTrue(Notification.objects.filter(user=self.staff, reference_id=pickup.pk).exists())
+
+    def test_full_collector_passes_to_next_nearest(self):
+        first, second, third = self.pickup(hour=9), self.pickup(hour=10), self.pickup(hour=11)
+        other_day = self.pickup(pickup_date=date(2026, 3, 3))
+        response = self.client.post('/api/pickup-requests/auto_assign/', {}, format='json')
+
+        assigned = {row['pickup_id']: row['collector_id'] for row in response.data['assigned']}
+        self.assertEqual(assigned, {first.pk: self.near.pk, second.pk: self.far.pk, other_day.pk: self.near.pk})
+        self.assertEqual(response.data['unassigned'], [third.pk])
+
+    def test_pickup_date_filter(self):
+        self.pickup(pickup_date=date(2026, 3, 2))
+        later = self.pickup(pickup_date=date(2026, 3, 3))
+        response = self.client.post('/api/pickup-requests/auto_assign/', {'pickup_date': '2026-03-03'}, format='json')
+        self.assertEqual([row['pickup_id'] for row in response.data['assigned']], [later.pk])
+
+    def test_invalid_pickup_date(self):
+        for value in ('tuesday', '2024-02-30', 20240301, ['2026-03-02']):
+            response = self.client.post('/api/pickup-requests/auto_assign/', {'pickup_date': value}, format='json')
+            self.assertEqual(response.status_code, 400, value)
+        self.assertFalse(PickupRequest.objects.exclude(collector=None).exists())
+
+    def test_cancelled_pickups_do_not_use_capacity(self):
+        self.pickup()
+        PickupRequest.objects.update(collector=self.near, status='cancelled')
+        pickup = self.pickup()
+        self.assertEqual(auto_assign([pickup.pk])['assigned'][0]['collector_id'], self.near.pk)
+
+    def test_unavailable_collector_is_skipped(self):
+        index = build_collector_index()
+        WasteCollector.objects.filter(pk=self.near.pk).update(is_available=False)
+        pickup = self.pickup()
+        self.assertEqual(auto_assign([pickup.pk], index)['assigned'][0]['collector_id'], self.far.pk)
+
+    def test_buffered_position_is_used(self):
+        pickup = self.pickup()
+        position = {self.far.pk: {'latitude': 4.0, 'longitude': 9.7}}
+        with mock.patch('core.dispatch.latest_positions', return_value=position):
+            result = auto_assign([pickup.pk])
+        self.assertEqual(result['assigned'][0]['collector_id'], self.far.pk)
+
+    def test_already_assigned_pickup_is_left_alone(self):
+        pickup = self.pickup()
+        PickupRequest.objects.filter(pk=pickup.pk).update(collector=self.far, status='scheduled')
+        self.assertEqual(auto_assign([pickup.pk]), {'assigned': [], 'unassigned': []})
+        pickup.refresh_from_db()
+        self.assertEqual(pickup.collector_id, self.far.pk)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(CustomUser.objects.create_user('resident', 'resident@example.com', 'pw'))
+        self.assertEqual(self.client.post('/api/pickup-requests/auto_assign/').status_code, 403)
+
+
+class RoutePlanTests(SimpleTestCase):
+
+    def stops(self, points, hour=9, first=1):
+        return [
+            {'id': pk, 'address': f'Stop {pk}', 'latitude': lat, 'longitude': lng, 'pickup_time': time(hour, 0)}
+            for pk, (lat, lng) in enumerate(points, start=first)
+        ]
+
+    def test_no_stops(self):
+        self.assertEqual(plan_route([], (4.0, 9.7)), [])
+
+    def test_single_stop_without_start(self):
+        route = plan_route(self.stops([(4.0, 9.7)]))
+        self.assertEqual(len(route), 1)
+        self.assertEqual((route[0]['leg_km'], route[0]['cumulative_km']), (0.0, 0.0))
+
+    def test_zigzag_is_untangled(self):
+        # Listed zig-zagging along a line; the plan drives straight along it
+        stops = self.stops([(4.04, 9.7), (4.01, 9.7), (4.03, 9.7), (4.02, 9.7)])
+        route = plan_route(stops, (4.0, 9.7))
+        self.assertEqual([stop['pickup_id'] for stop in route], [2, 4, 3, 1])
+        self.assertAlmostEqual(route[-1]['cumulative_km'], haversine_km(4.0, 9.7, 4.04, 9.7), places=2)
+        self.assertLess(route[-1]['cumulative_km'], route_length(stops, (4.0, 9.7)))
+
+    def test_earlier_window_comes_first_even_if_further(self):
+        stops = self.stops([(4.01, 9.7)], hour=11) + self.stops([(4.2, 9.7)], hour=9, first=2)
+        route = plan_route(stops, (4.0, 9.7))
+        self.assertEqual([stop['pickup_id'] for stop in route], [2, 1])
+        self.assertEqual(route[0]['pickup_time'], '09:00:00')
+
+    @override_settings(ROUTE_TIME_WINDOW_MINUTES=180)
+    def test_stops_in_one_window_are_ordered_by_distance(self):
+        stops = self.stops([(4.01, 9.7)], hour=11) + self.stops([(4.2, 9.7)], hour=9, first=2)
+        route = plan_route(stops, (4.0, 9.7))
+        self.assertEqual([stop['pickup_id'] for stop in route], [1, 2])
+
+    def test_legs_add_up(self):
+        route = plan_route(self.stops([(4.01, 9.71), (4.03, 9.69), (4.0, 9.75)]), (4.0, 9.7))
+        self.assertAlmostEqual(sum(stop['leg_km'] for stop in route), route[-1]['cumulative_km'], places=2)
+
+
+class CollectorRouteViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_user('planner', 'planner@example.com', 'password', is_staff=True)
+        cls.collector = WasteCollector.objects.create(
+            name='Truck', vehicle_number='LT-1', phone_number='1', email='truck@example.com'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def test_route_for_date(self):
+        pickup = PickupRequest.objects.create(
+            user=self.staff, waste_type='general', pickup_date=date(2026, 3, 2), pickup_time=time(9, 0),
+            address='Home', latitude=4.0, longitude=9.7, quantity_estimate=5, collector=self.collector,
+            status='scheduled'
+        )
+        response = self.client.get(f'/api/waste-collectors/{self.collector.pk}/route/?date=2026-03-02')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['start'])
+        self.assertEqual([stop['pickup_id'] for stop in response.data['stops']], [pickup.pk])
+
+    def test_invalid_date(self):
+        for value in ('monday', '2024-02-30', '2024-13-01'):
+            response = self.client.get(f'/api/waste-collectors/{self.collector.pk}/route/?date={value}')
+            self.assertEqual(response.status_code, 400, value)
+            self.assertIn('error', response.data)
+
+    def test_staff_only(self):
+        self.client.force_authenticate(CustomUser.objects.create_user('resident', 'resident@example.com', 'pw'))
+        response = self.client.get(f'/api/waste-collectors/{self.collector.pk}/route/')
+        self.assertEqual(response.status_code, 403)
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('pager', 'pager@example.com', 'password', is_staff=True)
+        cls.base = timezone.now() - timedelta(hours=1)
+        cls.notifications = []
+        # Pairs share a created_at, so page boundaries fall inside ties
+        for index in range(7):
+            notification = Notification.objects.create(
+                user=cls.user, title=f'Notice {index}', message='Hi', notification_type='educational'
+            )
+            Notification.objects.filter(pk=notification.pk).update(
+                created_at=cls.base + timedelta(seconds=index // 2)
+            )
+            cls.notifications.append(notification.pk)
+        # Newest first, ties broken by id
+        cls.newest_first = sorted(
+            cls.notifications, key=lambda pk: (cls.notifications.index(pk) // 2, pk), reverse=True
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def pages(self, url):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            url = response.data['next']
+        return pages
+
+    def ids(self, page):
+        return [item['id'] for item in page['results']]
+
+    def test_pages_through_ties_once_each(self):
+        pages = self.pages('/api/notifications/?page_size=2')
+        self.assertEqual([pk for page in pages for pk in self.ids(page)], self.newest_first)
+        self.assertEqual([len(page['results']) for page in pages], [2, 2, 2, 1])
+        self.assertIsNone(pages[0]['previous'])
+
+    def test_exact_multiple_has_no_empty_last_page(self):
+        Notification.objects.filter(pk=self.newest_first[-1]).delete()
+        pages = self.pages('/api/notifications/?page_size=2')
+        self.assertEqual([len(page['results']) for page in pages], [2, 2, 2])
+
+    def test_previous_links_walk_back(self):
+        pages = self.pages('/api/notifications/?page_size=3')
+        url = pages[-1]['previous']
+        backwards = []
+        while url:
+            response = self.client.get(url)
+            backwards.insert(0, self.ids(response.data))
+            self.assertIsNotNone(response.data['next'])
+            url = response.data['previous']
+        self.assertEqual(backwards, [self.ids(page) for page in pages[:-1]])
+
+    def test_new_rows_do_not_shift_later_pages(self):
+        first = self.client.get('/api/notifications/?page_size=3')
+        Notification.objects.create(user=self.user, title='Newer', message='Hi', notification_type='educational')
+        second = self.client.get(first.data['next'])
+        self.assertEqual(self.ids(second.data), self.newest_first[3:6])
+
+    def test_page_size_bounds(self):
+        self.assertEqual(len(self.client.get('/api/notifications/?page_size=1').data['results']), 1)
+        for page_size in ('0', '-3', 'many'):
+            response = self.client.get(f'/api/notifications/?page_size={page_size}')
+            self.assertEqual(len(response.data['results']), 7, page_size)
+            self.assertIsNone(response.data['next'])
+
+    def test_invalid_cursors(self):
+        bad_date = base64.urlsafe_b64encode(json.dumps({'k': ['yesterday', 1]}).encode()).decode()
+        for cursor in ('bogus', bad_date):
+            self.assertEqual(self.client.get(f'/api/notifications/?cursor={cursor}').status_code, 404)
+
+    def test_models_without_created_at_page_on_id(self):
+        collectors = [
+            WasteCollector.objects.create(
+                name=f'Truck {index}', vehicle_number='LT', phone_number='1', email='truck@example.com'
+            ).pk
+            for index in range(3)
+        ]
+        pages = self.pages('/api/waste-collectors/?page_size=2')
+        self.assertEqual([pk for page in pages for pk in self.ids(page)], collectors[::-1])
+
+
+class ExportCsvTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_user('auditor', 'auditor@example.com', 'password', is_staff=True)
+        cls.reports = [
+            WasteReport.objects.create(
+                user=cls.staff, title=f'Heap {index}', description='Line one\nline "two"', waste_type=waste_type,
+                latitude=4.05, longitude=9.7, address='Road, north side', quantity=5
+            )
+            for index, waste_type in enumerate(('plastic', 'organic', 'plastic'))
+        ]
+        WasteReport.objects.filter(pk=cls.reports[0].pk).update(
+            created_at=timezone.make_aware(datetime(2024, 1, 10, 12))
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def export(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_matches_the_buffered_csv(self):
+        # What the export wrote before it streamed
+        expected = StringIO()
+        writer = csv.writer(expected)
+        writer.writerow(['ID', 'Title', 'Description', 'Waste Type', 'Status', 'Location', 'Created At', 'Updated At'])
+        for report in WasteReport.objects.order_by('id'):
+            writer.writerow([
+                report.id, report.title, report.description, report.waste_type, report.status, report.address,
+                report.created_at, report.updated_at
+            ])
+        self.assertEqual(self.export('/api/waste-reports/export_csv/'), expected.getvalue())
+
+    def test_filters(self):
+        rows = list(csv.reader(StringIO(self.export(
+            '/api/waste-reports/export_csv/?waste_type=plastic&date_from=2024-02-01'
+        ))))
+        self.assertEqual([int(row[0]) for row in rows[1:]], [self.reports[2].pk])
+
+    def test_invalid_dates(self):
+        for url in ('/api/waste-reports/export_csv/', '/api/pickup-requests/export_csv/'):
+            for value in ('yesterday', '2024-02-30', '2024-13-01'):
+                response = self.client.get(f'{url}?date_from={value}')
+                self.assertEqual(response.status_code, 400, (url, value))
+                self.assertIn('date_from', response.data)
+
+    def test_pickup_filters(self):
+        for day in (1, 2):
+            PickupRequest.objects.create(
+                user=self.staff, waste_type='general', pickup_date=date(2026, 3, day), pickup_time=time(9, 0),
+                address='Home', latitude=4.05, longitude=9.7, quantity_estimate=5
+            )
+        rows = list(csv.reader(StringIO(self.export('/api/pickup-requests/export_csv/?date_from=2026-03-02'))))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[1][3], '2026-03-02')
+        self.assertEqual(rows[1][6], 'Not Assigned')
+
+
+class ReportMediaUploadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('photographer', 'photographer@example.com', 'password')
+        cls.report = WasteReport.objects.create(
+            user=cls.user, title='Heap', description='Heap', waste_type='plastic',
+            latitude=4.05, longitude=9.7, address='Road', quantity=1
+        )
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        settings_override = override_settings(
+            MEDIA_ROOT=self.root, MEDIA_STAGING_ROOT=os.path.join(self.root, 'staging'),
+            MEDIA_UPLOAD_BACKEND='core.media.LocalUploadBackend', MEDIA_UPLOAD_STALE_SECONDS=600
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def photo(self):
+        # Landscape pixels, tagged to be shown rotated a quarter turn
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        exif[0x010F] = 'Camera Co'
+        content = BytesIO()
+        Image.new('RGB', (600, 400), 'blue').save(content, 'JPEG', exif=exif.tobytes())
+        return SimpleUploadedFile('heap.jpg', content.getvalue(), content_type='image/jpeg')
+
+    def queued(self, status='pending', claimed_ago=None):
+        with mock.patch('core.media._executor'), self.captureOnCommitCallbacks(execute=True):
+            media = queue_report_media(self.report, [self.photo()])[0]
+        changes = {'upload_status': status}
+        if claimed_ago is not None:
+            changes['upload_claimed_at'] = timezone.now() - claimed_ago
+        WasteReportMedia.objects.filter(pk=media.pk).update(**changes)
+        return media
+
+    def test_worker_uploads_variants_without_metadata(self):
+        media = self.queued()
+        staged_path = WasteReportMedia.objects.get(pk=media.pk).staged_path
+        process_media_upload(media.pk)
+
+        media.refresh_from_db()
+        self.assertEqual(media.upload_status, 'uploaded')
+        self.assertEqual(set(media.variants), {'thumbnail', 'medium', 'full'})
+        # Turned upright: portrait, not the stored landscape
+        self.assertEqual(media.variants['thumbnail']['height'], 320)
+        self.assertLess(media.variants['thumbnail']['width'], 320)
+        for variant in media.variants.values():
+            with Image.open(os.path.join(self.root, variant['name'])) as image:
+                self.assertEqual(image.size, (variant['width'], variant['height']))
+                self.assertEqual(dict(image.getexif()), {})
+        self.assertFalse(os.path.exists(staged_path))
+
+    def test_command_reuploads_abandoned_uploads(self):
+        abandoned = self.queued('uploading', claimed_ago=timedelta(hours=1))
+        unstamped = self.queued('uploading')
+        call_command('process_media_uploads', stdout=StringIO())
+
+        for media in (abandoned, unstamped):
+            media.refresh_from_db()
+            self.assertEqual(media.upload_status, 'uploaded')
+
+    def test_command_leaves_uploads_in_progress(self):
+        media = self.queued('uploading', claimed_ago=timedelta(seconds=30))
+        call_command('process_media_uploads', stdout=StringIO())
+
+        media.refresh_from_db()
+        self.assertEqual(media.upload_status, 'uploading')
+        self.assertTrue(os.path.exists(media.staged_path))
+
+    def test_reclaimed_upload_is_not_overwritten_by_first_worker(self):
+        media = self.queued()
+
+        def reclaimed_mid_upload(path, field, backend):
+            # The first worker stalls long enough to be taken over, and the
+            # second one finishes first
+            WasteReportMedia.objects.filter(pk=media.pk).update(upload_claimed_at=timezone.now() - timedelta(hours=1))
+            with mock.patch('core.media.upload_image_variants', wraps=upload_image_variants):
+                process_media_upload(media.pk)
+            raise OSError('connection reset')
+
+        with mock.patch('core.media.upload_image_variants', side_effect=reclaimed_mid_upload):
+            process_media_upload(media.pk)
+
+        media.refresh_from_db()
+        self.assertEqual((media.upload_status, media.upload_error), ('uploaded', ''))
+
+    def test_command_reuploads_abandoned_profile_picture(self):
+        profile = UserProfile.objects.create(user=self.user)
+        with mock.patch('core.media._executor'), self.captureOnCommitCallbacks(execute=True):
+            UserProfile.objects.filter(pk=profile.pk).update(**stage_profile_picture(self.photo()))
+        UserProfile.objects.filter(pk=profile.pk).update(
+            picture_upload_status='uploading', picture_claimed_at=timezone.now() - timedelta(hours=1)
+        )
+        call_command('process_media_uploads', stdout=StringIO())
+
+        profile.refresh_from_db()
+        self.assertEqual(profile.picture_upload_status, 'uploaded')
+
+
+class UnreadCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('reader', 'reader@example.com', 'password')
+        cls.other = CustomUser.objects.create_user('neighbour', 'neighbour@example.com', 'password')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def notification(self, user=None, **fields):
+        return Notification.objects.create(
+            user=user or self.user, title='Hello', message='Hi', notification_type='educational', **fields
+        )
+
+    def counter(self, user=None):
+        return NotificationCounter.objects.get(user=user or self.user).unread
+
+    def test_direct_creates_are_counted(self):
+        self.notification()
+        self.notification(is_read=True)
+        notify(self.user, 'Pickup Scheduled', 'Tomorrow', 'pickup_status')
+        self.assertEqual(self.counter(), 2)
+        self.assertEqual(unread_count(self.user), 2)
+
+    def test_toggling_read_on_a_saved_row(self):
+        notification = self.notification()
+        notification.is_read = True
+        notification.save()
+        notification.save()
+        self.assertEqual(self.counter(), 0)
+
+        reloaded = Notification.objects.get(pk=notification.pk)
+        reloaded.is_read = False
+        reloaded.save()
+        self.assertEqual(self.counter(), 1)
+
+    def test_partially_loaded_row_leaves_counter(self):
+        notification = self.notification()
+        partial = Notification.objects.only('id', 'title').get(pk=notification.pk)
+        partial.title = 'Renamed'
+        partial.save(update_fields=['title'])
+        self.assertEqual(self.counter(), 1)
+
+    def test_delete(self):
+        unread, read = self.notification(), self.notification(is_read=True)
+        unread.delete()
+        read.delete()
+        self.assertEqual(self.counter(), 0)
+
+    def test_mark_read_endpoint(self):
+        first, second, read = self.notification(), self.notification(), self.notification(is_read=True)
+        theirs = self.notification(user=self.other)
+        response = self.client.post(
+            '/api/notifications/mark_read/', {'ids': [first.pk, read.pk, theirs.pk]}, format='json'
+        )
+        self.assertEqual(response.data, {'marked': 1, 'unread_count': 1})
+        self.assertEqual(self.counter(self.other), 1)
+
+        response = self.client.post('/api/notifications/mark_all_read/')
+        self.assertEqual(response.data, {'marked': 1, 'unread_count': 0})
+        second.refresh_from_db()
+        self.assertTrue(second.is_read)
+
+    def test_mark_read_rejects_bad_ids(self):
+        for ids in ('1', [1, 'two'], None):
+            response = self.client.post('/api/notifications/mark_read/', {'ids': ids}, format='json')
+            self.assertEqual(response.status_code, 400, ids)
+
+    def test_missing_counter_is_rebuilt_on_read(self):
+        self.notification()
+        NotificationCounter.objects.all().delete()
+        self.assertEqual(self.client.get('/api/notifications/unread_count/').data, {'unread_count': 1})
+        self.assertEqual(self.counter(), 1)
+
+    def test_resync_command_repairs_drift(self):
+        self.notification()
+        self.notification(user=self.other, is_read=True)
+        NotificationCounter.objects.update(unread=42)
+        call_command('resync_notification_counters', stdout=StringIO())
+        self.assertEqual((self.counter(), self.counter(self.other)), (1, 0))
+
+
+class CollectorLocationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_user('tracker', 'tracker@example.com', 'password', is_staff=True)
+        cls.first, cls.second = [
+            WasteCollector.objects.create(
+                name=f'Truck {index}', vehicle_number=f'LT-{index}', phone_number='1', email='truck@example.com'
+            )
+            for index in (1, 2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        # Flush by hand instead of on a timer thread
+        schedule = mock.patch.object(LocationBuffer, '_schedule')
+        schedule.start()
+        self.addCleanup(schedule.stop)
+        location_buffer.dirty.clear()
+        location_buffer.history.clear()
+        location_buffer.last_kept.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def ping(self, collector, latitude, minute, longitude=9.7):
+        return {
+            'collector_id': collector.pk, 'latitude': latitude, 'longitude': longitude,
+            'recorded_at': f'2026-03-02T08:{minute:02d}:00Z',
+        }
+
+    def test_batch_keeps_the_newest_ping_per_collector(self):
+        response = self.client.post('/api/waste-collectors/locations/', {'pings': [
+            self.ping(self.first, 4.06, 5),
+            self.ping(self.first, 4.05, 1),
+            self.ping(self.second, 4.07, 2),
+            {**self.ping(self.first, 4.0, 3), 'collector_id': 999999},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data, {'accepted': 3, 'rejected': 1, 'collectors_updated': 2})
+
+        positions = latest_positions([self.first.pk, self.second.pk, 999999])
+        self.assertEqual(set(positions), {self.first.pk, self.second.pk})
+        self.assertEqual(positions[self.first.pk]['latitude'], 4.06)
+
+        # An older ping arriving late doesn't move the collector back
+        response = self.client.post(
+            '/api/waste-collectors/locations/', {'pings': [self.ping(self.first, 4.0, 4)]}, format='json'
+        )
+        self.assertEqual(response.data['collectors_updated'], 0)
+        self.assertEqual(latest_positions([self.first.pk])[self.first.pk]['latitude'], 4.06)
+
+    def test_batch_rejects_invalid_pings(self):
+        for body in ({'pings': []}, {'pings': [{**self.ping(self.first, 95, 1)}]}, {}):
+            response = self.client.post('/api/waste-collectors/locations/', body, format='json')
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_flush_writes_latest_positions(self):
+        self.client.post('/api/waste-collectors/locations/', {'pings': [
+            self.ping(self.first, 4.05, 1), self.ping(self.first, 4.06, 5),
+        ]}, format='json')
+        self.first.refresh_from_db()
+        self.assertIsNone(self.first.current_location_lat)
+
+        self.assertEqual(location_buffer.flush(), (1, 0))
+        self.first.refresh_from_db()
+        self.assertEqual(str(self.first.current_location_lat), '4.060000')
+        self.assertEqual(self.first.location_updated_at, datetime.fromisoformat('2026-03-02T08:05:00+00:00'))
+        self.assertEqual(location_buffer.flush(), (0, 0))
+
+    @override_settings(COLLECTOR_LOCATION_HISTORY=True, COLLECTOR_LOCATION_HISTORY_MIN_METERS=25)
+    def test_history_skips_pings_that_barely_moved(self):
+        self.client.post('/api/waste-collectors/locations/', {'pings': [
+            self.ping(self.first, 4.05, 1),
+            self.ping(self.first, 4.05001, 2),  # about a metre
+            self.ping(self.first, 4.06, 3),
+        ]}, format='json')
+        location_buffer.flush()
+        self.assertEqual(
+            list(CollectorLocation.objects.order_by('recorded_at').values_list('latitude', flat=True)),
+            [Decimal('4.050000'), Decimal('4.060000')],
+        )
+
+    @override_settings(COLLECTOR_LOCATION_HISTORY=True)
+    def test_failed_flush_keeps_the_work(self):
+        buffer = LocationBuffer()
+        buffer.ingest([normalize_ping({**self.ping(self.first, 4.05, 1), 'recorded_at': timezone.now()})])
+        with mock.patch.object(CollectorLocation.objects, 'bulk_create', side_effect=OSError('connection reset')):
+            with self.assertRaises(OSError):
+                buffer.flush()
+        # The collector update rolled back with the history insert
+        self.first.refresh_from_db()
+        self.assertIsNone(self.first.current_location_lat)
+
+        self.assertEqual(buffer.flush(), (1, 1))
+        self.first.refresh_from_db()
+        self.assertEqual(str(self.first.current_location_lat), '4.050000')
+        self.assertEqual(CollectorLocation.objects.count(), 1)
+
+    @override_settings(COLLECTOR_LOCATION_HISTORY=True)
+    def test_history_of_a_deleted_collector_is_dropped(self):
+        buffer = LocationBuffer()
+        buffer.ingest([normalize_ping({**self.ping(self.second, 4.05, 1), 'recorded_at': timezone.now()})])
+        self.second.delete()
+        self.assertEqual(buffer.flush(), (1, 1))
+        self.assertFalse(CollectorLocation.objects.exists())
+
+
+class QuizGradingTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('quizzer', 'quizzer@example.com', 'password')
+        cls.quiz = Quiz.objects.create(title='Sorting', description='Which bin?')
+        cls.questions = [
+            QuizQuestion.objects.create(
+                quiz=cls.quiz, question=f'q{index}', correct_answer=answer,
+                option1=answer, option2='Landfill', option3='Compost'
+            )
+            for index, answer in enumerate(['Recycling', 'Compost', 'Hazardous'])
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def submit(self, answers):
+        return self.client.post(f'/api/quizzes/{self.quiz.pk}/submit_attempt/', {'answers': answers}, format='json')
+
+    def test_grades_against_stored_answers(self):
+        first, second, third = self.questions
+        response = self.submit({str(first.pk): ' recycling ', str(second.pk): 'Landfill', '999999': 'Compost'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['correct_answers'], 1)
+        self.assertEqual(response.data['total_questions'], 3)
+        self.assertAlmostEqual(response.data['score'], 100 / 3)
+        self.assertEqual(response.data['results'], [
+            {'question_id': first.pk, 'answered': True, 'correct': True},
+            {'question_id': second.pk, 'answered': True, 'correct': False},
+            {'question_id': third.pk, 'answered': False, 'correct': False},
+        ])
+        self.assertEqual(UserQuizAttempt.objects.get(user=self.user).score, 33)
+
+    def test_rejects_answers_that_are_not_a_mapping(self):
+        response = self.submit(['Recycling'])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(UserQuizAttempt.objects.exists())
+
+    def test_answer_key_is_cached(self):
+        quiz = Quiz.objects.get(pk=self.quiz.pk)
+        with self.assertNumQueries(1):
+            get_answer_key(quiz)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_answer_key(quiz)[0], (self.questions[0].pk, 'recycling'))
+
+    def test_question_edits_retire_the_cached_key(self):
+        first, second, third = self.questions
+        answers = {str(first.pk): 'Recycling', str(second.pk): 'Compost', str(third.pk): 'Hazardous'}
+        self.assertEqual(self.submit(answers).data['correct_answers'], 3)
+
+        first.correct_answer = 'Landfill'
+        first.save()
+        self.assertEqual(self.submit(answers).data['correct_answers'], 2)
+
+        third.delete()
+        response = self.submit(answers)
+        self.assertEqual((response.data['correct_answers'], response.data['total_questions']), (1, 2))
+
+        QuizQuestion.objects.create(
+            quiz=self.quiz, question='q3', correct_answer='Glass', option1='Glass', option2='Landfill', option3='Compost'
+        )
+        self.assertEqual(self.submit(answers).data['total_questions'], 3)
+
+
+class ViewCounterTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user('reader', 'reader@example.com', 'password')
+        cls.topic = ForumTopic.objects.create(title='Compost', description='Tips', author=cls.user, is_approved=True)
+        cls.content = EducationalContent.objects.create(
+            title='Sorting', content_type='article', description='d', content='c', author=cls.user
+        )
+
+    def setUp(self):
+        # Flush by hand instead of on a timer thread
+        schedule = mock.patch.object(ViewCounterBuffer, '_schedule')
+        schedule.start()
+        self.addCleanup(schedule.stop)
+        view_counts.pending.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_retrieves_are_counted_on_flush(self):
+        updated_at = self.content.updated_at
+        for _ in range(3):
+            self.assertEqual(self.client.get(f'/api/forum-topics/{self.topic.pk}/').status_code, 200)
+        first = self.client.get(f'/api/educational-content/{self.content.pk}/')
+        # A conditional hit is still a view
+        second = self.client.get(f'/api/educational-content/{self.content.pk}/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(self.client.get('/api/forum-topics/999999/').status_code, 404)
+
+        self.topic.refresh_from_db()
+        self.assertEqual(self.topic.views, 0)
+        self.assertEqual(view_counts.flush(), 5)
+        self.topic.refresh_from_db()
+        self.content.refresh_from_db()
+        self.assertEqual((self.topic.views, self.content.views), (3, 2))
+        # The count doesn't change the content's ETag
+        self.assertEqual(self.content.updated_at, updated_at)
+        self.assertEqual(view_counts.flush(), 0)
+
+    def test_flush_adds_to_existing_counts_in_batches(self):
+        topics = [self.topic] + [
+            ForumTopic.objects.create(title=f't{index}', description='d', author=self.user, is_approved=True)
+            for index in range(4)
+        ]
+        ForumTopic.objects.filter(pk=self.topic.pk).update(views=10)
+        counter = ViewCounterBuffer()
+        for index, topic in enumerate(topics):
+            counter.increment(ForumTopic, topic.pk, index + 1)
+        counter.increment(EducationalContent, self.content.pk)
+        with mock.patch('core.counters.FLUSH_BATCH_SIZE', 2):
+            self.assertEqual(counter.flush(), 16)
+        self.assertEqual(
+            list(ForumTopic.objects.filter(pk__in=[topic.pk for topic in topics]).order_by('pk').values_list('views', flat=True)),
+            [11, 2, 3, 4, 5],
+        )
+        self.content.refresh_from_db()
+        self.assertEqual(self.content.views, 1)
+
+    def test_failed_flush_keeps_the_counts(self):
+        counter = ViewCounterBuffer()
+        counter.increment(ForumTopic, self.topic.pk, 2)
+        counter.increment(EducationalContent, self.content.pk)
+        write = ViewCounterBuffer._write
+
+        def write_forum_topics_only(buffer, model, increments):
+            if model is not ForumTopic:
+                raise OSError('connection reset')
+            write(buffer, model, increments)
+
+        with mock.patch.object(ViewCounterBuffer, '_write', autospec=True, side_effect=write_forum_topics_only):
+            with self.assertRaises(OSError):
+                counter.flush()
+        # The topic's write rolled back with the failed one
+        self.topic.refresh_from_db()
+        self.assertEqual(self.topic.views, 0)
+
+        counter.increment(ForumTopic, self.topic.pk)
+        self.assertEqual(counter.flush(), 4)
+        self.topic.refresh_from_db()
+        self.content.refresh_from_db()
+        self.assertEqual((self.topic.views, self.content.views), (3, 1))
+
+
+class ConditionalGetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = CustomUser.objects.create_user('curator', 'curator@example.com', 'password', is_staff=True)
+        cls.faqs = [
+            FAQ.objects.create(question=f'q{index}', answer='a', category='general' if index else 'pickups')
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.staff)
+
+    def assertNotModified(self, url, etag):
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_list_etag(self):
+        response = self.client.get('/api/faqs/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertNotIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertNotModified('/api/faqs/', etag)
+        # Filters and paging are part of the representation
+        self.assertNotEqual(self.client.get('/api/faqs/?page_size=2')['ETag'], etag)
+
+    def test_list_etag_changes_after_an_update(self):
+        etag = self.client.get('/api/faqs/')['ETag']
+        response = self.client.patch(f'/api/faqs/{self.faqs[1].pk}/', {'answer': 'b'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/faqs/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_changes_after_deleting_an_older_row(self):
+        # Max(updated_at) still comes from the newest row; the count changes
+        etag = self.client.get('/api/faqs/')['ETag']
+        self.assertEqual(self.client.delete(f'/api/faqs/{self.faqs[0].pk}/').status_code, 204)
+        response = self.client.get('/api/faqs/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_detail_etag(self):
+        url = f'/api/faqs/{self.faqs[0].pk}/'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+        self.assertNotModified(url, etag)
+        self.assertNotEqual(self.client.get(f'/api/faqs/{self.faqs[1].pk}/')['ETag'], etag)
+
+        self.client.patch(url, {'answer': 'b'}, format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['answer'], 'b')
+        self.assertNotEqual(response['ETag'], etag)
+
+        self.client.delete(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 404)
+        self.assertEqual(self.client.get('/api/faqs/not-a-number/').status_code, 404)
+
+    def test_quiz_etag_follows_its_questions(self):
+        quiz = Quiz.objects.create(title='Sorting', description='Which bin?')
+        question = QuizQuestion.objects.create(
+            quiz=quiz, question='q', correct_answer='Compost', option1='Compost', option2='Landfill', option3='Glass'
+        )
+        url = f'/api/quizzes/{quiz.pk}/'
+        detail, listing = self.client.get(url)['ETag'], self.client.get('/api/quizzes/')['ETag']
+        question.explanation = 'Food scraps rot'
+        question.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=detail).status_code, 200)
+        self.assertEqual(self.client.get('/api/quizzes/', HTTP_IF_NONE_MATCH=listing).status_code, 200)
+
+
+class SearchTests(TestCase):
+    # The test database is SQLite, so this covers the FTS5 path
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = CustomUser.objects.create_user('writer', 'writer@example.com', 'password')
+        cls.content = EducationalContent.objects.create(
+            title='Recycling plastic bottles', content_type='article',
+            description='Rinse and crush before the bin', content='Caps go back on', author=cls.author
+        )
+        cls.faq = FAQ.objects.create(
+            question='When is compost collected?', answer='Every Tuesday, with the <b>green</b> bin', category='pickups'
+        )
+        cls.topic = ForumTopic.objects.create(
+            title='Composting at home', description='Worm bins vs heaps', author=cls.author, is_approved=True
+        )
+
+    def hits(self, query, **kwargs):
+        return [(hit['type'], hit['id']) for hit in search(query, **kwargs)]
+
+    def test_saves_are_indexed(self):
+        self.assertEqual(SearchDocument.objects.count(), 3)
+        self.assertEqual(self.hits('bottles'), [('educational_content', self.content.pk)])
+        # Body text is searchable too
+        self.assertEqual(self.hits('tuesday'), [('faq', self.faq.pk)])
+
+        self.faq.answer = 'Every Friday'
+        self.faq.save()
+        self.assertEqual(self.hits('tuesday'), [])
+        self.assertEqual(self.hits('friday'), [('faq', self.faq.pk)])
+
+    def test_prefix_and_stemmed_matches(self):
+        self.assertEqual(self.hits('recyc'), [('educational_content', self.content.pk)])
+        self.assertEqual(self.hits('recycled'), [('educational_content', self.content.pk)])
+        # Every term has to match
+        self.assertEqual(self.hits('compost home'), [('forum_topic', self.topic.pk)])
+        self.assertEqual(sorted(self.hits('compost')), [('faq', self.faq.pk), ('forum_topic', self.topic.pk)])
+        self.assertEqual(self.hits('compost', sources=['faq']), [('faq', self.faq.pk)])
+        self.assertEqual(len(self.hits('compost', limit=1)), 1)
+
+    def test_title_matches_rank_first(self):
+        FAQ.objects.create(question='Bins', answer='Worms like compost', category='garden')
+        hits = search('compost')
+        self.assertEqual(hits[-1]['title'], 'Bins')
+        self.assertEqual([hit['rank'] for hit in hits], sorted((hit['rank'] for hit in hits), reverse=True))
+
+    def test_highlights_are_marked_and_escaped(self):
+        [hit] = search('green')
+        self.assertEqual(hit['title'], 'When is compost collected?')
+        self.assertIn('&lt;b&gt;<mark>green</mark>&lt;/b&gt;', hit['snippet'])
+        self.assertNotIn('<b>', hit['snippet'])
+        [hit] = search('recyc')
+        self.assertEqual(hit['title'], '<mark>Recycling</mark> plastic bottles')
+
+    def test_query_syntax_is_not_passed_to_fts(self):
+        self.assertEqual(self.hits('"compost" OR NEAR(bins'), [])
+        self.assertEqual(self.hits('bottles*'), [('educational_content', self.content.pk)])
+        self.assertEqual(search('***'), [])
+
+    def test_deletes_are_removed(self):
+        self.faq.delete()
+        self.assertEqual(self.hits('tuesday'), [])
+        self.assertFalse(SearchDocument.objects.filter(source='faq').exists())
+
+    def test_hidden_objects_are_not_found(self):
+        EducationalContent.objects.create(
+            title='Glass sorting draft', content_type='article', description='d', content='c',
+            author=self.author, is_published=False
+        )
+        pending = ForumTopic.objects.create(title='Glass collection', description='d', author=self.author)
+        self.assertEqual(self.hits('glass'), [])
+
+        pending.is_approved = True
+        pending.save()
+        self.assertEqual(self.hits('glass'), [('forum_topic', pending.pk)])
+
+        # Unpublishing takes an indexed object back out
+        self.content.is_published = False
+        self.content.save()
+        self.assertEqual(self.hits('bottles'), [])
+
+    def test_endpoint(self):
+        response = self.client.get('/api/search/?q=compost&type=faq&limit=5')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([hit['id'] for hit in response.data['results']], [self.faq.pk])
+        self.assertEqual(self.client.get('/api/search/?q=').status_code, 400)
+        self.assertEqual(self.client.get('/api/search/?q=compost&type=recipes').status_code, 400)
+
+
+@override_settings(ADMIN_DASHBOARD_CACHE_TIMEOUT=60, ADMIN_DASHBOARD_STALE_TIMEOUT=600)
+class DashboardSnapshotTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1_000_000.0
+        clock = mock.patch('core.dashboard.time.time', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        # Hold queued refreshes so the test decides when they run
+        executor = mock.patch('core.dashboard._refresh_executor')
+        self.executor = executor.start()
+        self.addCleanup(executor.stop)
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return {'build': self.builds}
+
+    def run_queued_refresh(self):
+        [(function, *args)] = [call.args for call in self.executor.submit.call_args_list]
+        self.executor.submit.reset_mock()
+        with mock.patch('core.dashboard.close_old_connections'):
+            function(*args)
+
+    def test_cold_build_runs_inline(self):
+        payload = get_snapshot('test', self.build)
+        self.assertEqual(payload['build'], 1)
+        self.assertIn('computed_at', payload)
+        self.now += 59
+        self.assertEqual(get_snapshot('test', self.build)['build'], 1)
+        self.assertEqual(self.builds, 1)
+        self.executor.submit.assert_not_called()
+
+    def test_stale_snapshot_is_served_while_one_refresh_runs(self):
+        get_snapshot('test', self.build)
+        self.now += 61
+        for _ in range(3):
+            self.assertEqual(get_snapshot('test', self.build)['build'], 1)
+        self.assertEqual(self.executor.submit.call_count, 1)
+        self.assertTrue(cache.get(REFRESH_LOCK_KEY.format('test')))
+
+        self.run_queued_refresh()
+        self.assertIsNone(cache.get(REFRESH_LOCK_KEY.format('test')))
+        self.assertEqual(get_snapshot('test', self.build)['build'], 2)
+        self.executor.submit.assert_not_called()
+
+    def test_failed_refresh_releases_the_lock(self):
+        get_snapshot('test', self.build)
+        self.now += 61
+
+        def failing_build():
+            raise OSError('connection reset')
+
+        self.assertEqual(get_snapshot('test', failing_build)['build'], 1)
+        with self.assertLogs('core.dashboard', 'ERROR'):
+            self.run_queued_refresh()
+        self.assertIsNone(cache.get(REFRESH_LOCK_KEY.format('test')))
+
+        # The stale snapshot is still served, and the next request retries
+        self.assertEqual(get_snapshot('test', self.build)['build'], 1)
+        self.run_queued_refresh()
+        self.assertEqual(get_snapshot('test', self.build)['build'], 2)
+
+    def test_snapshots_are_kept_per_name(self):
+        get_snapshot('test', self.build)
+        self.assertEqual(get_snapshot('other', self.build)['build'], 2)
+        self.now += 61
+        get_snapshot('test', self.build)
+        get_snapshot('other', self.build)
+        self.assertEqual(self.executor.submit.call_count, 2)
@@ -0,0 +1,213 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import (
+    WasteReport, PickupRequest, WasteReportDailyStat, PickupRequestDailyStat, CleanupTeam, WasteCollector
+)
+
+BUCKETS = ('day', 'week', 'month')
+METRICS = ('count', 'kg', 'resolution_time')
+DEFAULT_RANGE_DAYS = 30
+MAX_BUCKETS = 1000
+
+# Per source: its daily rollup, quantity field, the timestamp set when a row
+# is closed, and the group_by options (grouped column, model naming the ids)
+SERIES_SOURCES = {
+    WasteReport: {
+        'rollup': WasteReportDailyStat,
+        'quantity': 'quantity',
+        'finished_at': 'resolved_at',
+        'groups': {'waste_type': ('waste_type', None), 'status': ('status', None), 'team': ('assigned_team', CleanupTeam)},
+    },
+    PickupRequest: {
+        'rollup': PickupRequestDailyStat,
+        'quantity': 'quantity_estimate',
+        'finished_at': 'completed_at',
+        'groups': {'waste_type': ('waste_type', None), 'status': ('status', None), 'collector': ('collector', WasteCollector)},
+    },
+}
+
+# Key for rows with no team/collector; real ids are positive
+UNASSIGNED = -1
+
+
+def parse_series_params(source, params):
+    # Returns the validated query, or raises ValueError with a message
+    config = SERIES_SOURCES[source]
+    end = params.get('to')
+    end = parse_date(end) if end else timezone.localdate()
+    start = params.get('from')
+    start = parse_date(start) if start else end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    if start is None or end is None:
+        raise ValueError('from and to must be in YYYY-MM-DD format')
+    if start > end:
+        raise ValueError('from must not be after to')
+
+    bucket = params.get('bucket', 'day')
+    if bucket not in BUCKETS:
+        raise ValueError(f'bucket must be one of: {", ".join(BUCKETS)}')
+    metric = params.get('metric', 'count')
+    if metric not in METRICS:
+        raise ValueError(f'metric must be one of: {", ".join(METRICS)}')
+    group_by = params.get('group_by') or None
+    if group_by is not None and group_by not in config['groups']:
+        raise ValueError(f'group_by must be one of: {", ".join(config["groups"])}')
+    if len(bucket_axis(start, end, bucket)) > MAX_BUCKETS:
+        raise ValueError(f'Range covers more than {MAX_BUCKETS} buckets; use a coarser bucket')
+    return {'start': start, 'end': end, 'bucket': bucket, 'metric': metric, 'group_by': group_by}
+
+
+def bucket_floor(days, bucket):
+    # Start of each day's bucket; weeks start on Monday
+    days = days.astype('datetime64[D]')
+    if bucket == 'week':
+        # Day 0 (1970-01-01) was a Thursday
+        return days - (days.astype('int64') + 3) % 7
+    if bucket == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    return days
+
+
+def bucket_axis(start, end, bucket):
+    # Every bucket start from `start` to `end`, so gaps come out as zeros
+    first, last = bucket_floor(np.array([start, end], dtype='datetime64[D]'), bucket)
+    if bucket == 'month':
+        months = np.arange(first.astype('datetime64[M]'), last.astype('datetime64[M]') + 1)
+        return months.astype('datetime64[D]')
+    return np.arange(first, last + 1, 7 if bucket == 'week' else 1)
+
+
+def _day_range(start, end):
+    # Local midnight at `start` up to (not including) the one after `end`
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+
+
+def _load_rows(source, query):
+    # (day, group key, value) rows, already grouped by day and key in the
+    # database where the metric allows it
+    config = SERIES_SOURCES[source]
+    metric, group_by = query['metric'], query['group_by']
+    column = config['groups'][group_by][0] if group_by else None
+    group_fields = [column] if column else []
+
+    start, end = _day_range(query['start'], query['end'])
+
+    if metric == 'resolution_time':
+        # One row per closed row; medians can't be pre-aggregated
+        finished_at = config['finished_at']
+        rows = source.objects.filter(
+            **{f'{finished_at}__gte': start, f'{finished_at}__lt': end}
+        ).annotate(
+            day=TruncDate(finished_at),
+            value=ExpressionWrapper(F(finished_at) - F('created_at'), output_field=DurationField())
+        )
+    elif column in (None, 'waste_type', 'status'):
+        # The daily rollups already hold these per day
+        rows = config['rollup'].objects.filter(
+            day__gte=query['start'], day__lte=query['end'], count__gt=0
+        ).values('day', *group_fields).annotate(
+            value=Sum('count') if metric == 'count' else Sum(config['quantity'])
+        )
+    else:
+        rows = source.objects.filter(created_at__gte=start, created_at__lt=end).annotate(
+            day=TruncDate('created_at')
+        ).values('day', *group_fields).annotate(
+            value=Count('id') if metric == 'count' else Sum(config['quantity'])
+        )
+    return list(rows.order_by().values_list('day', *group_fields, 'value'))
+
+
+def _to_arrays(rows, query):
+    days = np.array([row[0] for row in rows], dtype='datetime64[D]')
+    if query['group_by'] is None:
+        keys = np.zeros(len(rows), dtype='int64')
+    else:
+        keys = np.array([UNASSIGNED if row[1] is None else row[1] for row in rows])
+    if query['metric'] == 'resolution_time':
+        values = np.array([row[-1] for row in rows], dtype='timedelta64[us]') / np.timedelta64(1, 'h')
+        # A row created already closed is stamped a moment before created_at
+        values = np.maximum(values, 0)
+    else:
+        values = np.array([row[-1] or 0 for row in rows], dtype='float64')
+    return days, keys, values
+
+
+def aggregate(days, keys, values, axis, bucket, median=False):
+    # (group keys, groups x buckets matrix). Sums are zero-filled; medians
+    # are NaN where a bucket has no rows.
+    group_keys, group_index = np.unique(keys, return_inverse=True)
+    bucket_index = np.searchsorted(axis, bucket_floor(days, bucket))
+    shape = (len(group_keys), len(axis))
+    if not median:
+        matrix = np.zeros(shape)
+        np.add.at(matrix, (group_index, bucket_index), values)
+        return group_keys, matrix
+
+    # Sort by cell then value; each cell's median sits mid-way along its run
+    cells = group_index * len(axis) + bucket_index
+    order = np.lexsort((values, cells))
+    cells, values = cells[order], values[order]
+    cell_ids, starts, sizes = np.unique(cells, return_index=True, return_counts=True)
+    low = values[starts + (sizes - 1) // 2]
+    high = values[starts + sizes // 2]
+    matrix = np.full(shape, np.nan)
+    matrix.flat[cell_ids] = (low + high) / 2
+    return group_keys, matrix
+
+
+def _labels(source, group_by, group_keys):
+    column, model = SERIES_SOURCES[source]['groups'][group_by]
+    if model is None:
+        choices = dict(source._meta.get_field(column).choices)
+        return {key: choices.get(key, key) for key in group_keys}
+    names = dict(model.objects.filter(pk__in=[key for key in group_keys if key != UNASSIGNED]).values_list('id', 'name'))
+    return {key: names.get(key, 'Unassigned' if key == UNASSIGNED else str(key)) for key in group_keys}
+
+
+def _format(value, metric):
+    if np.isnan(value):
+        return None
+    if metric == 'count':
+        return int(value)
+    return round(float(value), 3 if metric == 'kg' else 2)
+
+
+def time_series(source, query):
+    axis = bucket_axis(query['start'], query['end'], query['bucket'])
+    days, keys, values = _to_arrays(_load_rows(source, query), query)
+    group_keys, matrix = aggregate(
+        days, keys, values, axis, query['bucket'], median=query['metric'] == 'resolution_time'
+    )
+
+    if query['group_by'] is None:
+        # Ungrouped: always exactly one series, even over an empty range
+        row = matrix[0] if len(group_keys) else np.full(len(axis), np.nan if query['metric'] == 'resolution_time' else 0.0)
+        series = [{'key': 'total', 'label': 'Total', 'values': [_format(value, query['metric']) for value in row]}]
+    else:
+        labels = _labels(source, query['group_by'], group_keys.tolist())
+        series = [
+            {
+                'key': None if key == UNASSIGNED else key,
+                'label': labels[key],
+                'values': [_format(value, query['metric']) for value in row],
+            }
+            for key, row in zip(group_keys.tolist(), matrix)
+        ]
+
+    return {
+        'from': query['start'].isoformat(),
+        'to': query['end'].isoformat(),
+        'bucket': query['bucket'],
+        'metric': query['metric'],
+        'group_by': query['group_by'],
+        'buckets': [str(day) for day in axis],
+        'series': series,
+    }
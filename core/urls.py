@@ -1,5 +1,6 @@
 from django.urls import path
-from .views import SignUpView, LoginView, AdminUserManagementView, AdminDashboardStatsView
+from .views import SignUpView, LoginView, AdminUserManagementView, AdminDashboardStatsView, DashboardCacheStatsView
+from .views import event_stream, event_poll, SearchView, MetricsView
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework.routers import DefaultRouter
 from .views import (
@@ -7,7 +8,7 @@ from .views import (
     NotificationViewSet, UserProfileViewSet, UserDashboardView,
     AdminDashboardView, CleanupTeamViewSet, PickupRequestViewSet,
     WasteCollectorViewSet, EducationalContentViewSet, QuizViewSet,
-    ForumTopicViewSet, FAQViewSet
+    ForumTopicViewSet, FAQViewSet, ExportJobViewSet, NotificationBroadcastViewSet
 )
 
 router = DefaultRouter()
@@ -23,6 +24,8 @@ router.register(r'educational-content', EducationalContentViewSet, basename='edu
 router.register(r'quizzes', QuizViewSet, basename='quiz')
 router.register(r'forum-topics', ForumTopicViewSet, basename='forum-topic')
 router.register(r'faqs', FAQViewSet, basename='faq')
+router.register(r'export-jobs', ExportJobViewSet, basename='export-job')
+router.register(r'notification-broadcasts', NotificationBroadcastViewSet, basename='notification-broadcast')
 
 urlpatterns = [
     path('auth/signup/', SignUpView.as_view(), name='signup'),
@@ -30,7 +33,12 @@ urlpatterns = [
     path('auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('dashboard/user/', UserDashboardView.as_view(), name='user-dashboard'),
     path('dashboard/admin/', AdminDashboardView.as_view(), name='admin-dashboard'),
+    path('dashboard/cache-stats/', DashboardCacheStatsView.as_view(), name='dashboard-cache-stats'),
     path('admin/users/', AdminUserManagementView.as_view(), name='admin-users'),
     path('admin/users/<int:user_id>/', AdminUserManagementView.as_view(), name='admin-user-detail'),
     path('admin/dashboard/stats/', AdminDashboardStatsView.as_view(), name='admin-dashboard-stats'),
+    path('events/stream/', event_stream, name='event-stream'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+    path('events/poll/', event_poll, name='event-poll'),
 ] + router.urls 
\ No newline at end of file
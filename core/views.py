@@ -3,205 +3,118 @@ from rest_framework import viewsets, permissions, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db.models import Count, Q, F
-from .models import WasteReport, Pickup, EducationalResource, Notification, UserProfile, WasteReportMedia, CleanupTeam, PickupRequest, WasteCollector, EducationalContent, Quiz, QuizQuestion, UserQuizAttempt, ForumTopic, ForumComment, FAQ, CustomUser
+from .models import WasteReport, Pickup, EducationalResource, Notification, UserProfile, WasteReportMedia, CleanupTeam, PickupRequest, WasteCollector, EducationalContent, Quiz, QuizQuestion, UserQuizAttempt, ForumTopic, ForumComment, FAQ, CustomUser, ExportJob, NotificationBroadcast, SearchDocument, WasteReportDailyStat, PickupRequestDailyStat
 from .serializers import (
     WasteReportSerializer, PickupSerializer, EducationalResourceSerializer,
     NotificationSerializer, UserProfileSerializer, UserDashboardSerializer,
-    AdminDashboardSerializer, CleanupTeamSerializer,
+    CleanupTeamSerializer,
     PickupRequestSerializer, PickupRequestDetailSerializer,
     WasteCollectorSerializer, PickupAnalyticsSerializer,
     EducationalContentSerializer, QuizSerializer, QuizQuestionSerializer,
     UserQuizAttemptSerializer, ForumTopicSerializer, ForumCommentSerializer,
-    FAQSerializer, SignUpSerializer, LoginSerializer, UserAdminSerializer
+    FAQSerializer, SignUpSerializer, LoginSerializer, UserAdminSerializer,
+    ExportJobSerializer, CollectorLocationPingSerializer, CollectorLocationBatchSerializer,
+    NotificationBroadcastSerializer
 )
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from datetime import timedelta
 import csv
-from django.http import HttpResponse
+import os
+from django.http import HttpResponse, FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from .permissions import IsAdminUser
+from .pagination import KeysetPagination, ForumTopicPagination, ChronologicalPagination, DistancePagination
+from .sync import DeltaSyncMixin
+from .conditional import ConditionalGetMixin
+from .quizzes import get_answer_key, grade
+from .counters import view_counts
+from .search import search, MAX_LIMIT, DEFAULT_LIMIT
+from .rollups import distribution
+from .timeseries import parse_series_params, time_series
+from .metrics import registry as metrics_registry, render_prometheus
+from .exports import (
+    filter_waste_reports, filter_pickup_requests, waste_report_rows, pickup_request_rows,
+    stream_csv, enqueue_export_job, export_file_path, WASTE_REPORT_HEADER, PICKUP_REQUEST_HEADER
+)
+from .geo import filter_bbox, parse_bbox, parse_near, nearest, DEFAULT_RADIUS_KM
+from .dispatch import auto_assign, pending_pickup_ids
+from .routing import collector_route
+from .locations import buffer as location_buffer, normalize_ping
+from .notifications import (
+    notify, enqueue_broadcast, mark_read as mark_notifications_read,
+    unread_count as unread_notification_count
+)
+from .dashboard import get_user_dashboard, dashboard_cache_stats, get_admin_dashboard, get_admin_stats
+from .events import (
+    authenticate_stream, parse_event_id, user_channel, sse_stream, wait_for_events,
+    encode_event, get_broker
+)
 from django.db.utils import IntegrityError
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 # Create your views here.
 
+class SpatialQueryMixin:
+    # ?bbox=min_lat,min_lng,max_lat,max_lng narrows a list to an area and
+    # ?near=lat,lng&radius_km= returns the closest rows first, with distance.
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        bbox = self.request.query_params.get('bbox')
+        if self.action == 'list' and bbox:
+            queryset = filter_bbox(queryset, *parse_bbox(bbox))
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        near = request.query_params.get('near')
+        if not near:
+            return super().list(request, *args, **kwargs)
+
+        lat, lng, radius_km = parse_near(near, request.query_params.get('radius_km', DEFAULT_RADIUS_KM))
+        queryset = nearest(self.filter_queryset(self.get_queryset()), lat, lng, radius_km)
+        if self.paginator is None:
+            results = list(queryset.order_by('distance_km', 'pk'))
+        else:
+            # Page on (distance, id) in SQL, like the regular list's cursor
+            paginator = DistancePagination()
+            results = paginator.paginate_queryset(queryset, request, view=self)
+
+        data = self.get_serializer(results, many=True).data
+        for item, obj in zip(data, results):
+            item['distance_km'] = round(obj.distance_km, 3)
+        if self.paginator is None:
+            return Response(data)
+        return paginator.get_paginated_response(data)
+
 class UserDashboardView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        current_date = timezone.now()
-        thirty_days_ago = current_date - timedelta(days=30)
-
-        # Get waste reports with detailed tracking
-        reports = WasteReport.objects.filter(user=user)
-        
-        # Recent reports (last 30 days)
-        recent_reports = reports.filter(
-            created_at__gte=thirty_days_ago
-        ).order_by('-created_at')
+        return Response(get_user_dashboard(request.user))
 
-        # Reports by status
-        reports_by_status = reports.values('status').annotate(count=Count('id'))
-        
-        # Reports by waste type
-        reports_by_type = reports.values('waste_type').annotate(count=Count('id'))
-        
-        # Monthly report statistics
-        monthly_reports = reports.filter(
-            created_at__gte=thirty_days_ago
-        ).count()
-
-        # Status breakdown
-        pending_reports = reports.filter(status='pending').count()
-        in_progress_reports = reports.filter(status='in_progress').count()
-        completed_reports = reports.filter(status='completed').count()
-        
-        # Reports requiring attention (pending for more than 7 days)
-        attention_needed = reports.filter(
-            status='pending',
-            created_at__lte=current_date - timedelta(days=7)
-        ).count()
-
-        # Get reports with recent updates
-        recently_updated = reports.filter(
-            updated_at__gte=current_date - timedelta(days=7)
-        ).exclude(
-            created_at=F('updated_at')  # Exclude newly created reports
-        ).order_by('-updated_at')[:5]
-
-        # Get upcoming pickups
-        upcoming_pickups = PickupRequest.objects.filter(
-            user=user,
-            pickup_date__gte=current_date.date(),
-            status__in=['pending', 'scheduled', 'in_progress']
-        ).order_by('pickup_date', 'pickup_time')
-
-        # Get past pickups
-        past_pickups = PickupRequest.objects.filter(
-            user=user,
-            pickup_date__lt=current_date.date()
-        ).order_by('-pickup_date', '-pickup_time')
-
-        # Get pickup statistics
-        all_pickups = PickupRequest.objects.filter(user=user)
-        total_pickups = all_pickups.count()
-        completed_pickups = all_pickups.filter(status='completed').count()
-        pending_pickups = all_pickups.filter(status__in=['pending', 'scheduled']).count()
-
-        # Get educational resources
-        educational_resources = EducationalContent.objects.filter(
-            is_published=True
-        ).order_by('-created_at')
-
-        # Get resources by type
-        articles = educational_resources.filter(content_type='article')[:3]
-        videos = educational_resources.filter(content_type='video')[:2]
-        
-        # Get user's recent quiz attempts
-        recent_quiz_attempts = UserQuizAttempt.objects.filter(
-            user=user
-        ).order_by('-created_at')[:3]
-
-        # Get recent notifications
-        recent_notifications = Notification.objects.filter(
-            user=user,
-            created_at__gte=current_date - timedelta(days=7)
-        ).order_by('-created_at')[:5]
-
-        # Get user profile
-        profile = UserProfile.objects.filter(user=user).first()
-
-        # Get notifications
-        recent_notifications = Notification.objects.filter(
-            user=user
-        ).order_by('-created_at')[:10]  # Get last 10 notifications
-
-        unread_notifications = Notification.objects.filter(
-            user=user,
-            is_read=False
-        ).count()
-
-        notifications_by_type = Notification.objects.filter(
-            user=user
-        ).values('notification_type').annotate(
-            count=Count('id')
-        )
+class DashboardCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
 
-        return Response({
-            'user_info': {
-                'username': user.username,
-                'email': user.email,
-                'phone_number': profile.phone_number if profile else None,
-                'address': profile.address if profile else None
-            },
-            'reports_summary': {
-                'total_reports': reports.count(),
-                'reports_by_status': reports_by_status,
-                'reports_by_type': reports_by_type,
-                'recent_reports': WasteReportSerializer(recent_reports[:5], many=True).data
-            },
-            'waste_tracking': {
-                'monthly_statistics': {
-                    'total_reports': monthly_reports,
-                    'resolution_rate': f"{(completed_reports/reports.count() * 100) if reports.count() > 0 else 0:.1f}%"
-                },
-                'status_breakdown': {
-                    'pending': pending_reports,
-                    'in_progress': in_progress_reports,
-                    'completed': completed_reports,
-                    'attention_needed': attention_needed
-                },
-                'recent_updates': WasteReportSerializer(recently_updated, many=True).data,
-                'timeline': {
-                    'last_30_days': monthly_reports,
-                    'pending_over_7_days': attention_needed
-                }
-            },
-            'pickups_summary': {
-                'upcoming_pickups': PickupRequestSerializer(upcoming_pickups, many=True).data,
-                'past_pickups': PickupRequestSerializer(past_pickups, many=True).data,
-                'statistics': {
-                    'total_pickups': total_pickups,
-                    'completed_pickups': completed_pickups,
-                    'pending_pickups': pending_pickups,
-                    'completion_rate': f"{(completed_pickups/total_pickups * 100) if total_pickups > 0 else 0:.1f}%"
-                }
-            },
-            'notifications': {
-                'recent': NotificationSerializer(recent_notifications, many=True).data,
-                'unread_count': unread_notifications,
-                'by_type': notifications_by_type,
-                'has_new': unread_notifications > 0
-            },
-            'educational_resources': EducationalContentSerializer(educational_resources, many=True).data
-        })
+    def get(self, request):
+        return Response(dashboard_cache_stats())
 
 class AdminDashboardView(APIView):
     permission_classes = [permissions.IsAdminUser]
 
     def get(self, request):
-        data = {
-            'total_reports': WasteReport.objects.count(),
-            'pending_pickups': Pickup.objects.filter(
-                status__in=['scheduled', 'in_progress']
-            ).count(),
-            'active_users': User.objects.filter(
-                wastereport__created_at__gte=timezone.now() - timezone.timedelta(days=30)
-            ).distinct().count(),
-            'recent_reports': WasteReport.objects.all()
-                .order_by('-created_at')[:10]
-        }
-        serializer = AdminDashboardSerializer(data)
-        return Response(serializer.data)
+        return Response(get_admin_dashboard())
 
-class WasteReportViewSet(viewsets.ModelViewSet):
+class WasteReportViewSet(DeltaSyncMixin, SpatialQueryMixin, viewsets.ModelViewSet):
     serializer_class = WasteReportSerializer
+    sync_model = 'waste_report'
     permission_classes = [permissions.IsAuthenticated]
     parser_classes = (MultiPartParser, FormParser, JSONParser)
     
@@ -231,11 +144,12 @@ class WasteReportViewSet(viewsets.ModelViewSet):
             report.save()
             
             # Create notification for user
-            Notification.objects.create(
-                user=report.user,
-                title='Cleanup Team Assigned',
-                message=f'A cleanup team has been assigned to your report: {report.title}',
-                notification_type='report'
+            notify(
+                report.user,
+                'Cleanup Team Assigned',
+                f'A cleanup team has been assigned to your report: {report.title}',
+                'status_update',
+                reference_id=report.pk
             )
             
             return Response({'status': 'Team assigned successfully'})
@@ -253,26 +167,34 @@ class WasteReportViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
             
-        # Get reports from last 30 days
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        
-        waste_type_stats = WasteReport.objects.filter(
-            created_at__gte=thirty_days_ago
-        ).values('waste_type').annotate(
-            count=Count('id')
-        )
-        
-        status_stats = WasteReport.objects.filter(
-            created_at__gte=thirty_days_ago
-        ).values('status').annotate(
-            count=Count('id')
-        )
+        # Reports created in the last 30 days, read from the daily rollups
+        since = timezone.localdate() - timedelta(days=30)
+        waste_type_stats = distribution(WasteReportDailyStat, 'waste_type', since, 'quantity')
+        status_stats = distribution(WasteReportDailyStat, 'status', since)
         
         return Response({
             'waste_type_distribution': waste_type_stats,
             'status_distribution': status_stats,
         })
 
+    @action(detail=False, methods=['get'])
+    def timeseries(self, request):
+        # ?from=&to=&bucket=day|week|month&metric=count|kg|resolution_time&group_by=
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Not authorized'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            query = parse_series_params(WasteReport, request.query_params)
+        except ValueError as error:
+            return Response(
+                {'error': str(error)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(time_series(WasteReport, query))
+
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
         if not request.user.is_staff:
@@ -280,25 +202,9 @@ class WasteReportViewSet(viewsets.ModelViewSet):
                 {'error': 'Not authorized'},
                 status=status.HTTP_403_FORBIDDEN
             )
-            
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="waste_reports.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'ID', 'Title', 'Description', 'Waste Type', 'Status',
-            'Location', 'Created At', 'Updated At'
-        ])
-        
-        reports = self.get_queryset()
-        for report in reports:
-            writer.writerow([
-                report.id, report.title, report.description,
-                report.waste_type, report.status, report.address,
-                report.created_at, report.updated_at
-            ])
-            
-        return response
+
+        reports = filter_waste_reports(self.get_queryset(), request.query_params)
+        return stream_csv(WASTE_REPORT_HEADER, waste_report_rows(reports), 'waste_reports.csv')
 
     @action(detail=True, methods=['get'])
     def tracking_history(self, request, pk=None):
@@ -347,7 +253,7 @@ class PickupViewSet(viewsets.ModelViewSet):
             return Pickup.objects.all()
         return Pickup.objects.filter(waste_report__user=self.request.user)
 
-class EducationalResourceViewSet(viewsets.ModelViewSet):
+class EducationalResourceViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = EducationalResource.objects.all()
     serializer_class = EducationalResourceSerializer
     
@@ -359,8 +265,10 @@ class EducationalResourceViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
+class NotificationViewSet(DeltaSyncMixin, viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
+    sync_model = 'notification'
+    sync_staff_sees_all = False
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -369,10 +277,29 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        mark_notifications_read(request.user, [notification.pk])
         return Response({'status': 'notification marked as read'})
 
+    @action(detail=False, methods=['post'])
+    def mark_read(self, request):
+        ids = request.data.get('ids')
+        if not isinstance(ids, list) or not all(str(i).isdigit() for i in ids):
+            return Response(
+                {'error': 'ids must be a list of notification ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        marked = mark_notifications_read(request.user, [int(i) for i in ids])
+        return Response({'marked': marked, 'unread_count': unread_notification_count(request.user)})
+
+    @action(detail=False, methods=['post'])
+    def mark_all_read(self, request):
+        marked = mark_notifications_read(request.user)
+        return Response({'marked': marked, 'unread_count': unread_notification_count(request.user)})
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({'unread_count': unread_notification_count(request.user)})
+
 class UserProfileViewSet(viewsets.ModelViewSet):
     serializer_class = UserProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -419,30 +346,17 @@ class CleanupTeamViewSet(viewsets.ModelViewSet):
     serializer_class = CleanupTeamSerializer
     permission_classes = [permissions.IsAdminUser]
 
-class PickupRequestViewSet(viewsets.ModelViewSet):
+class PickupRequestViewSet(DeltaSyncMixin, SpatialQueryMixin, viewsets.ModelViewSet):
     serializer_class = PickupRequestSerializer
+    sync_model = 'pickup_request'
     
     def get_queryset(self):
         queryset = PickupRequest.objects.all()
         if not self.request.user.is_staff:
             return queryset.filter(user=self.request.user)
             
-        # Admin filters
-        status = self.request.query_params.get('status', None)
-        date_from = self.request.query_params.get('date_from', None)
-        date_to = self.request.query_params.get('date_to', None)
-        waste_type = self.request.query_params.get('waste_type', None)
-        
-        if status:
-            queryset = queryset.filter(status=status)
-        if date_from:
-            queryset = queryset.filter(pickup_date__gte=date_from)
-        if date_to:
-            queryset = queryset.filter(pickup_date__lte=date_to)
-        if waste_type:
-            queryset = queryset.filter(waste_type=waste_type)
-            
-        return queryset
+        # Admin filters; same ones (and date validation) as the CSV export
+        return filter_pickup_requests(queryset, self.request.query_params)
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -461,6 +375,15 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
             )
             
         pickup = self.get_object()
+        if str(request.data.get('auto', '')).lower() in ('1', 'true'):
+            result = auto_assign([pickup.pk])
+            if result['assigned']:
+                return Response({'status': 'Collector assigned successfully', **result['assigned'][0]})
+            return Response(
+                {'error': 'No available collector could be assigned'},
+                status=status.HTTP_409_CONFLICT
+            )
+
         collector_id = request.data.get('collector_id')
         
         try:
@@ -470,11 +393,12 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
             pickup.save()
             
             # Create notification
-            Notification.objects.create(
-                user=pickup.user,
-                title='Pickup Scheduled',
-                message=f'Your pickup request has been scheduled for {pickup.pickup_date}',
-                notification_type='pickup'
+            notify(
+                pickup.user,
+                'Pickup Scheduled',
+                f'Your pickup request has been scheduled for {pickup.pickup_date}',
+                'pickup_status',
+                reference_id=pickup.pk
             )
             
             return Response({'status': 'Collector assigned successfully'})
@@ -484,6 +408,27 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+    @action(detail=False, methods=['post'])
+    def auto_assign(self, request):
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Not authorized'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        pickups = PickupRequest.objects.all()
+        pickup_date = request.data.get('pickup_date')
+        if pickup_date:
+            try:
+                pickup_date = serializers.DateField().to_internal_value(pickup_date)
+            except serializers.ValidationError:
+                return Response(
+                    {'error': 'pickup_date must be in YYYY-MM-DD format'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            pickups = pickups.filter(pickup_date=pickup_date)
+        return Response(auto_assign(pending_pickup_ids(pickups)))
+
     @action(detail=False, methods=['get'])
     def analytics(self, request):
         if not request.user.is_staff:
@@ -492,15 +437,15 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
             
-        total_pickups = PickupRequest.objects.count()
-        completed_pickups = PickupRequest.objects.filter(status='completed').count()
-        pending_pickups = PickupRequest.objects.filter(
-            status__in=['pending', 'scheduled']
-        ).count()
+        by_status = {
+            item['status']: item['count']
+            for item in distribution(PickupRequestDailyStat, 'status')
+        }
+        total_pickups = sum(by_status.values())
+        completed_pickups = by_status.get('completed', 0)
+        pending_pickups = by_status.get('pending', 0) + by_status.get('scheduled', 0)
         
-        waste_type_distribution = PickupRequest.objects.values(
-            'waste_type'
-        ).annotate(count=Count('id'))
+        waste_type_distribution = distribution(PickupRequestDailyStat, 'waste_type')
         
         completion_rate = (completed_pickups / total_pickups * 100) if total_pickups > 0 else 0
         
@@ -518,6 +463,24 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
         serializer = PickupAnalyticsSerializer(data)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def timeseries(self, request):
+        # ?from=&to=&bucket=day|week|month&metric=count|kg|resolution_time&group_by=
+        if not request.user.is_staff:
+            return Response(
+                {'error': 'Not authorized'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            query = parse_series_params(PickupRequest, request.query_params)
+        except ValueError as error:
+            return Response(
+                {'error': str(error)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(time_series(PickupRequest, query))
+
     @action(detail=False, methods=['get'])
     def export_csv(self, request):
         if not request.user.is_staff:
@@ -526,29 +489,8 @@ class PickupRequestViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
             
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="pickup_requests.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'ID', 'User', 'Waste Type', 'Pickup Date', 'Status',
-            'Address', 'Collector', 'Created At'
-        ])
-        
-        pickups = self.get_queryset()
-        for pickup in pickups:
-            writer.writerow([
-                pickup.id,
-                pickup.user.username,
-                pickup.waste_type,
-                pickup.pickup_date,
-                pickup.status,
-                pickup.address,
-                pickup.collector.name if pickup.collector else 'Not Assigned',
-                pickup.created_at
-            ])
-            
-        return response
+        pickups = filter_pickup_requests(PickupRequest.objects.all(), request.query_params)
+        return stream_csv(PICKUP_REQUEST_HEADER, pickup_request_rows(pickups), 'pickup_requests.csv')
 
 class WasteCollectorViewSet(viewsets.ModelViewSet):
     queryset = WasteCollector.objects.all()
@@ -558,20 +500,55 @@ class WasteCollectorViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def update_location(self, request, pk=None):
         collector = self.get_object()
-        latitude = request.data.get('latitude')
-        longitude = request.data.get('longitude')
-        
-        if latitude and longitude:
-            collector.current_location_lat = latitude
-            collector.current_location_lng = longitude
-            collector.save()
-            return Response({'status': 'Location updated successfully'})
-        return Response(
-            {'error': 'Latitude and longitude are required'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        serializer = CollectorLocationPingSerializer(data={
+            'collector_id': collector.pk,
+            'latitude': request.data.get('latitude'),
+            'longitude': request.data.get('longitude'),
+            'recorded_at': request.data.get('recorded_at') or None
+        })
+        if not serializer.is_valid():
+            return Response(
+                {'error': 'Latitude and longitude are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        location_buffer.ingest([normalize_ping(serializer.validated_data)])
+        return Response({'status': 'Location updated successfully'})
+
+    @action(detail=False, methods=['post'])
+    def locations(self, request):
+        serializer = CollectorLocationBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        pings = [normalize_ping(ping) for ping in serializer.validated_data['pings']]
+        known = set(WasteCollector.objects.filter(
+            pk__in={ping['collector_id'] for ping in pings}
+        ).values_list('pk', flat=True))
+        accepted = [ping for ping in pings if ping['collector_id'] in known]
+
+        updated = location_buffer.ingest(accepted) if accepted else 0
+        return Response({
+            'accepted': len(accepted),
+            'rejected': len(pings) - len(accepted),
+            'collectors_updated': updated
+        }, status=status.HTTP_202_ACCEPTED)
 
-class EducationalContentViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def route(self, request, pk=None):
+        collector = self.get_object()
+        date_param = request.query_params.get('date')
+        try:
+            # None for a malformed date; ValueError for one like 2024-02-30
+            route_date = parse_date(date_param) if date_param else timezone.now().date()
+        except ValueError:
+            route_date = None
+        if route_date is None:
+            return Response(
+                {'error': 'date must be in YYYY-MM-DD format'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(collector_route(collector, route_date))
+
+class EducationalContentViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     serializer_class = EducationalContentSerializer
     
     def get_queryset(self):
@@ -586,15 +563,36 @@ class EducationalContentViewSet(viewsets.ModelViewSet):
         return queryset
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        content = serializer.save(author=self.request.user)
+        if content.is_published:
+            self.announce(content)
+
+    def perform_update(self, serializer):
+        was_published = serializer.instance.is_published
+        content = serializer.save()
+        if content.is_published and not was_published:
+            self.announce(content)
+
+    def announce(self, content):
+        broadcast = NotificationBroadcast.objects.create(
+            title='New Educational Content',
+            message=f'New {content.get_content_type_display().lower()} published: {content.title}',
+            notification_type='educational',
+            reference_id=content.pk,
+            segment='all',
+            created_by=self.request.user
+        )
+        enqueue_broadcast(broadcast)
 
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        instance.views = F('views') + 1
-        instance.save()
-        return super().retrieve(request, *args, **kwargs)
+        response = super().retrieve(request, *args, **kwargs)
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            # Buffered and written with a bare UPDATE that leaves updated_at
+            # (and so the ETag) alone; a 304 is still a view.
+            view_counts.increment(EducationalContent, int(kwargs['pk']))
+        return response
 
-class QuizViewSet(viewsets.ModelViewSet):
+class QuizViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Quiz.objects.all()
     serializer_class = QuizSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -603,39 +601,26 @@ class QuizViewSet(viewsets.ModelViewSet):
     def submit_attempt(self, request, pk=None):
         quiz = self.get_object()
         answers = request.data.get('answers', {})
-        
-        correct_answers = 0
-        total_questions = quiz.questions.count()
-        
-        for question_id, answer in answers.items():
-            try:
-                question = QuizQuestion.objects.get(id=question_id, quiz=quiz)
-                if question.correct_answer.lower() == answer.lower():
-                    correct_answers += 1
-            except QuizQuestion.DoesNotExist:
-                pass
-        
-        score = (correct_answers / total_questions) * 100 if total_questions > 0 else 0
-        
+        if not isinstance(answers, dict):
+            return Response(
+                {'error': 'answers must map question ids to answers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        result = grade(get_answer_key(quiz), answers)
         UserQuizAttempt.objects.create(
             user=request.user,
             quiz=quiz,
-            score=score
+            score=result['score']
         )
-        
-        return Response({
-            'score': score,
-            'correct_answers': correct_answers,
-            'total_questions': total_questions
-        })
+        return Response(result)
 
 class ForumTopicViewSet(viewsets.ModelViewSet):
     serializer_class = ForumTopicSerializer
+    pagination_class = ForumTopicPagination
     
     def get_queryset(self):
-        queryset = ForumTopic.objects.annotate(
-            comments_count=Count('comments')
-        )
+        queryset = ForumTopic.objects.select_related('author')
         if not self.request.user.is_staff:
             queryset = queryset.filter(is_approved=True)
         return queryset
@@ -643,6 +628,11 @@ class ForumTopicViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        view_counts.increment(ForumTopic, int(kwargs['pk']))
+        return response
+
     @action(detail=True, methods=['post'])
     def add_comment(self, request, pk=None):
         topic = self.get_object()
@@ -656,7 +646,22 @@ class ForumTopicViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class FAQViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def comments(self, request, pk=None):
+        # Oldest first; authors also see their own comments awaiting approval
+        topic = self.get_object()
+        comments = ForumComment.objects.filter(topic=topic).select_related('author')
+        if not request.user.is_staff:
+            visible = Q(is_approved=True)
+            if request.user.is_authenticated:
+                visible |= Q(author=request.user)
+            comments = comments.filter(visible)
+        paginator = ChronologicalPagination()
+        page = paginator.paginate_queryset(comments, request, view=self)
+        serializer = ForumCommentSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+class FAQViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = FAQ.objects.all()
     serializer_class = FAQSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -666,6 +671,61 @@ class FAQViewSet(viewsets.ModelViewSet):
             return [permissions.IsAdminUser()]
         return super().get_permissions()
 
+class ExportJobViewSet(viewsets.ModelViewSet):
+    serializer_class = ExportJobSerializer
+    permission_classes = [permissions.IsAdminUser]
+    http_method_names = ['get', 'post', 'delete']
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(user=self.request.user)
+
+    def perform_create(self, serializer):
+        job = serializer.save(user=self.request.user)
+        enqueue_export_job(job)
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+    def perform_destroy(self, instance):
+        if instance.file_name:
+            try:
+                os.remove(export_file_path(instance))
+            except FileNotFoundError:
+                pass
+        instance.delete()
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != 'completed':
+            return Response(
+                {'error': 'Export is not ready', 'status': job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+        try:
+            handle = open(export_file_path(job), 'rb')
+        except FileNotFoundError:
+            raise Http404('Export file no longer exists')
+        content_type = 'text/csv' if job.file_format == 'csv' else 'application/x-ndjson'
+        return FileResponse(handle, as_attachment=True, filename=job.file_name, content_type=content_type)
+
+class NotificationBroadcastViewSet(viewsets.ModelViewSet):
+    queryset = NotificationBroadcast.objects.all()
+    serializer_class = NotificationBroadcastSerializer
+    permission_classes = [permissions.IsAdminUser]
+    http_method_names = ['get', 'post']
+
+    def perform_create(self, serializer):
+        broadcast = serializer.save(created_by=self.request.user)
+        enqueue_broadcast(broadcast)
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
 # Authentication Views
 class SignUpView(APIView):
     def post(self, request):
@@ -713,9 +773,10 @@ class AdminUserManagementView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
         
-        users = CustomUser.objects.all().order_by('-created_at')
+        paginator = KeysetPagination()
+        users = paginator.paginate_queryset(CustomUser.objects.all(), request, view=self)
         serializer = UserAdminSerializer(users, many=True)
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
     def patch(self, request, user_id):
         if not request.user.is_admin:
@@ -737,6 +798,44 @@ class AdminUserManagementView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+class SearchView(APIView):
+    # /api/search/?q=compost&type=faq,forum_topic&limit=20
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'q is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        sources = [source for source in request.query_params.get('type', '').split(',') if source]
+        known = {source for source, _ in SearchDocument.SOURCES}
+        if any(source not in known for source in sources):
+            return Response(
+                {'error': f'type must be one of: {", ".join(sorted(known))}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = min(max(int(request.query_params.get('limit', DEFAULT_LIMIT)), 1), MAX_LIMIT)
+        except ValueError:
+            limit = DEFAULT_LIMIT
+
+        return Response({'query': query, 'results': search(query, sources, limit)})
+
+class MetricsView(APIView):
+    # Prometheus scrape target: per-view latency, DB time, query count and
+    # response size histograms summed across worker processes
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            render_prometheus(*metrics_registry.collect()),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
+
 class AdminDashboardStatsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -747,27 +846,53 @@ class AdminDashboardStatsView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        # Get statistics for the dashboard
-        total_users = CustomUser.objects.count()
-        total_waste_reports = WasteReport.objects.count()
-        total_pickups = PickupRequest.objects.count()
-        recent_users = CustomUser.objects.order_by('-created_at')[:5]
-        
-        # Get waste reports by status
-        waste_reports_by_status = WasteReport.objects.values('status').annotate(
-            count=Count('id')
-        )
-        
-        # Get pickups by status
-        pickups_by_status = PickupRequest.objects.values('status').annotate(
-            count=Count('id')
+        return Response(get_admin_stats())
+
+
+def _stream_unauthorized():
+    return JsonResponse(
+        {'error': 'Authentication credentials were not provided or are invalid'},
+        status=status.HTTP_401_UNAUTHORIZED
+    )
+
+
+async def event_stream(request):
+    # Server-sent events: new notifications and report/pickup status changes
+    user = await sync_to_async(authenticate_stream)(request)
+    if user is None:
+        return _stream_unauthorized()
+
+    after = parse_event_id(request.headers.get('Last-Event-ID') or request.GET.get('after'))
+    response = StreamingHttpResponse(sse_stream(user_channel(user.pk), after), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+async def event_poll(request):
+    # Long-poll fallback: returns as soon as there is at least one event
+    # after ?after=, or an empty list once the timeout runs out.
+    user = await sync_to_async(authenticate_stream)(request)
+    if user is None:
+        return _stream_unauthorized()
+
+    after = parse_event_id(request.GET.get('after'))
+    try:
+        timeout = float(request.GET.get('timeout', settings.EVENT_LONG_POLL_TIMEOUT))
+    except ValueError:
+        timeout = None
+    if timeout is None or not 0 <= timeout <= settings.EVENT_LONG_POLL_TIMEOUT:
+        return JsonResponse(
+            {'error': f'timeout must be between 0 and {settings.EVENT_LONG_POLL_TIMEOUT:g} seconds'},
+            status=status.HTTP_400_BAD_REQUEST
         )
 
-        return Response({
-            'total_users': total_users,
-            'total_waste_reports': total_waste_reports,
-            'total_pickups': total_pickups,
-            'recent_users': UserAdminSerializer(recent_users, many=True).data,
-            'waste_reports_by_status': waste_reports_by_status,
-            'pickups_by_status': pickups_by_status
-        })
+    events = await wait_for_events(user_channel(user.pk), after, timeout)
+    if events:
+        last_event_id = events[-1]['id']
+    else:
+        last_event_id = after if after is not None else get_broker().last_event_id
+    return JsonResponse({
+        'events': [encode_event(event) for event in events],
+        'last_event_id': last_event_id,
+    })